@@ -3,199 +3,563 @@ Motion Controller - Gesture-based game controller using webcam
 Controls keyboard and mouse through body pose detection
 """
 
-import cv2
-import mediapipe as mp
-import pyautogui
 import time
 
-from ui_helpers import show_loading_screen, draw_instructions, draw_control_zones, draw_ui_controls
-from input_helpers import init_input_system
-from camera_utils import initialize_camera, create_ui_callback, extract_landmarks
+STARTUP_TIME = time.perf_counter()  # Time zero of the --startup-profile report
+
+import argparse
+import contextlib
+import itertools
+import multiprocessing
+
+import cv2
+import numpy as np
+
+from ui_helpers import show_loading_screen, draw_instructions, draw_control_zones, draw_ui_controls, draw_stats_hud
+from input_helpers import init_input_system, create_backend, load_pyautogui, RecordingBackend
+from input_dispatcher import InputDispatcher
+from cursor_engine import CursorEngine
+from camera_utils import open_camera, report_camera_status, create_ui_callback, extract_landmarks, ThreadedCapture
 from gesture_controller import GestureController
+from gesture_state import format_stats
+from calibration import load_calibration
+from pose_utils import RoiPoseEstimator, AdaptivePoseEstimator, LandmarkResults
+from pose_workers import PoseWorkerPool
+from auto_tuning import PoseAutoTuner
+from landmark_filters import LandmarkFilter
+from landmark_utils import LandmarkFrame
+from pipeline import Pipeline, PipelineStop
+from startup import StartupOrchestrator
+from trace_utils import TraceWriter
+from instrumentation import FpsCounter, PipelineProfiler
+from latency_tracing import LatencyTracer, TracingBackend, TaggedEventBuffer
 from config import (
-    DEADZONE, UP_THRESHOLD, DOWN_THRESHOLD,
     HAND_COLOR_LEFT, HAND_COLOR_RIGHT,
-    SCREEN_WIDTH, SCREEN_HEIGHT, MOUSE_SMOOTHING,
-    PYAUTOGUI_PAUSE, PYAUTOGUI_FAILSAFE,
-    MIN_DETECTION_CONFIDENCE, MIN_TRACKING_CONFIDENCE
+    MOUSE_SMOOTHING, PYAUTOGUI_PAUSE, PYAUTOGUI_FAILSAFE,
+    MIN_DETECTION_CONFIDENCE, MIN_TRACKING_CONFIDENCE, ROI_ENABLED, ADAPTIVE_INFERENCE_ENABLED,
+    INPUT_BACKEND, INPUT_DISPATCHER_ENABLED, CURSOR_ENGINE_ENABLED, TRACE_RECORD_PATH,
+    PROFILING_HUD, PROFILING_EXPORT_PATH, LATENCY_TRACING_ENABLED, LATENCY_REPORT_PATH, LANDMARK_FILTER,
+    POSE_WORKERS, AUTOTUNE_ENABLED, PIPELINE_MODE, PIPELINE_FRAME_QUEUE, PIPELINE_FRAME_POLICY, PIPELINE_RENDER_POLICY,
+    PIPELINE_INPUT_QUEUE, PIPELINE_INPUT_POLICY, CALIBRATION_PROFILE_PATH, POSE_WORKER_DRAIN_S, get_screen_size
 )
 
-# Create loading window
-cv2.namedWindow('Motion Controller', cv2.WINDOW_NORMAL)
-cv2.setWindowProperty('Motion Controller', cv2.WND_PROP_TOPMOST, 1)
+# Loading screen text for each startup task
+STARTUP_LABELS = {
+    'input_system': "input system",
+    'mediapipe': "MediaPipe",
+    'camera': "camera",
+    'pose_graph': "pose detector",
+}
 
-# Loading screen - Initialization
-show_loading_screen("Initializing...", 10)
-time.sleep(0.3)
 
-# Initialize input system
-if init_input_system():
-    show_loading_screen("Loading DirectInput module...", 25)
-else:
-    show_loading_screen("Loading standard input...", 25)
+def load_input_system():
+    """Load the input modules and detect the screen size (startup task)"""
+    init_input_system()
+    pyautogui = load_pyautogui()
+    # Disable pyautogui delays for faster response
+    pyautogui.PAUSE = PYAUTOGUI_PAUSE
+    pyautogui.FAILSAFE = PYAUTOGUI_FAILSAFE
+    return get_screen_size()
 
-time.sleep(0.3)
-show_loading_screen("Loading MediaPipe...", 40)
 
-mp_pose = mp.solutions.pose
+def load_mediapipe():
+    """Import MediaPipe - the slowest import of the app (startup task)"""
+    import mediapipe as mp
+    return mp.solutions.pose
 
-time.sleep(0.2)
 
-# Initialize camera
-cap = initialize_camera()
-if cap is None:
-    exit()
+def build_pose_graph(mediapipe):
+    """Build the Pose graph and run it once so the first camera frame is not slowed down (startup task)"""
+    if AUTOTUNE_ENABLED:
+        # Model complexity and input size are chosen at runtime to meet the frame budget
+        return PoseAutoTuner().warm_up()
+    pose = mediapipe.Pose(min_detection_confidence=MIN_DETECTION_CONFIDENCE,
+                          min_tracking_confidence=MIN_TRACKING_CONFIDENCE)
+    pose.process(np.zeros((64, 64, 3), dtype=np.uint8))
+    return pose
 
-show_loading_screen("Initializing pose detector...", 90)
-time.sleep(0.3)
 
-show_loading_screen("Ready!", 100)
-time.sleep(0.5)
+def draw_overlay(image, landmarks, depth_status, hint_text, active_gesture, state):
+    """Draw control zones, the active gesture, hands, hint text and UI controls onto the mirrored frame"""
+    frame_h, frame_w = image.shape[:2]
 
-# Application state
-state = {
-    'show_hints': True,
-    'mouse_enabled': False,
-    'show_instructions': False,
-    'gesture_controller': None
-}
+    if landmarks and state['show_hints']:
+        nose = landmarks.nose
+        lw = landmarks.left_wrist
+        rw = landmarks.right_wrist
 
-# Initialize gesture controller
-gesture_controller = GestureController()
-state['gesture_controller'] = gesture_controller
-
-# Disable pyautogui delays for faster response
-pyautogui.PAUSE = PYAUTOGUI_PAUSE
-pyautogui.FAILSAFE = PYAUTOGUI_FAILSAFE
-
-# Create and set mouse callback
-mouse_callback = create_ui_callback(state)
-cv2.setMouseCallback('Motion Controller', mouse_callback, {'frame_w': 640, 'frame_h': 480})
-
-# Main loop
-with mp_pose.Pose(min_detection_confidence=MIN_DETECTION_CONFIDENCE, 
-                  min_tracking_confidence=MIN_TRACKING_CONFIDENCE) as pose:
-    while cap.isOpened():
-        success, frame = cap.read()
-        if not success:
-            break
-
-        frame_h, frame_w, _ = frame.shape
-        
-        # Update callback parameters with actual frame dimensions
-        cv2.setMouseCallback('Motion Controller', mouse_callback, {'frame_w': frame_w, 'frame_h': frame_h})
+        # Calculate screen coordinates for zones
+        nose_x_screen = frame_w - int(nose.x * frame_w)
+        nose_y_screen = int(nose.y * frame_h)
+        waist_y = (landmarks.left_hip.y + landmarks.right_hip.y) / 2
+        waist_y_screen = int(waist_y * frame_h)
+
+        # Zones of the thresholds in use (calibrated ones when a calibration profile was loaded)
+        controller = state['gesture_controller']
+        draw_control_zones(image, frame_w, frame_h, nose_x_screen, nose_y_screen, 
+                         waist_y_screen, controller.deadzone, controller.up_threshold, controller.down_threshold, 
+                         state['mouse_enabled'])
+
+        if depth_status == "ok" and state['mouse_enabled']:
+            if active_gesture:
+                cv2.putText(image, active_gesture, (50, frame_h - 50), 
+                          cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+            cv2.putText(image, "MOUSE MODE", (50, frame_h - 150), 
+                      cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 0), 2)
+        elif depth_status == "ok" and active_gesture:
+            # Determine text position based on gesture
+            y_positions = {
+                "MOUSE CLICK": frame_h - 250,
+                "LEFT": frame_h - 150,
+                "RIGHT": frame_h - 100,
+                "UP": frame_h - 50,
+                "DOWN": frame_h - 200
+            }
+            colors = {
+                "MOUSE CLICK": (255, 0, 255),
+                "LEFT": HAND_COLOR_LEFT,
+                "RIGHT": HAND_COLOR_RIGHT,
+                "UP": (0, 255, 0),
+                "DOWN": (0, 255, 255)
+            }
+            y_pos = y_positions.get(active_gesture, frame_h - 100)
+            color = colors.get(active_gesture, (255, 255, 255))
+            cv2.putText(image, active_gesture, (50, y_pos), 
+                      cv2.FONT_HERSHEY_SIMPLEX, 1, color, 2)
+
+        # Draw hands with mirrored coordinates for display
+        cv2.circle(image, (frame_w - int(lw.x * frame_w), int(lw.y * frame_h)), 
+                  10, HAND_COLOR_LEFT, -1)
+        cv2.circle(image, (frame_w - int(rw.x * frame_w), int(rw.y * frame_h)), 
+                  10, HAND_COLOR_RIGHT, -1)
+
+    # Display hint text
+    if state['show_hints']:
+        cv2.putText(image, hint_text, (50, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 0), 2)
+
+    # Draw UI controls in bottom right corner
+    draw_ui_controls(image, frame_w, frame_h, state['show_hints'], state['mouse_enabled'])
+
+
+def update_instructions_window(state):
+    """Show the instruction window while it is active, close it otherwise"""
+    if state['show_instructions']:
+        instructions_img = draw_instructions()
+        cv2.imshow('Instructions', instructions_img)
+        # Check if window was closed by clicking X
+        try:
+            if cv2.getWindowProperty('Instructions', cv2.WND_PROP_VISIBLE) < 1:
+                state['show_instructions'] = False
+        except cv2.error:
+            state['show_instructions'] = False
+    else:
+        # Close instruction window if it was open
+        try:
+            if cv2.getWindowProperty('Instructions', cv2.WND_PROP_VISIBLE) >= 0:
+                cv2.destroyWindow('Instructions')
+        except cv2.error:
+            pass  # Window doesn't exist, ignore error
+
+
+def forward_events(events, output, tag_frame=None):
+    """Send events recorded by a RecordingBackend to an input backend or dispatcher
 
+    With tag_frame the events come from a TaggedEventBuffer and each one is
+    sent with its latency tag.
+    """
+    for tag, action, args in events:
+        if tag_frame is not None:
+            tag_frame(tag)
+        getattr(output, action)(*args)
+
+
+def apply_ui_requests(state, gesture_controller):
+    """Apply the controller changes requested by the window's mouse callback
+
+    Called by the thread that runs the gesture controller, so the callback
+    (main thread) never touches the controller itself.
+    """
+    if state['release_mouse_button']:
+        state['release_mouse_button'] = False
+        gesture_controller.release_mouse_button()
+
+
+def build_async_pipeline(capture, estimator, adaptive, landmark_filter, gesture_controller, event_buffer, output,
+                         state, mouse_callback, trace_writer, smoothing, screen_size, on_frame):
+    """The frame loop as asyncio stages: capture -> preprocess -> inference -> gestures -> input and render
+
+    Gesture recognition writes its events into event_buffer; the input stage
+    forwards them to output on its own thread, so neither a slow backend nor
+    a slow window holds up recognition of the next frame. smoothing(capture_time)
+    returns the mouse smoothing for the current frame.
+    """
+    pipeline = Pipeline()
+    screen_width, screen_height = screen_size
+    tag_frame = getattr(output, 'tag_frame', None)
+    # A tagged buffer carries the latency tag of every event; otherwise events are tagged with their frame
+    tagged = isinstance(event_buffer, TaggedEventBuffer)
+    # Landmark frames are handed on to render: one being filled, one queued, one drawn, one spare
+    raw_frame = LandmarkFrame()
+    frames = itertools.cycle([LandmarkFrame() for _ in range(4)])
+
+    def read_frame():
+        captured = capture.read()
+        if captured is None and not capture.is_running():
+            raise PipelineStop
+        return captured
+
+    def preprocess(captured):
         # Mirror frame for display only
-        image = cv2.flip(frame, 1)
-        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        results = pose.process(rgb)
+        return captured, cv2.flip(captured.image, 1), cv2.cvtColor(captured.image, cv2.COLOR_BGR2RGB)
 
-        hint_text = ""
-        active_gesture = None
+    def infer(item):
+        captured, image, rgb = item
+        results = adaptive.process(rgb, captured.timestamp) if adaptive else estimator.process(rgb)
+        return captured, image, results
 
-        # Extract landmarks
-        landmarks = extract_landmarks(results, mp_pose)
-        
+    def recognize(item):
+        captured, image, results = item
+        depth_status, hint_text, active_gesture = None, "", None
+        if landmark_filter:
+            raw = extract_landmarks(results, out=raw_frame)
+            landmarks = landmark_filter.filter_frame(raw, captured.timestamp, out=next(frames))
+        else:
+            raw = landmarks = extract_landmarks(results, out=next(frames))
+        apply_ui_requests(state, gesture_controller)
         if landmarks:
-            nose = landmarks['nose']
-            lw = landmarks['left_wrist']
-            rw = landmarks['right_wrist']
-            nose_x_mirror = landmarks['nose_mirror']
-
-            # Draw control zones (if hints enabled)
-            if state['show_hints']:
-                # Calculate screen coordinates for zones
-                nose_x_screen = frame_w - int(nose.x * frame_w)
-                nose_y_screen = int(nose.y * frame_h)
-                waist_y = (landmarks['left_hip'].y + landmarks['right_hip'].y) / 2
-                waist_y_screen = int(waist_y * frame_h)
-                
-                draw_control_zones(image, frame_w, frame_h, nose_x_screen, nose_y_screen, 
-                                 waist_y_screen, DEADZONE, UP_THRESHOLD, DOWN_THRESHOLD, 
-                                 state['mouse_enabled'])
-
-            # Check depth (distance from camera)
-            depth_status, hint_text = gesture_controller.check_depth(nose.z)
-            
-            if depth_status != "ok":
-                # User too close or too far - release all controls
-                gesture_controller.release_all()
+            depth_status, hint_text, active_gesture = gesture_controller.process_frame(
+                landmarks, state['mouse_enabled'], captured.image.shape[0], screen_width, screen_height,
+                smoothing(captured.timestamp), state['show_hints'], capture_time=captured.timestamp,
+                raw_landmarks=raw
+            )
+        if trace_writer:
+            trace_writer.write(captured.timestamp, raw, active_gesture, state['mouse_enabled'])
+        # Swap rather than copy: the input stage owns the handed-over list
+        events, event_buffer.events = event_buffer.events, []
+        return captured, image, landmarks, depth_status, hint_text, active_gesture, events
+
+    def inject(item):
+        captured, events = item[0], item[-1]
+        if events:
+            if tagged:
+                forward_events(events, output, tag_frame)
+                return
+            if tag_frame is not None:
+                tag_frame(captured.timestamp)
+            forward_events(events, output)
+
+    def render(item):
+        _, image, landmarks, depth_status, hint_text, active_gesture, _ = item
+        frame_h, frame_w = image.shape[:2]
+        cv2.setMouseCallback('Motion Controller', mouse_callback, {'frame_w': frame_w, 'frame_h': frame_h})
+        draw_overlay(image, landmarks, depth_status, hint_text, active_gesture, state)
+        update_instructions_window(state)
+        if PROFILING_HUD:
+            draw_stats_hud(image, pipeline.snapshot())
+        cv2.imshow('Motion Controller', image)
+        pipeline.tick()
+        on_frame()
+        if cv2.waitKey(1) & 0xFF == 27:  # ESC key
+            raise PipelineStop
+
+    pipeline.source('capture', read_frame, threaded=True)
+    pipeline.stage('preprocess', preprocess, PIPELINE_FRAME_QUEUE, PIPELINE_FRAME_POLICY, threaded=True)
+    pipeline.stage('inference', infer, PIPELINE_FRAME_QUEUE, PIPELINE_FRAME_POLICY, threaded=True)
+    pipeline.stage('gestures', recognize, PIPELINE_FRAME_QUEUE, PIPELINE_FRAME_POLICY)
+    # Queued events are still injected on exit: the controller already counts their keys as sent
+    pipeline.stage('input', inject, PIPELINE_INPUT_QUEUE, PIPELINE_INPUT_POLICY, threaded=True, drain=True)
+    # Render runs on the main thread, which owns the OpenCV window
+    pipeline.stage('render', render, 1, PIPELINE_RENDER_POLICY, threaded='main', after='gestures')
+    return pipeline
+
+
+def show_startup_progress(percent, running):
+    """Loading screen driven by the finished startup work"""
+    if running:
+        show_loading_screen("Loading " + ", ".join(STARTUP_LABELS.get(name, name) for name in running) + "...", percent)
+    else:
+        show_loading_screen("Ready!", percent)
+    cv2.waitKey(1)  # Let the window redraw while the tasks run
+
+
+def main(argv=None):
+    """Run the Motion Controller window and frame loop"""
+    parser = argparse.ArgumentParser(description="Motion Controller - gesture-based game controller")
+    parser.add_argument("--startup-profile", action="store_true",
+                        help="Print how long each startup phase took, up to the first processed frame")
+    parser.add_argument("--reprobe-camera", action="store_true",
+                        help="Probe the camera modes again instead of using the saved camera profile")
+    args = parser.parse_args(argv)
+
+    startup = StartupOrchestrator(origin=STARTUP_TIME)
+    startup.mark('imports')
+
+    # Create loading window
+    cv2.namedWindow('Motion Controller', cv2.WINDOW_NORMAL)
+    cv2.setWindowProperty('Motion Controller', cv2.WND_PROP_TOPMOST, 1)
+    show_loading_screen("Initializing...", 0)
+
+    # Independent steps run concurrently; only the pose graph has to wait for MediaPipe
+    startup.add('input_system', load_input_system, weight=1)
+    startup.add('mediapipe', load_mediapipe, weight=3)
+    startup.add('camera', lambda: open_camera(reprobe=args.reprobe_camera), weight=2)
+    if not POSE_WORKERS:
+        startup.add('pose_graph', build_pose_graph, weight=2, after=('mediapipe',))
+    try:
+        ready = startup.run(on_progress=show_startup_progress)
+    except Exception as e:
+        print(f"ERROR: Startup failed: {e}")
+        cv2.destroyAllWindows()
+        return
+
+    cap = ready['camera']
+    if not report_camera_status(cap):
+        pose = ready.get('pose_graph')
+        if pose:
+            pose.close()
+        return
+    screen_width, screen_height = ready['input_system']
+
+    # Application state
+    state = {
+        'show_hints': True,
+        'mouse_enabled': False,
+        'show_instructions': False,
+        'release_mouse_button': False,  # Set by the mouse callback, applied before the next frame
+        'gesture_controller': None
+    }
+
+    # Initialize input injection - dispatcher thread keeps slow injection out of the frame loop
+    input_backend = create_backend(INPUT_BACKEND)
+    latency_tracer = None
+    if LATENCY_TRACING_ENABLED:
+        # Measure capture -> OS input event time where the event actually fires
+        latency_tracer = LatencyTracer()
+        input_backend = TracingBackend(input_backend, latency_tracer)
+    dispatcher = InputDispatcher(input_backend).start() if INPUT_DISPATCHER_ENABLED else None
+
+    # Cursor moves at a fixed high rate between pose updates in mouse mode
+    cursor_engine = None
+    if CURSOR_ENGINE_ENABLED:
+        cursor_engine = CursorEngine(dispatcher or input_backend, (screen_width, screen_height)).start()
+
+    # Initialize gesture controller; in the async pipeline its events go through the input stage
+    output = cursor_engine or dispatcher or input_backend
+    use_async = PIPELINE_MODE == 'async' and not POSE_WORKERS
+    event_buffer = None
+    if use_async:
+        event_buffer = TaggedEventBuffer() if latency_tracer else RecordingBackend()
+    # Thresholds from a calibration sweep (calibration.py) replace the config defaults
+    calibration = load_calibration()
+    if calibration:
+        print(f"✓ Calibrated thresholds loaded from {CALIBRATION_PROFILE_PATH}")
+    gesture_controller = GestureController(event_buffer or output, **calibration)
+    state['gesture_controller'] = gesture_controller
+
+    # Create and set mouse callback
+    mouse_callback = create_ui_callback(state)
+    cv2.setMouseCallback('Motion Controller', mouse_callback, {'frame_w': 640, 'frame_h': 480})
+
+    # Optionally record landmarks of the whole session for later replay
+    trace_writer = None
+    if TRACE_RECORD_PATH:
+        trace_writer = TraceWriter(TRACE_RECORD_PATH,
+                                   int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+                                   gesture_controller.gesture_names())
+        print(f"⏺ Recording landmark trace to {TRACE_RECORD_PATH}")
+
+    # Read frames on a background thread so we always process the newest one
+    capture = ThreadedCapture(cap).start()
+
+    # Adaptive landmark filter replaces the fixed mouse smoothing when enabled; the cursor engine
+    # interpolates between targets itself, so it gets the raw target (smoothing it twice adds lag)
+    landmark_filter = LandmarkFilter() if LANDMARK_FILTER else None
+    mouse_smoothing = 1.0 if landmark_filter or cursor_engine else MOUSE_SMOOTHING
+
+    # Per-stage latency measurement (no-op unless PROFILING_ENABLED)
+    profiler = PipelineProfiler()
+
+    # Optionally run pose inference in worker processes instead of this one
+    pose_pool = PoseWorkerPool(POSE_WORKERS) if POSE_WORKERS else None
+    if pose_pool:
+        pose_context = contextlib.nullcontext()
+    else:
+        pose_context = ready['pose_graph']
+
+    # Main loop
+    with pose_context as pose:
+        # Optionally run inference only on the region around the last known body
+        estimator = RoiPoseEstimator(pose) if ROI_ENABLED and not pose_pool else pose
+        # Optionally skip inference while the player stands still and predict the landmarks
+        adaptive = AdaptivePoseEstimator(estimator) if ADAPTIVE_INFERENCE_ENABLED and not pose_pool else None
+        # The auto-tuner keeps the mouse smoothing per second constant when it changes the frame rate
+        tuner = pose if isinstance(pose, PoseAutoTuner) else None
+        frame_rate = FpsCounter()
+
+        def smoothing(capture_time):
+            # Rate of the frames the smoothing is applied to, from their capture timestamps
+            if not tuner:
+                return mouse_smoothing
+            frame_rate.tick(capture_time)
+            fps = frame_rate.fps()
+            return tuner.smoothing(mouse_smoothing, 1000 / fps if fps else tuner.target_ms)
+
+        first_frame = True
+
+        def on_first_frame():
+            # Time to first processed frame is what the startup work is measured against
+            nonlocal first_frame
+            if first_frame:
+                first_frame = False
+                startup.mark('first_frame')
+                if args.startup_profile:
+                    startup.print_profile()
+
+        # Landmarks of the current frame, filled in place every frame
+        landmark_frame = LandmarkFrame()
+
+        def recognize_frame(captured, results):
+            """Gesture recognition of one frame (depth check + active mode); returns what the overlay shows"""
+            hint_text = ""
+            active_gesture = None
+            depth_status = None
+            raw = landmarks = extract_landmarks(results, out=landmark_frame)
+            if landmark_filter:
+                landmarks = landmark_filter.filter_frame(raw, captured.timestamp)
+            apply_ui_requests(state, gesture_controller)
+            if landmarks:
+                depth_status, hint_text, active_gesture = gesture_controller.process_frame(
+                    landmarks, state['mouse_enabled'], captured.image.shape[0], screen_width, screen_height,
+                    smoothing(captured.timestamp), state['show_hints'], capture_time=captured.timestamp,
+                    raw_landmarks=raw
+                )
+            if trace_writer:
+                trace_writer.write(captured.timestamp, raw, active_gesture, state['mouse_enabled'])
+            return landmarks, depth_status, hint_text, active_gesture
+
+        pipeline = None
+        if use_async:
+            pipeline = build_async_pipeline(capture, estimator, adaptive, landmark_filter, gesture_controller,
+                                            event_buffer, output, state, mouse_callback, trace_writer,
+                                            smoothing, (screen_width, screen_height), on_first_frame)
+            pipeline.run()
+        while pipeline is None and capture.is_running():
+            profiler.begin_frame()
+            captured = capture.read()
+            if captured is None:
+                if capture.is_running():
+                    continue  # No new frame within the timeout, keep waiting
+                break
+            frame = captured.image
+            profiler.lap('capture')
+
+            frame_h, frame_w, _ = frame.shape
+
+            # Update callback parameters with actual frame dimensions
+            cv2.setMouseCallback('Motion Controller', mouse_callback, {'frame_w': frame_w, 'frame_h': frame_h})
+
+            # Mirror frame for display only
+            image = cv2.flip(frame, 1)
+            if pose_pool:
+                # Workers convert and infer; results come back in capture order a few frames later
+                pose_pool.submit(frame, (captured, image))
+                profiler.lap('preprocess')
+                if pose_pool.in_flight() < POSE_WORKERS:
+                    continue  # Fill the pipeline first
+                result = pose_pool.get()
+                captured, image = result.tag
+                results = LandmarkResults(result.landmarks)
             else:
-                # Process gestures based on mode
-                if state['mouse_enabled']:
-                    active_gesture = gesture_controller.handle_mouse_mode(
-                        landmarks, nose_x_mirror, SCREEN_WIDTH, SCREEN_HEIGHT, MOUSE_SMOOTHING
-                    )
-                    if state['show_hints']:
-                        if active_gesture:
-                            cv2.putText(image, active_gesture, (50, frame_h - 50), 
-                                      cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-                        cv2.putText(image, "MOUSE MODE", (50, frame_h - 150), 
-                                  cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 0), 2)
+                rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                profiler.lap('preprocess')
+                if adaptive:
+                    results = adaptive.process(rgb, captured.timestamp)
                 else:
-                    active_gesture = gesture_controller.handle_keyboard_mode(
-                        landmarks, nose_x_mirror, frame_h, state['show_hints'], 
-                        SCREEN_WIDTH, SCREEN_HEIGHT
-                    )
-                    if state['show_hints'] and active_gesture:
-                        # Determine text position based on gesture
-                        y_positions = {
-                            "MOUSE CLICK": frame_h - 250,
-                            "LEFT": frame_h - 150,
-                            "RIGHT": frame_h - 100,
-                            "UP": frame_h - 50,
-                            "DOWN": frame_h - 200
-                        }
-                        colors = {
-                            "MOUSE CLICK": (255, 0, 255),
-                            "LEFT": HAND_COLOR_LEFT,
-                            "RIGHT": HAND_COLOR_RIGHT,
-                            "UP": (0, 255, 0),
-                            "DOWN": (0, 255, 255)
-                        }
-                        y_pos = y_positions.get(active_gesture, frame_h - 100)
-                        color = colors.get(active_gesture, (255, 255, 255))
-                        cv2.putText(image, active_gesture, (50, y_pos), 
-                                  cv2.FONT_HERSHEY_SIMPLEX, 1, color, 2)
-
-            # Draw hands with mirrored coordinates for display (only if hints shown)
-            if state['show_hints']:
-                cv2.circle(image, (frame_w - int(lw.x * frame_w), int(lw.y * frame_h)), 
-                          10, HAND_COLOR_LEFT, -1)
-                cv2.circle(image, (frame_w - int(rw.x * frame_w), int(rw.y * frame_h)), 
-                          10, HAND_COLOR_RIGHT, -1)
-
-        # Display hint text
-        if state['show_hints']:
-            cv2.putText(image, hint_text, (50, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 0), 2)
-        
-        # Draw UI controls in bottom right corner
-        draw_ui_controls(image, frame_w, frame_h, state['show_hints'], state['mouse_enabled'])
-        
-        # Show instruction window if active
-        if state['show_instructions']:
-            instructions_img = draw_instructions()
-            cv2.imshow('Instructions', instructions_img)
-            # Check if window was closed by clicking X
-            try:
-                if cv2.getWindowProperty('Instructions', cv2.WND_PROP_VISIBLE) < 1:
-                    state['show_instructions'] = False
-            except cv2.error:
-                state['show_instructions'] = False
-        else:
-            # Close instruction window if it was open
-            try:
-                if cv2.getWindowProperty('Instructions', cv2.WND_PROP_VISIBLE) >= 0:
-                    cv2.destroyWindow('Instructions')
-            except cv2.error:
-                pass  # Window doesn't exist, ignore error
-        
-        cv2.imshow('Motion Controller', image)
-        if cv2.waitKey(10) & 0xFF == 27:  # ESC key
-            break
+                    results = estimator.process(rgb)
+            profiler.lap('inference')
+
+            landmarks, depth_status, hint_text, active_gesture = recognize_frame(captured, results)
+            profiler.lap('gestures')
+
+            draw_overlay(image, landmarks, depth_status, hint_text, active_gesture, state)
+
+            # Show instruction window if active
+            update_instructions_window(state)
+
+            profiler.lap('render')
+            if profiler.enabled:
+                profiler.gauge('dropped', capture.frames_dropped)
+                if dispatcher:
+                    profiler.gauge('input_q', dispatcher.queue_depth())
+                if adaptive:
+                    profiler.gauge('infer%', round(adaptive.inference_ratio() * 100))
+                if PROFILING_HUD:
+                    draw_stats_hud(image, profiler.snapshot())
+
+            cv2.imshow('Motion Controller', image)
+            on_first_frame()
+            if cv2.waitKey(10) & 0xFF == 27:  # ESC key
+                break
+            profiler.lap('display')
+
+        # Frames still in the pose workers are recognized before the controls are released
+        while pose_pool and pose_pool.in_flight():
+            result = pose_pool.get(timeout=POSE_WORKER_DRAIN_S)
+            if result is None:
+                break
+            recognize_frame(result.tag[0], LandmarkResults(result.landmarks))
+
+    # Release all keys/buttons on exit
+    if latency_tracer:
+        output.tag_frame(None)  # Not caused by a movement
+        gesture_controller.frame_time = None
+    gesture_controller.release_all()
+    if event_buffer:
+        forward_events(event_buffer.events, output,
+                       output.tag_frame if isinstance(event_buffer, TaggedEventBuffer) else None)
+        event_buffer.clear()
+    if cursor_engine:
+        cursor_engine.stop()
+        cursor_stats = cursor_engine.stats()
+        if cursor_stats['moves_emitted']:
+            print(f"Cursor: {cursor_stats['output_hz']:.0f} Hz output for {cursor_stats['target_hz']:.0f} Hz pose "
+                  f"updates, error p50 {cursor_stats['error_p50_px']:.1f} px, p95 {cursor_stats['error_p95_px']:.1f} px")
+    for mode, gesture_stats in gesture_controller.gesture_stats().items():
+        if gesture_stats['raw_transitions']:
+            print(f"Gesture state machine ({mode}): {format_stats(gesture_stats)}")
+    if dispatcher:
+        dispatcher.stop()
+        print(f"Input events: {dispatcher.stats()}")
+    if latency_tracer:
+        latency_tracer.print_report()
+        if LATENCY_REPORT_PATH:
+            latency_tracer.save(LATENCY_REPORT_PATH)
+
+    capture.stop()
+    if pose_pool:
+        print(f"Pose workers: {pose_pool.stats()}")
+        pose_pool.close()
+    if PROFILING_EXPORT_PATH:
+        profiler.export(PROFILING_EXPORT_PATH)
+    if trace_writer:
+        trace_writer.close()
+        print(f"Landmark trace saved: {trace_writer.count} frames")
+    if adaptive:
+        adaptive_stats = adaptive.stats()
+        print(f"Pose inference: {adaptive_stats['inference_fps']:.1f} FPS of {adaptive_stats['capture_fps']:.1f} FPS captured "
+              f"({adaptive_stats['predicted']} frames predicted)")
+    if pipeline:
+        pipeline.print_stats()
+    if tuner:
+        tuner_stats = tuner.stats()
+        print(f"Auto-tune: {tuner_stats['level_name']}, inference p90 {tuner_stats['inference_p90_ms']:.1f} ms "
+              f"of {tuner_stats['budget_ms']:.1f} ms, {tuner_stats['switches']} switches")
+    stats = capture.stats()
+    print(f"Frames captured: {stats['captured']}, processed: {stats['delivered']}, dropped: {stats['dropped']}, "
+          f"frame interval: {stats['frame_interval_ms']:.1f} ms")
+    cv2.destroyAllWindows()
 
-# Release all keys/buttons on exit
-gesture_controller.release_all()
 
-cap.release()
-cv2.destroyAllWindows()
+if __name__ == "__main__":
+    multiprocessing.freeze_support()  # Pose worker processes in the frozen EXE
+    main()
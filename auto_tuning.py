@@ -0,0 +1,311 @@
+"""
+Automatic quality tuning for Motion Controller
+Switches pose model complexity, input resolution and tracking confidence to meet a frame time budget
+
+Usage:
+    python auto_tuning.py                              # calibrate on camera frames and save the profile
+    python auto_tuning.py --clip session.mp4 --target-ms 25
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from instrumentation import RollingHistogram
+from config import (
+    CAMERA_INDEX, MIN_DETECTION_CONFIDENCE, AUTOTUNE_LEVELS, AUTOTUNE_TARGET_FRAME_MS, AUTOTUNE_INFERENCE_SHARE,
+    AUTOTUNE_WINDOW, AUTOTUNE_UPGRADE_HEADROOM, AUTOTUNE_RETRY_S, AUTOTUNE_PROFILE_PATH
+)
+
+# Assumed cost ratio of a better level that has never been measured
+UNKNOWN_COST_FACTOR = 2.0
+
+
+def level_name(level):
+    return f"complexity {level['model_complexity']}, {level['width']} px, tracking {level['tracking_confidence']}"
+
+
+def create_level_pose(level):
+    """MediaPipe Pose for a tuning level (MediaPipe downloads the lite and heavy models on first use)"""
+    import mediapipe as mp
+    return mp.solutions.pose.Pose(model_complexity=level['model_complexity'],
+                                  min_detection_confidence=MIN_DETECTION_CONFIDENCE,
+                                  min_tracking_confidence=level['tracking_confidence'])
+
+
+def resize_for_level(rgb, width):
+    """Downscale a frame to the level's input width (never upscales)"""
+    frame_h, frame_w = rgb.shape[:2]
+    if frame_w <= width:
+        return rgb
+    return cv2.resize(rgb, (width, int(round(frame_h * width / frame_w))), interpolation=cv2.INTER_AREA)
+
+
+def load_profile(path):
+    """Calibration profile ({} when the file is missing or unreadable)"""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+class PoseAutoTuner:
+    """Pose estimator that keeps the best quality level that meets the frame budget
+
+    process() runs the current level's Pose on the frame scaled to the level
+    width (landmarks are normalized, so callers see no difference) and times
+    it. After each window of inferences the p90 time is compared with the
+    inference budget: over budget switches to the next faster level, and a
+    better level is chosen again only when its expected cost (measured at
+    that level earlier, or taken from the calibration profile) fits within
+    upgrade_headroom of the budget. The gap between the two thresholds and
+    the minimum of one window per level keep it from oscillating. Levels
+    whose Pose cannot be built (e.g. a failed model download) are skipped.
+    """
+
+    def __init__(self, levels=None, target_ms=AUTOTUNE_TARGET_FRAME_MS, inference_share=AUTOTUNE_INFERENCE_SHARE,
+                 window=AUTOTUNE_WINDOW, upgrade_headroom=AUTOTUNE_UPGRADE_HEADROOM, retry_s=AUTOTUNE_RETRY_S,
+                 profile_path=AUTOTUNE_PROFILE_PATH, pose_factory=create_level_pose, clock=time.perf_counter):
+        self.levels = levels or AUTOTUNE_LEVELS
+        self.target_ms = target_ms
+        self.budget_ms = target_ms * inference_share
+        self.window = window
+        self.upgrade_headroom = upgrade_headroom
+        self.retry_s = retry_s
+        self.pose_factory = pose_factory
+        self.clock = clock
+        self._poses = {}
+        self.unavailable = set()
+        self.costs = {}  # level index -> (p90 ms, time measured or None for calibrated costs)
+        self.decisions = []  # (time, from level, to level, reason)
+        self.latency = RollingHistogram(window)
+        self._since_switch = 0
+
+        start = 0
+        profile = load_profile(profile_path) if profile_path else {}
+        for result in profile.get('results', []):
+            if result['level'] in self.levels and 'p90_ms' in result:
+                self.costs[self.levels.index(result['level'])] = (result['p90_ms'], None)
+        if profile.get('chosen') in self.levels:
+            start = self.levels.index(profile['chosen'])
+            print(f"✓ Auto-tune profile loaded: starting at {level_name(profile['chosen'])}")
+        self.level = self._available(start, 1)
+        if self.level is None:
+            raise RuntimeError("No pose model level could be loaded")
+
+    def _pose(self, index):
+        """Pose of a level, built on first use (None when it cannot be built)"""
+        if index not in self._poses:
+            try:
+                self._poses[index] = self.pose_factory(self.levels[index])
+            except Exception as e:
+                print(f"⚠ Auto-tune: {level_name(self.levels[index])} unavailable ({e})")
+                self.unavailable.add(index)
+                return None
+        return self._poses[index]
+
+    def _available(self, index, step):
+        """First level from index in direction step whose Pose can be built"""
+        while 0 <= index < len(self.levels):
+            if index not in self.unavailable and self._pose(index) is not None:
+                return index
+            index += step
+        return None
+
+    def warm_up(self, shape=(480, 640, 3)):
+        """Initialize the current level's graph on a blank frame"""
+        self._pose(self.level).process(np.zeros(shape, dtype=np.uint8))
+        return self
+
+    def process(self, rgb):
+        now = self.clock()
+        results = self._pose(self.level).process(resize_for_level(rgb, self.levels[self.level]['width']))
+        self.latency.add((self.clock() - now) * 1000)
+        self._since_switch += 1
+        if self._since_switch >= self.window:
+            self._decide(self.clock())
+        return results
+
+    def _decide(self, now):
+        p90 = self.latency.percentiles((90,))[0]
+        self.costs[self.level] = (p90, now)
+        if p90 > self.budget_ms:
+            faster = self._available(self.level + 1, 1)
+            if faster is not None:
+                self._switch(faster, f"p90 {p90:.1f} ms over the {self.budget_ms:.1f} ms budget")
+            return
+        better = self._next_better()
+        if better is None:
+            return
+        expected = self._expected_cost(better, now, p90)
+        if expected <= self.budget_ms * self.upgrade_headroom:
+            self._switch(better, f"expected {expected:.1f} ms within the {self.budget_ms:.1f} ms budget")
+
+    def _next_better(self):
+        index = self.level - 1
+        while index >= 0 and index in self.unavailable:
+            index -= 1
+        return index if index >= 0 else None
+
+    def _expected_cost(self, index, now, current_p90):
+        cost = self.costs.get(index)
+        if cost is not None and (cost[1] is None or now - cost[1] < self.retry_s):
+            return cost[0]
+        return current_p90 * UNKNOWN_COST_FACTOR
+
+    def _switch(self, index, reason):
+        if self._pose(index) is None:
+            return
+        self.decisions.append((self.clock(), self.level, index, reason))
+        print(f"⚙ Auto-tune: {level_name(self.levels[self.level])} -> {level_name(self.levels[index])} ({reason})")
+        self.level = index
+        self.latency = RollingHistogram(self.window)
+        self._since_switch = 0
+
+    def smoothing(self, base, frame_interval_ms):
+        """Mouse smoothing that gives the same smoothing per second at the current rate as base at the target
+
+        frame_interval_ms is the time between the frames the smoothing is
+        applied to (displayed frames), not between inference calls, which
+        adaptive inference skips on still frames.
+        """
+        return 1 - (1 - base) ** (frame_interval_ms / self.target_ms)
+
+    def stats(self):
+        p50, p90 = self.latency.percentiles((50, 90))
+        return {
+            'level': self.level,
+            'level_name': level_name(self.levels[self.level]),
+            'inference_p50_ms': p50,
+            'inference_p90_ms': p90,
+            'budget_ms': self.budget_ms,
+            'switches': len(self.decisions),
+            'unavailable': sorted(self.unavailable),
+        }
+
+    def close(self):
+        for pose in self._poses.values():
+            pose.close()
+        self._poses = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def calibrate(frames, levels=None, budget_ms=AUTOTUNE_TARGET_FRAME_MS * AUTOTUNE_INFERENCE_SHARE,
+              pose_factory=create_level_pose, warmup=5):
+    """Time every level on BGR frames; returns (results, chosen level)
+
+    The chosen level is the best one whose p90 inference time fits the
+    budget, or the fastest one when none does.
+    """
+    levels = levels or AUTOTUNE_LEVELS
+    rgb_frames = [cv2.cvtColor(frame, cv2.COLOR_BGR2RGB) for frame in frames]
+    results = []
+    for level in levels:
+        try:
+            pose = pose_factory(level)
+        except Exception as e:
+            print(f"⚠ {level_name(level)}: unavailable ({e})")
+            results.append({'level': level, 'error': str(e)})
+            continue
+        for rgb in rgb_frames[:warmup]:
+            pose.process(resize_for_level(rgb, level['width']))
+        times = []
+        detected = 0
+        for rgb in rgb_frames:
+            start = time.perf_counter()
+            if pose.process(resize_for_level(rgb, level['width'])).pose_landmarks:
+                detected += 1
+            times.append((time.perf_counter() - start) * 1000)
+        pose.close()
+        results.append({
+            'level': level,
+            'mean_ms': float(np.mean(times)),
+            'p90_ms': float(np.percentile(times, 90)),
+            'detection_rate': detected / len(rgb_frames),
+        })
+
+    measured = [r for r in results if 'p90_ms' in r]
+    if not measured:
+        return results, None
+    fitting = [r for r in measured if r['p90_ms'] <= budget_ms]
+    chosen = fitting[0] if fitting else min(measured, key=lambda r: r['p90_ms'])
+    return results, chosen['level']
+
+
+def save_profile(path, results, chosen, target_ms, budget_ms):
+    with open(path, "w") as f:
+        json.dump({
+            'machine': platform.processor() or platform.machine(),
+            'cpus': os.cpu_count(),
+            'target_frame_ms': target_ms,
+            'budget_ms': budget_ms,
+            'chosen': chosen,
+            'results': results,
+        }, f, indent=2)
+
+
+def capture_frames(source, count):
+    """Read count frames from a camera index or video (looping short videos)"""
+    from camera_utils import open_frame_source
+    cap = open_frame_source(source)
+    frames = []
+    while len(frames) < count:
+        success, frame = cap.read()
+        if not success:
+            if not frames or isinstance(source, int):
+                break
+            cap.release()
+            cap = open_frame_source(source)
+            continue
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark every auto-tune level on this machine and save the best")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--camera", type=int, default=CAMERA_INDEX, help="Camera index to record frames from")
+    source.add_argument("--clip", help="Video to use instead of the camera")
+    parser.add_argument("--frames", type=int, default=150, help="Frames timed per level")
+    parser.add_argument("--target-ms", type=float, default=AUTOTUNE_TARGET_FRAME_MS, help="Target frame time")
+    parser.add_argument("--output", default=AUTOTUNE_PROFILE_PATH, help="Profile file to write")
+    args = parser.parse_args(argv)
+
+    frames = capture_frames(args.clip if args.clip else args.camera, args.frames)
+    if not frames:
+        print("ERROR: Could not read frames for calibration", file=sys.stderr)
+        return 1
+    budget_ms = args.target_ms * AUTOTUNE_INFERENCE_SHARE
+    print(f"Calibrating on {len(frames)} frames of {frames[0].shape[1]}x{frames[0].shape[0]}, "
+          f"inference budget {budget_ms:.1f} ms")
+    results, chosen = calibrate(frames, budget_ms=budget_ms)
+    if chosen is None:
+        print("ERROR: No pose model level could be loaded", file=sys.stderr)
+        return 1
+
+    print(f"{'level':<44}{'mean ms':>9}{'p90 ms':>9}{'detected':>10}")
+    for r in results:
+        if 'error' in r:
+            print(f"{level_name(r['level']):<44}{'unavailable':>28}")
+        else:
+            print(f"{level_name(r['level']):<44}{r['mean_ms']:>9.1f}{r['p90_ms']:>9.1f}{r['detection_rate']:>9.0%}")
+    save_profile(args.output, results, chosen, args.target_ms, budget_ms)
+    print(f"\n✓ Best level: {level_name(chosen)} - profile saved to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
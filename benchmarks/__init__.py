@@ -0,0 +1,4 @@
+"""
+Benchmarks for Motion Controller
+Run from the project root, e.g.: python -m benchmarks.roi_benchmark video.mp4
+"""
@@ -0,0 +1,134 @@
+"""
+Landmark filter evaluation for Motion Controller
+Replays a landmark trace through each filter and reports cursor jitter and lag
+
+Usage:
+    python -m benchmarks.filter_benchmark --trace session.trace
+    python -m benchmarks.filter_benchmark --frames 3000 --output filters.json
+"""
+
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+
+from landmark_filters import LandmarkFilter
+from landmark_utils import RIGHT_WRIST, X, Y, synthetic_landmark_stream
+from trace_utils import TraceReader
+from config import SCREEN_WIDTH, SCREEN_HEIGHT, MOUSE_SMOOTHING, FILTER_PREDICTION_LEAD
+
+
+def load_stream(args):
+    """Return (landmarks, timestamps) from a recorded trace or a synthetic 30 FPS stream"""
+    if args.trace:
+        with TraceReader(args.trace) as reader:
+            return np.array(reader.landmarks[:args.frames]), np.array(reader.timestamps[:args.frames])
+    stream = synthetic_landmark_stream(args.frames, seed=args.seed)
+    return stream, np.arange(len(stream)) / 30.0
+
+
+def cursor_track(points):
+    """Right wrist position in screen pixels, as the mouse mode maps it"""
+    return np.stack([(1 - points[:, RIGHT_WRIST, X]) * SCREEN_WIDTH,
+                     points[:, RIGHT_WRIST, Y] * SCREEN_HEIGHT], axis=1).astype(np.float64)
+
+
+def run_exponential(stream, smoothing):
+    """The fixed lerp smoothing used by handle_mouse_mode"""
+    raw = cursor_track(stream)
+    out = np.full_like(raw, np.nan)
+    current = None
+    for i, target in enumerate(raw):
+        if np.isnan(target[0]):
+            continue  # The cursor keeps its position while no pose is detected
+        current = target.copy() if current is None else current + (target - current) * smoothing
+        out[i] = current
+    return out
+
+
+def run_filter(stream, timestamps, kind, lead):
+    landmark_filter = LandmarkFilter(kind, lead=lead)
+    out = np.full((len(stream), 2), np.nan)
+    for i in range(len(stream)):
+        filtered = landmark_filter.apply(stream[i], timestamps[i])
+        if filtered is not None:
+            out[i] = cursor_track(filtered[None])[0]
+    return out
+
+
+def jitter(track):
+    """RMS of the frame-to-frame acceleration in pixels"""
+    accel = track[2:] - 2 * track[1:-1] + track[:-2]
+    accel = accel[np.isfinite(accel).all(axis=1)]
+    return float(np.sqrt((accel ** 2).sum(axis=1).mean())) if len(accel) else 0.0
+
+
+def lag(track, raw, timestamps, shifts=np.arange(-0.1, 0.2, 0.0025)):
+    """Time shift (ms) of the raw track that best explains the filtered one (negative = leading)"""
+    valid = np.isfinite(raw[:, 0])
+    best_shift, best_error = 0.0, np.inf
+    for shift in shifts:
+        reference = np.stack([np.interp(timestamps - shift, timestamps[valid], raw[valid, c]) for c in range(2)], axis=1)
+        diff = track - reference
+        error = np.nanmean((diff ** 2).sum(axis=1))
+        if error < best_error:
+            best_shift, best_error = shift, error
+    return best_shift * 1000
+
+
+def evaluate(name, track, raw, timestamps, elapsed):
+    diff = track - raw
+    return {
+        'name': name,
+        'jitter_px': jitter(track),
+        'lag_ms': lag(track, raw, timestamps),
+        'rms_deviation_px': float(np.sqrt(np.nanmean((diff ** 2).sum(axis=1)))),
+        'us_per_frame': elapsed / len(track) * 1e6,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare landmark filters on a replayed trace")
+    parser.add_argument("--trace", help="Recorded landmark trace (default: synthetic stream)")
+    parser.add_argument("--frames", type=int, default=3000, help="Frames to replay")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the synthetic stream")
+    parser.add_argument("--lead", type=float, default=FILTER_PREDICTION_LEAD,
+                        help="Forward prediction in seconds for the predictive variants")
+    parser.add_argument("--output", help="Save results as JSON")
+    args = parser.parse_args(argv)
+
+    stream, timestamps = load_stream(args)
+    raw = cursor_track(stream)
+
+    cases = [
+        ('raw', lambda: raw),
+        (f'exponential({MOUSE_SMOOTHING})', lambda: run_exponential(stream, MOUSE_SMOOTHING)),
+        ('one_euro', lambda: run_filter(stream, timestamps, 'one_euro', 0.0)),
+        (f'one_euro+lead', lambda: run_filter(stream, timestamps, 'one_euro', args.lead)),
+        ('kalman', lambda: run_filter(stream, timestamps, 'kalman', 0.0)),
+        (f'kalman+lead', lambda: run_filter(stream, timestamps, 'kalman', args.lead)),
+    ]
+    results = []
+    for name, run in cases:
+        start = time.perf_counter()
+        track = run()
+        results.append(evaluate(name, track, raw, timestamps, time.perf_counter() - start))
+
+    print(f"{len(stream)} frames, lead {args.lead * 1000:.0f} ms")
+    print(f"{'filter':<22}{'jitter px':>11}{'lag ms':>9}{'dev px':>9}{'us/frame':>10}")
+    for r in results:
+        print(f"{r['name']:<22}{r['jitter_px']:>11.2f}{r['lag_ms']:>9.1f}"
+              f"{r['rms_deviation_px']:>9.2f}{r['us_per_frame']:>10.1f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({'source': args.trace or f"synthetic(seed={args.seed})", 'frames': len(stream),
+                       'lead_s': args.lead, 'filters': results}, f, indent=2)
+        print(f"\nResults saved to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,268 @@
+"""
+Gesture engine benchmark for Motion Controller
+Replays landmark streams through extract_landmarks and GestureController with a null input backend
+
+Usage:
+    python -m benchmarks.gesture_benchmark --frames 20000 --output results.json
+    python -m benchmarks.gesture_benchmark --compare results.json
+    python -m benchmarks.gesture_benchmark --e2e [--clip clip.mp4]
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from camera_utils import extract_landmarks
+from gesture_controller import GestureController
+from input_helpers import NullBackend
+from landmark_utils import LandmarkFrame, landmarks_from_array, synthetic_landmark_stream
+from trace_utils import TraceReader
+from config import SCREEN_WIDTH, SCREEN_HEIGHT, MOUSE_SMOOTHING
+
+
+class FakeResults:
+    """Mimics a MediaPipe result; pose_landmarks is the same protobuf message MediaPipe returns"""
+
+    def __init__(self, points):
+        from mediapipe.framework.formats import landmark_pb2
+
+        if np.isnan(points[0, 0]):
+            self.pose_landmarks = None
+        else:
+            self.pose_landmarks = landmark_pb2.NormalizedLandmarkList()
+            for x, y, z, visibility in points.tolist():
+                self.pose_landmarks.landmark.add(x=x, y=y, z=z, visibility=visibility, presence=visibility)
+
+
+def load_stream(args):
+    """Load a landmark stream from a recorded trace or generate a synthetic one"""
+    if args.trace:
+        with TraceReader(args.trace) as reader:
+            return np.array(reader.landmarks[:args.frames])
+    return synthetic_landmark_stream(args.frames, seed=args.seed)
+
+
+def build_cases(stream):
+    """Return benchmark cases as name -> (callable taking a frame index, frame count)"""
+    results = [FakeResults(points) for points in stream]
+    frames = [lm for lm in (landmarks_from_array(points) for points in stream) if lm is not None]
+    keyboard = GestureController(NullBackend())
+    mouse = GestureController(NullBackend())
+    landmark_frame = LandmarkFrame()
+
+    def run_extract(i):
+        extract_landmarks(results[i], out=landmark_frame)
+
+    def run_depth(i):
+        keyboard.check_depth(frames[i].nose.z)
+
+    def run_keyboard(i):
+        lm = frames[i]
+        keyboard.handle_keyboard_mode(lm, lm.nose.x_mirror, 480, False, SCREEN_WIDTH, SCREEN_HEIGHT)
+
+    def run_mouse(i):
+        lm = frames[i]
+        mouse.handle_mouse_mode(lm, lm.nose.x_mirror, SCREEN_WIDTH, SCREEN_HEIGHT, MOUSE_SMOOTHING)
+
+    return {
+        'extract_landmarks': (run_extract, len(results)),
+        'check_depth': (run_depth, len(frames)),
+        'keyboard_mode': (run_keyboard, len(frames)),
+        'mouse_mode': (run_mouse, len(frames)),
+    }
+
+
+def measure(fn, count, warmup=200):
+    """Time fn per frame and measure memory allocated per frame"""
+    for i in range(min(warmup, count)):
+        fn(i)
+
+    timings = np.empty(count, dtype=np.int64)
+    clock = time.perf_counter_ns
+    for i in range(count):
+        start = clock()
+        fn(i)
+        timings[i] = clock() - start
+
+    # Separate pass - tracemalloc slows every allocation down
+    tracemalloc.start()
+    peak_bytes = 0
+    retained_bytes = 0
+    for i in range(count):
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        fn(i)
+        current, peak = tracemalloc.get_traced_memory()
+        peak_bytes += peak - before
+        retained_bytes += current - before
+    tracemalloc.stop()
+
+    timings_us = timings / 1000.0
+    return {
+        'frames': count,
+        'mean_us': float(timings_us.mean()),
+        'p50_us': float(np.percentile(timings_us, 50)),
+        'p90_us': float(np.percentile(timings_us, 90)),
+        'p99_us': float(np.percentile(timings_us, 99)),
+        'max_us': float(timings_us.max()),
+        'fps': float(1e6 / timings_us.mean()),
+        'alloc_bytes_per_frame': peak_bytes / count,
+        'retained_bytes_per_frame': retained_bytes / count,
+    }
+
+
+def make_synthetic_clip(path, num_frames=90, size=(640, 480)):
+    """Render a short clip of a moving stick figure for the end-to-end case"""
+    import cv2
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), 30, size)
+    w, h = size
+    for i in range(num_frames):
+        img = np.full((h, w, 3), 90, dtype=np.uint8)
+        cx = w // 2 + int(40 * np.sin(i / 10))
+        arm = int(80 * np.sin(i / 7))
+        cv2.circle(img, (cx, 120), 35, (180, 200, 230), -1)
+        cv2.line(img, (cx, 155), (cx, 320), (60, 60, 160), 30)
+        cv2.line(img, (cx, 190), (cx - 110, 190 - arm), (180, 200, 230), 14)
+        cv2.line(img, (cx, 190), (cx + 110, 190 + arm), (180, 200, 230), 14)
+        cv2.line(img, (cx, 320), (cx - 50, 460), (40, 40, 40), 20)
+        cv2.line(img, (cx, 320), (cx + 50, 460), (40, 40, 40), 20)
+        writer.write(img)
+    writer.release()
+
+
+def run_end_to_end(clip_path):
+    """Run MediaPipe pose over a clip and split per-frame time into inference and our own code"""
+    import cv2
+    import mediapipe as mp
+    from config import MIN_DETECTION_CONFIDENCE, MIN_TRACKING_CONFIDENCE
+
+    cap = cv2.VideoCapture(clip_path)
+    controller = GestureController(NullBackend())
+    convert_ms, inference_ms, own_ms = [], [], []
+    landmark_frame = LandmarkFrame()
+    detected = 0
+
+    with mp.solutions.pose.Pose(min_detection_confidence=MIN_DETECTION_CONFIDENCE,
+                                min_tracking_confidence=MIN_TRACKING_CONFIDENCE) as pose:
+        while True:
+            success, frame = cap.read()
+            if not success:
+                break
+            t0 = time.perf_counter()
+            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            t1 = time.perf_counter()
+            results = pose.process(rgb)
+            t2 = time.perf_counter()
+            landmarks = extract_landmarks(results, out=landmark_frame)
+            if landmarks:
+                detected += 1
+                controller.process_frame(landmarks, False, frame.shape[0],
+                                         SCREEN_WIDTH, SCREEN_HEIGHT, MOUSE_SMOOTHING)
+            t3 = time.perf_counter()
+            convert_ms.append((t1 - t0) * 1000)
+            inference_ms.append((t2 - t1) * 1000)
+            own_ms.append((t3 - t2) * 1000)
+    cap.release()
+
+    if not inference_ms:
+        return None
+    total = np.array(convert_ms) + np.array(inference_ms) + np.array(own_ms)
+    return {
+        'clip': os.path.basename(clip_path),
+        'frames': len(inference_ms),
+        'detected': detected,
+        'fps': float(1000 / total.mean()),
+        'convert_ms_mean': float(np.mean(convert_ms)),
+        'inference_ms_mean': float(np.mean(inference_ms)),
+        'inference_ms_p95': float(np.percentile(inference_ms, 95)),
+        'own_code_ms_mean': float(np.mean(own_ms)),
+        'inference_share': float(np.sum(inference_ms) / total.sum()),
+        'own_code_share': float(np.sum(own_ms) / total.sum()),
+    }
+
+
+def git_revision():
+    """Return the current git commit, or None outside a repository"""
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(report, baseline=None):
+    """Print a results table, with the change against a baseline if given"""
+    print(f"{'case':<20}{'p50 us':>10}{'p99 us':>10}{'FPS':>12}{'alloc B':>10}{'change':>10}")
+    for name, r in report['cases'].items():
+        change = ""
+        if baseline and name in baseline.get('cases', {}):
+            old = baseline['cases'][name]['p50_us']
+            change = f"{(r['p50_us'] - old) / old * 100:+.1f}%"
+        print(f"{name:<20}{r['p50_us']:>10.2f}{r['p99_us']:>10.2f}{r['fps']:>12.0f}"
+              f"{r['alloc_bytes_per_frame']:>10.0f}{change:>10}")
+    e2e = report.get('end_to_end')
+    if e2e:
+        print(f"\nEnd-to-end on {e2e['clip']} ({e2e['frames']} frames, pose in {e2e['detected']}): "
+              f"{e2e['fps']:.1f} FPS")
+        print(f"  inference {e2e['inference_ms_mean']:.2f} ms ({e2e['inference_share'] * 100:.1f}%), "
+              f"own code {e2e['own_code_ms_mean']:.3f} ms ({e2e['own_code_share'] * 100:.2f}%)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the gesture engine over landmark streams")
+    parser.add_argument("--frames", type=int, default=20000, help="Frames to replay")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the synthetic stream")
+    parser.add_argument("--trace", help="Replay a recorded landmark trace instead of synthetic data")
+    parser.add_argument("--output", help="Save results as JSON")
+    parser.add_argument("--compare", help="Compare against a previously saved JSON result")
+    parser.add_argument("--e2e", action="store_true", help="Also run MediaPipe pose over a clip")
+    parser.add_argument("--clip", help="Clip for the end-to-end case (default: synthetic clip)")
+    args = parser.parse_args(argv)
+
+    stream = load_stream(args)
+    report = {
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'source': args.trace or f"synthetic(seed={args.seed})",
+        'cases': {},
+    }
+    # Controller status messages would otherwise flood the results table
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for name, (fn, count) in build_cases(stream).items():
+            report['cases'][name] = measure(fn, count)
+
+    if args.e2e:
+        if args.clip:
+            report['end_to_end'] = run_end_to_end(args.clip)
+        else:
+            with tempfile.TemporaryDirectory() as tmp:
+                clip = os.path.join(tmp, 'synthetic_clip.mp4')
+                make_synthetic_clip(clip)
+                report['end_to_end'] = run_end_to_end(clip)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_results(report, baseline)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults saved to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,60 @@
+"""
+Render benchmark for Motion Controller
+Compares uncached overlay drawing with the cached overlays from ui_helpers
+
+Usage: python -m benchmarks.render_benchmark [--iterations 2000]
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from config import DEADZONE, UP_THRESHOLD, DOWN_THRESHOLD
+from ui_helpers import (
+    draw_instructions, render_instructions, draw_ui_controls, render_ui_controls,
+    draw_control_zones, draw_zone_lines, render_zone_labels
+)
+
+
+def measure(fn, iterations):
+    """Return mean microseconds per call"""
+    fn()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark cached vs uncached UI overlays")
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    args = parser.parse_args()
+
+    w, h = args.width, args.height
+    image = np.random.default_rng(0).integers(0, 255, (h, w, 3), dtype=np.uint8)
+    zones = (w, h, w // 2, h // 3, h * 2 // 3, DEADZONE, UP_THRESHOLD, DOWN_THRESHOLD, False)
+
+    def zones_uncached():
+        draw_zone_lines(image, *zones)
+        render_zone_labels(image, w, h, False)
+
+    cases = [
+        ("instructions", lambda: render_instructions(), lambda: draw_instructions()),
+        ("ui_controls", lambda: render_ui_controls(image, w, h, True, False),
+         lambda: draw_ui_controls(image, w, h, True, False)),
+        ("control_zones", zones_uncached, lambda: draw_control_zones(image, *zones)),
+    ]
+
+    print(f"{'overlay':<16}{'uncached us':>14}{'cached us':>12}{'saved us':>12}")
+    for name, uncached, cached in cases:
+        iterations = args.iterations if name != "instructions" else max(args.iterations // 10, 1)
+        before = measure(uncached, iterations)
+        after = measure(cached, args.iterations)
+        print(f"{name:<16}{before:>14.1f}{after:>12.1f}{before - after:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+ROI inference benchmark for Motion Controller
+Compares full-frame and ROI-tracked pose inference latency on a recorded video
+
+Usage: python -m benchmarks.roi_benchmark video.mp4 [--frames 300]
+"""
+
+import argparse
+import time
+
+import cv2
+import numpy as np
+import mediapipe as mp
+
+from config import MIN_DETECTION_CONFIDENCE, MIN_TRACKING_CONFIDENCE
+from pose_utils import RoiPoseEstimator
+from landmark_utils import TRACKED_LANDMARKS
+
+
+def load_frames(path, max_frames):
+    """Decode up to max_frames RGB frames from a video file"""
+    cap = cv2.VideoCapture(path)
+    frames = []
+    while len(frames) < max_frames:
+        success, frame = cap.read()
+        if not success:
+            break
+        frames.append(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+    cap.release()
+    return frames
+
+
+def run_pass(frames, use_roi):
+    """Run pose inference over all frames, return per-frame latencies and tracked landmarks"""
+    latencies = []
+    tracked = []
+    with mp.solutions.pose.Pose(min_detection_confidence=MIN_DETECTION_CONFIDENCE,
+                                min_tracking_confidence=MIN_TRACKING_CONFIDENCE) as pose:
+        estimator = RoiPoseEstimator(pose) if use_roi else pose
+        for rgb in frames:
+            start = time.perf_counter()
+            results = estimator.process(rgb)
+            latencies.append((time.perf_counter() - start) * 1000)
+            if results.pose_landmarks:
+                lm = results.pose_landmarks.landmark
+                tracked.append([(lm[i].x, lm[i].y) for i in TRACKED_LANDMARKS])
+            else:
+                tracked.append(None)
+        stats = estimator.stats() if use_roi else None
+    return np.array(latencies), tracked, stats
+
+
+def summarize(name, latencies):
+    """Print latency percentiles for one pass"""
+    print(f"{name:<12} mean {latencies.mean():7.2f} ms | p50 {np.percentile(latencies, 50):7.2f} ms | "
+          f"p95 {np.percentile(latencies, 95):7.2f} ms | {1000 / latencies.mean():6.1f} FPS")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare full-frame and ROI pose inference latency")
+    parser.add_argument("video", help="Recorded video file")
+    parser.add_argument("--frames", type=int, default=300, help="Maximum frames to process")
+    args = parser.parse_args()
+
+    frames = load_frames(args.video, args.frames)
+    if not frames:
+        print(f"ERROR: No frames could be read from {args.video}")
+        return
+
+    print(f"Benchmarking {len(frames)} frames ({frames[0].shape[1]}x{frames[0].shape[0]})")
+    full_lat, full_tracked, _ = run_pass(frames, use_roi=False)
+    roi_lat, roi_tracked, roi_stats = run_pass(frames, use_roi=True)
+
+    summarize("full-frame", full_lat)
+    summarize("roi", roi_lat)
+    print(f"Speedup: {full_lat.mean() / roi_lat.mean():.2f}x")
+    print(f"ROI passes: {roi_stats['roi_passes']}, full passes: {roi_stats['full_passes']}, "
+          f"tracking lost: {roi_stats['tracking_lost']}")
+
+    # Landmark agreement between the two modes on frames where both found a pose
+    diffs = [np.abs(np.array(a) - np.array(b)).max()
+             for a, b in zip(full_tracked, roi_tracked) if a is not None and b is not None]
+    if diffs:
+        print(f"Max landmark difference: mean {np.mean(diffs):.4f}, worst {np.max(diffs):.4f} (normalized)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Pose worker benchmark for Motion Controller
+Compares single-process pose inference throughput with the multiprocess worker pool
+
+Usage:
+    python -m benchmarks.worker_benchmark --workers 1 2 4
+    python -m benchmarks.worker_benchmark --clip session.mp4 --frames 300 --output workers.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import cv2
+
+from benchmarks.gesture_benchmark import make_synthetic_clip
+from pose_workers import PoseWorkerPool, create_pose
+
+
+def load_frames(clip_path, count):
+    """Decode up to count frames, looping the clip if it is shorter"""
+    cap = cv2.VideoCapture(clip_path)
+    frames = []
+    while True:
+        success, frame = cap.read()
+        if not success:
+            break
+        frames.append(frame)
+    cap.release()
+    if not frames:
+        raise SystemExit(f"Could not read frames from {clip_path}")
+    return [frames[i % len(frames)] for i in range(count)]
+
+
+def run_single(frames):
+    """Convert and infer every frame in this process"""
+    pose = create_pose()
+    pose.process(cv2.cvtColor(frames[0], cv2.COLOR_BGR2RGB))  # Model warm-up
+    detected = 0
+    start = time.perf_counter()
+    for frame in frames:
+        if pose.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)).pose_landmarks:
+            detected += 1
+    elapsed = time.perf_counter() - start
+    pose.close()
+    return {'mode': 'single', 'workers': 0, 'fps': len(frames) / elapsed, 'detected': detected}
+
+
+def run_pool(frames, num_workers):
+    """Feed frames through the worker pool, keeping every slot busy"""
+    with PoseWorkerPool(num_workers) as pool:
+        # Warm up every worker (process start and model load are not part of the throughput)
+        for _ in range(pool.num_slots):
+            pool.submit(frames[0])
+        while pool.in_flight():
+            pool.get()
+
+        detected = 0
+        completed = 0
+        start = time.perf_counter()
+        for frame in frames:
+            while not pool.can_submit():
+                detected += pool.get().landmarks is not None
+                completed += 1
+            pool.submit(frame)
+        while pool.in_flight():
+            detected += pool.get().landmarks is not None
+            completed += 1
+        elapsed = time.perf_counter() - start
+        stats = pool.stats()
+    return {'mode': 'pool', 'workers': num_workers, 'fps': completed / elapsed, 'detected': detected,
+            'restarts': stats['restarts']}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare single-process and multiprocess pose inference")
+    parser.add_argument("--clip", help="Video to process (default: synthetic clip)")
+    parser.add_argument("--frames", type=int, default=300, help="Frames to process per run")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="Worker counts to test")
+    parser.add_argument("--output", help="Save results as JSON")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        clip = args.clip
+        if clip is None:
+            clip = os.path.join(tmp, 'synthetic_clip.mp4')
+            make_synthetic_clip(clip)
+        frames = load_frames(clip, args.frames)
+
+    results = [run_single(frames)]
+    for num_workers in args.workers:
+        results.append(run_pool(frames, num_workers))
+
+    baseline = results[0]['fps']
+    print(f"{len(frames)} frames of {frames[0].shape[1]}x{frames[0].shape[0]}, {os.cpu_count()} CPUs")
+    print(f"{'mode':<12}{'workers':>8}{'FPS':>10}{'speedup':>10}{'detected':>10}")
+    for r in results:
+        print(f"{r['mode']:<12}{r['workers']:>8}{r['fps']:>10.1f}{r['fps'] / baseline:>9.2f}x{r['detected']:>10}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({'frames': len(frames), 'cpus': os.cpu_count(), 'results': results}, f, indent=2)
+        print(f"\nResults saved to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,357 @@
+"""
+Threshold calibration for Motion Controller
+Grid or random searches of the gesture thresholds over labelled recorded sessions, spread over a process pool
+
+Usage:
+    python calibration.py venue1.trace venue2.trace --search grid --steps 5
+    python calibration.py sessions/*.trace --search random --samples 3000 --output calibration_profile.json
+
+Labels of a session are read from <trace>.labels.json next to the trace:
+    {"segments": [{"start": 12.4, "end": 13.1, "gesture": "LEFT"}, ...]}
+with start and end in the trace's timestamps (seconds) and gesture the name
+of a keyboard binding (LEFT, RIGHT, UP, DOWN or MOUSE CLICK by default).
+--recorded-labels uses the gestures recognised while recording instead,
+which favours the thresholds the session was recorded with.
+
+Frames recorded in mouse mode are not scored. With the default keyboard
+bindings and no debouncing the candidates are scored by the vectorized
+classifier (gesture_batch.py); otherwise every candidate runs through
+GestureController frame by frame, which is much slower.
+"""
+
+import argparse
+import contextlib
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from config import (
+    DEADZONE, UP_THRESHOLD, DOWN_THRESHOLD, MIN_Z, MAX_Z, KEYBOARD_BINDINGS, CALIBRATION_PROFILE_PATH,
+    CALIBRATION_RANGES, CALIBRATION_WEIGHTS, CALIBRATION_TOLERANCE_FRAMES
+)
+from gesture_batch import KEY_NAMES, classify_keyboard_batch, count_key_events, matches_config
+from landmark_utils import LandmarkFrame, landmarks_from_array
+from trace_utils import FLAG_MOUSE_MODE, TraceReader, trace_gesture_names
+
+# Thresholds a profile sets (GestureController arguments)
+PARAMETERS = ('deadzone', 'up_threshold', 'down_threshold', 'min_z', 'max_z')
+DEFAULTS = {'deadzone': DEADZONE, 'up_threshold': UP_THRESHOLD, 'down_threshold': DOWN_THRESHOLD,
+            'min_z': MIN_Z, 'max_z': MAX_Z}
+# Gesture codes of labels and results (the batch classifier's codes come first)
+GESTURE_NAMES = trace_gesture_names(binding.get('name') for binding in KEYBOARD_BINDINGS)
+GESTURE_CODES = {name: code for code, name in enumerate(GESTURE_NAMES)}
+# Logical keys each keyboard binding presses
+GESTURE_KEYS = {b['name']: tuple(b.get('keys', ())) for b in KEYBOARD_BINDINGS if b.get('name')}
+LABELS_SUFFIX = '.labels.json'
+# Score components, in the order Session.score returns them
+COUNTS = ('false_triggers', 'missed', 'churn')
+
+
+def labels_path(trace_path):
+    return os.path.splitext(trace_path)[0] + LABELS_SUFFIX
+
+
+def load_labels(trace_path, timestamps, recorded=None):
+    """Per-frame expected gesture code of a session and where the labels came from
+
+    recorded (the gesture names recognised while recording) is used when
+    given; otherwise the labels file is required.
+    """
+    if recorded is not None:
+        return np.array([GESTURE_CODES.get(name, 0) for name in recorded], dtype=np.int8), "recorded gestures"
+    path = labels_path(trace_path)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No labels for {trace_path} (expected {path}; --recorded-labels uses "
+                                f"the recorded gestures instead)")
+    with open(path) as f:
+        segments = json.load(f)['segments']
+    labels = np.zeros(len(timestamps), dtype=np.int8)
+    for segment in segments:
+        if segment['gesture'] not in GESTURE_CODES:
+            raise ValueError(f"{path}: unknown gesture {segment['gesture']!r}")
+        inside = (timestamps >= segment['start']) & (timestamps <= segment['end'])
+        labels[inside] = GESTURE_CODES[segment['gesture']]
+    return labels, path
+
+
+def _runs(values):
+    """(starts, ends, values) of the runs of equal non-zero values"""
+    edges = np.flatnonzero(np.diff(values, prepend=0, append=0) != 0)
+    starts, ends = edges[:-1], edges[1:]
+    codes = values[starts]
+    keep = codes != 0
+    return starts[keep], ends[keep], codes[keep]
+
+
+def _any_in_windows(mask, starts, ends, tolerance):
+    """For each [start, end) window widened by tolerance frames, whether mask is set anywhere in it"""
+    counts = np.concatenate(([0], np.cumsum(mask)))
+    low = np.clip(starts - tolerance, 0, len(mask))
+    high = np.clip(ends + tolerance, 0, len(mask))
+    return counts[high] > counts[low]
+
+
+class Session:
+    """Keyboard-mode landmarks and per-frame gesture labels of one recorded session
+
+    batch selects the vectorized classifier, which is only exact while
+    gesture_batch.matches_config(); otherwise frames run through
+    GestureController with the config bindings and debouncing.
+    """
+
+    def __init__(self, path, recorded_labels=False, batch=None):
+        self.path = path
+        self.batch = matches_config() if batch is None else batch
+        with TraceReader(path) as trace:
+            recorded = trace.gesture_names() if recorded_labels else None
+            labels, self.label_source = load_labels(path, np.array(trace.timestamps), recorded)
+            keyboard = (np.asarray(trace.flags) & FLAG_MOUSE_MODE) == 0
+            self.landmarks = np.array(trace.landmarks[keyboard])
+            self.timestamps = np.array(trace.timestamps[keyboard])
+        self.mouse_frames = int((~keyboard).sum())
+        self.labels = labels[keyboard]
+        self.segments = _runs(self.labels)
+        if self.batch:
+            self.key_names = KEY_NAMES
+        else:
+            self.key_names = list(dict.fromkeys(key for keys in GESTURE_KEYS.values() for key in keys))
+        # Key events of a perfect run: one press and one release per labelled key gesture
+        keys = np.zeros((len(self.labels), len(self.key_names)), dtype=bool)
+        for name, pressed in GESTURE_KEYS.items():
+            for key in pressed:
+                keys[self.labels == GESTURE_CODES[name], self.key_names.index(key)] = True
+        self.ideal_key_events = count_key_events(keys)
+
+    def __len__(self):
+        return len(self.labels)
+
+    def classify(self, thresholds):
+        """(active gesture code, held keys) per frame with these thresholds"""
+        if self.batch:
+            result = classify_keyboard_batch(self.landmarks, **thresholds)
+            return result['active'], result['keys']
+
+        from gesture_controller import GestureController
+        from input_helpers import RecordingBackend
+
+        backend = RecordingBackend()
+        controller = GestureController(backend, **thresholds)
+        active = np.zeros(len(self), dtype=np.int8)
+        keys = np.zeros((len(self), len(self.key_names)), dtype=bool)
+        frame = LandmarkFrame()
+        pressed = controller.keys_pressed
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            for i in range(len(self)):
+                landmarks = landmarks_from_array(self.landmarks[i], out=frame)
+                if landmarks is not None:
+                    _, _, gesture = controller.process_frame(landmarks, False, 480, 1920, 1080, 1.0,
+                                                             capture_time=float(self.timestamps[i]))
+                    active[i] = GESTURE_CODES.get(gesture, 0)
+                    backend.clear()
+                keys[i] = [pressed[key] for key in self.key_names]
+        return active, keys
+
+    def score(self, thresholds, tolerance=CALIBRATION_TOLERANCE_FRAMES):
+        """(false triggers, missed gestures, key-event churn) of the keyboard gestures with these thresholds
+
+        A recognised gesture starting more than tolerance frames away from
+        a segment labelled with it is a false trigger; a labelled segment
+        without the gesture recognised within tolerance frames is missed.
+        Churn is the key events beyond those a perfect run would send.
+        """
+        active, held = self.classify(thresholds)
+        onset_starts, _, onset_codes = _runs(active)
+        false_triggers = 0
+        for code in np.unique(onset_codes):
+            starts = onset_starts[onset_codes == code]
+            false_triggers += int((~_any_in_windows(self.labels == code, starts, starts + 1, tolerance)).sum())
+        missed = 0
+        starts, ends, codes = self.segments
+        for code in np.unique(codes):
+            matching = codes == code
+            missed += int((~_any_in_windows(active == code, starts[matching], ends[matching], tolerance)).sum())
+        churn = max(count_key_events(held) - self.ideal_key_events, 0)
+        return false_triggers, missed, churn
+
+
+def weighted_score(counts, weights=CALIBRATION_WEIGHTS):
+    return sum(weights[name] * counts[name] for name in COUNTS)
+
+
+def grid_candidates(ranges, steps):
+    """Every combination of steps evenly spaced values per threshold"""
+    axes = [np.linspace(*ranges[name], steps).round(4).tolist() for name in PARAMETERS]
+    return [dict(zip(PARAMETERS, values)) for values in itertools.product(*axes)]
+
+
+def random_candidates(ranges, count, seed=0):
+    """count uniformly sampled threshold settings"""
+    rng = np.random.default_rng(seed)
+    columns = [rng.uniform(*ranges[name], count).round(4) for name in PARAMETERS]
+    return [dict(zip(PARAMETERS, values)) for values in zip(*(c.tolist() for c in columns))]
+
+
+# Sessions loaded once per worker process
+_worker_sessions = None
+_worker_tolerance = CALIBRATION_TOLERANCE_FRAMES
+
+
+def _init_worker(paths, tolerance, recorded_labels=False):
+    global _worker_sessions, _worker_tolerance
+    _worker_sessions = [Session(path, recorded_labels) for path in paths]
+    _worker_tolerance = tolerance
+
+
+def _score_chunk(candidates):
+    """Summed counts over all sessions for each candidate of a chunk"""
+    scored = []
+    for thresholds in candidates:
+        totals = [0] * len(COUNTS)
+        for session in _worker_sessions:
+            for i, count in enumerate(session.score(thresholds, _worker_tolerance)):
+                totals[i] += count
+        scored.append(dict(zip(COUNTS, totals)))
+    return scored
+
+
+def run_sweep(paths, candidates, workers=None, tolerance=CALIBRATION_TOLERANCE_FRAMES, progress=None,
+              recorded_labels=False):
+    """Counts per candidate, scored on a pool of worker processes (in this process with workers=1)"""
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        _init_worker(paths, tolerance, recorded_labels)
+        return _score_chunk(candidates)
+
+    # Small chunks keep every worker busy to the end; each one still scores many settings per task
+    size = max(1, min(64, len(candidates) // (workers * 8)))
+    chunks = [candidates[i:i + size] for i in range(0, len(candidates), size)]
+    results = [None] * len(chunks)
+    done = 0
+    context = multiprocessing.get_context('spawn')  # Same behaviour on Windows and Linux
+    with ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker,
+                             initargs=(paths, tolerance, recorded_labels)) as pool:
+        futures = {pool.submit(_score_chunk, chunk): i for i, chunk in enumerate(chunks)}
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
+            done += len(chunks[futures[future]])
+            if progress is not None:
+                progress(done, len(candidates))
+    return [counts for chunk in results for counts in chunk]
+
+
+def load_calibration(path=CALIBRATION_PROFILE_PATH):
+    """Calibrated thresholds saved by calibration.py as GestureController arguments ({} when there are none)"""
+    try:
+        with open(path) as f:
+            thresholds = json.load(f)['thresholds']
+    except (OSError, ValueError, KeyError, TypeError):
+        return {}
+    return {name: float(thresholds[name]) for name in PARAMETERS if name in thresholds}
+
+
+def save_calibration(path, best, baseline, ranking, sessions, search):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({
+            'thresholds': best['thresholds'],
+            'score': best['score'],
+            'counts': best['counts'],
+            'baseline': baseline,
+            'search': search,
+            'sessions': [{'path': s.path, 'frames': len(s), 'mouse_frames': s.mouse_frames,
+                          'labels': s.label_source, 'gestures': len(s.segments[0])} for s in sessions],
+            'top': ranking,
+        }, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def format_counts(counts):
+    return ", ".join(f"{name.replace('_', ' ')} {counts[name]}" for name in COUNTS)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Search gesture thresholds on labelled recorded sessions")
+    parser.add_argument("traces", nargs="+", help="Landmark trace files (labels in <trace>.labels.json)")
+    parser.add_argument("--search", choices=("grid", "random"), default="grid", help="Search strategy")
+    parser.add_argument("--steps", type=int, default=5, help="Values per threshold in a grid search")
+    parser.add_argument("--samples", type=int, default=2000, help="Settings tried by a random search")
+    parser.add_argument("--seed", type=int, default=0, help="Random search seed")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Worker processes")
+    parser.add_argument("--tolerance", type=int, default=CALIBRATION_TOLERANCE_FRAMES,
+                        help="Frames a gesture may start before or end after its label")
+    parser.add_argument("--top", type=int, default=5, help="Best settings to print")
+    parser.add_argument("--output", default=CALIBRATION_PROFILE_PATH, help="Profile file to write")
+    parser.add_argument("--recorded-labels", action="store_true",
+                        help="Use the gestures recognised while recording as labels (no labels files)")
+    args = parser.parse_args(argv)
+
+    try:
+        sessions = [Session(path, args.recorded_labels) for path in args.traces]
+    except (FileNotFoundError, ValueError) as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 1
+    frames = sum(len(s) for s in sessions)
+    for session in sessions:
+        excluded = f", {session.mouse_frames} mouse mode frames skipped" if session.mouse_frames else ""
+        print(f"{session.path}: {len(session)} frames, {len(session.segments[0])} labelled gestures "
+              f"({session.label_source}{excluded})")
+    if args.recorded_labels:
+        print("⚠ Labels are the recorded gestures: the thresholds used while recording score best by construction")
+    if not sessions[0].batch:
+        print("⚠ Custom keyboard bindings or debouncing: every setting runs through the gesture controller "
+              "frame by frame (slow)")
+    if not any(len(s.segments[0]) for s in sessions):
+        print("ERROR: No labelled gestures in the sessions", file=sys.stderr)
+        return 1
+
+    if args.search == "grid":
+        candidates = grid_candidates(CALIBRATION_RANGES, args.steps)
+        search = {'strategy': 'grid', 'steps': args.steps}
+    else:
+        candidates = random_candidates(CALIBRATION_RANGES, args.samples, args.seed)
+        search = {'strategy': 'random', 'samples': args.samples, 'seed': args.seed}
+    search['ranges'] = CALIBRATION_RANGES
+    search['weights'] = CALIBRATION_WEIGHTS
+    search['tolerance_frames'] = args.tolerance
+    # The current config is scored with the candidates as the baseline
+    candidates.insert(0, dict(DEFAULTS))
+
+    print(f"⚙ Scoring {len(candidates)} settings on {frames} frames with {args.workers} workers...")
+    start = time.perf_counter()
+    last_report = [start]
+
+    def progress(done, total):
+        now = time.perf_counter()
+        if now - last_report[0] >= 5.0:
+            last_report[0] = now
+            print(f"  {done}/{total} settings ({done / (now - start):.0f}/s)")
+
+    counts = run_sweep(args.traces, candidates, args.workers, args.tolerance, progress, args.recorded_labels)
+    elapsed = time.perf_counter() - start
+    print(f"⏱ {len(candidates)} settings in {elapsed:.1f} s "
+          f"({len(candidates) * frames / elapsed / 1e6:.1f} M frames/s)")
+
+    scored = [{'thresholds': c, 'counts': n, 'score': round(weighted_score(n), 4)}
+              for c, n in zip(candidates, counts)]
+    baseline = scored[0]
+    ranking = sorted(scored, key=lambda s: s['score'])
+    best = ranking[0]
+
+    print(f"Current config: score {baseline['score']} ({format_counts(baseline['counts'])})")
+    for rank, entry in enumerate(ranking[:args.top], 1):
+        values = ", ".join(f"{name} {entry['thresholds'][name]:g}" for name in PARAMETERS)
+        print(f"{rank:>2}. score {entry['score']} ({format_counts(entry['counts'])}) | {values}")
+
+    save_calibration(args.output, best, baseline, ranking[:args.top], sessions, search)
+    print(f"✓ Calibration profile saved: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
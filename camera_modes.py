@@ -0,0 +1,301 @@
+"""
+Camera mode negotiation for Motion Controller
+Probes capture modes (FOURCC, resolution, FPS, driver buffer) and keeps the lowest-latency one per device
+"""
+
+import json
+import os
+import time
+
+import cv2
+import numpy as np
+
+from config import (
+    CAMERA_WIDTH, CAMERA_HEIGHT, CAMERA_FPS, CAMERA_FOURCCS, CAMERA_DRIVER_BUFFER,
+    CAMERA_PROBE_FRAMES, CAMERA_PROFILE_PATH
+)
+
+# Frames queued by drivers that ignore CAP_PROP_BUFFERSIZE (V4L2 and Media Foundation keep about 4)
+DEFAULT_DRIVER_BUFFER = 4
+# Frames read and discarded after a mode switch while the driver settles
+WARMUP_FRAMES = 5
+# A mode meets the FPS target when it measures at least this share of it
+FPS_TOLERANCE = 0.9
+
+
+def fourcc_code(name):
+    return cv2.VideoWriter_fourcc(*name)
+
+
+def fourcc_name(code):
+    """Four-character code from the float returned by CAP_PROP_FOURCC"""
+    code = int(code)
+    return "".join(chr((code >> (8 * i)) & 0xFF) for i in range(4)).strip("\x00 ")
+
+
+class CameraMode:
+    """Capture format; buffer_size is None when the driver does not support setting it"""
+
+    __slots__ = ('fourcc', 'width', 'height', 'fps', 'buffer_size')
+
+    def __init__(self, fourcc, width, height, fps, buffer_size):
+        self.fourcc = fourcc
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.buffer_size = buffer_size
+
+    def key(self):
+        return (self.fourcc, self.width, self.height, round(self.fps), self.buffer_size)
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(*(data[name] for name in cls.__slots__))
+
+    def __repr__(self):
+        buffer = "default" if self.buffer_size is None else self.buffer_size
+        return f"{self.fourcc or '?'} {self.width}x{self.height} @ {self.fps:.0f} FPS, buffer {buffer}"
+
+
+def apply_mode(cap, mode):
+    """Request a mode and return the mode the driver actually reports"""
+    # Format first: some drivers only offer a resolution in a given pixel format
+    cap.set(cv2.CAP_PROP_FOURCC, fourcc_code(mode.fourcc))
+    cap.set(cv2.CAP_PROP_FRAME_WIDTH, mode.width)
+    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, mode.height)
+    cap.set(cv2.CAP_PROP_FPS, mode.fps)
+    buffer_ok = cap.set(cv2.CAP_PROP_BUFFERSIZE, mode.buffer_size)
+    return CameraMode(fourcc_name(cap.get(cv2.CAP_PROP_FOURCC)),
+                      int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+                      cap.get(cv2.CAP_PROP_FPS), mode.buffer_size if buffer_ok else None)
+
+
+def measure_frame_interval(cap, frames=CAMERA_PROBE_FRAMES, clock=time.perf_counter):
+    """Median time between delivered frames in ms (None when the camera delivers nothing)"""
+    for _ in range(WARMUP_FRAMES):
+        if not cap.read()[0]:
+            return None
+    stamps = []
+    for _ in range(frames + 1):
+        if not cap.read()[0]:
+            return None
+        stamps.append(clock())
+    return float(np.median(np.diff(stamps))) * 1000
+
+
+class ProbeResult:
+    """A requested mode, what the driver gave instead and its measured frame interval"""
+
+    def __init__(self, requested, actual, interval_ms):
+        self.requested = requested
+        self.actual = actual
+        self.interval_ms = interval_ms
+
+    @property
+    def measured_fps(self):
+        return 1000.0 / self.interval_ms if self.interval_ms > 0 else 0.0
+
+    @property
+    def latency_ms(self):
+        """Age of the oldest frame the driver can hand out: its queue plus the frame being captured"""
+        buffered = DEFAULT_DRIVER_BUFFER if self.actual.buffer_size is None else self.actual.buffer_size
+        return self.interval_ms * (buffered + 1)
+
+    def meets(self, width, height, fps):
+        return (self.actual.width >= width and self.actual.height >= height
+                and self.measured_fps >= fps * FPS_TOLERANCE)
+
+    def to_dict(self):
+        return {'requested': self.requested.to_dict(), 'actual': self.actual.to_dict(),
+                'interval_ms': self.interval_ms}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(CameraMode.from_dict(data['requested']), CameraMode.from_dict(data['actual']),
+                   data['interval_ms'])
+
+
+def load_profiles(path):
+    """Saved modes per device ({} when the file is missing or unreadable)"""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_profile(path, device, result):
+    profiles = load_profiles(path)
+    profiles[device] = result.to_dict()
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(profiles, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def device_key(cap, index):
+    """Profile key: capture backend, index and (on Linux) the device name, so a swapped camera is probed again"""
+    try:
+        backend = cap.getBackendName()
+    except (cv2.error, AttributeError):
+        backend = "unknown"
+    try:
+        with open(f"/sys/class/video4linux/video{index}/name") as f:
+            return f"{backend}:{index}:{f.read().strip()}"
+    except OSError:
+        return f"{backend}:{index}"
+
+
+class CameraNegotiator:
+    """Chooses the lowest-latency capture mode that meets the resolution and FPS target
+
+    Every candidate is requested, read back (drivers silently substitute modes
+    they do not support) and timed over a few frames. Latency is estimated as
+    the measured frame interval times the frames the driver can hold plus the
+    one being captured, so 60 FPS with a one-frame buffer beats 30 FPS with
+    the default queue. The winner is saved per device; later starts apply it
+    directly and skip the probe.
+    """
+
+    def __init__(self, width=CAMERA_WIDTH, height=CAMERA_HEIGHT, fps=CAMERA_FPS, fourccs=CAMERA_FOURCCS,
+                 buffer_size=CAMERA_DRIVER_BUFFER, probe_frames=CAMERA_PROBE_FRAMES,
+                 profile_path=CAMERA_PROFILE_PATH, clock=time.perf_counter):
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.fourccs = fourccs
+        self.buffer_size = buffer_size
+        self.probe_frames = probe_frames
+        self.profile_path = profile_path
+        self.clock = clock
+
+    def candidates(self):
+        """Target resolution in every format, at the target rate and at 30 FPS as a fallback"""
+        rates = sorted({self.fps, 30}, reverse=True)
+        return [CameraMode(fourcc, self.width, self.height, fps, self.buffer_size)
+                for fourcc in self.fourccs for fps in rates]
+
+    def probe(self, cap):
+        """Time every candidate mode; modes the driver maps to the same actual mode are timed once"""
+        results = []
+        seen = set()
+        for mode in self.candidates():
+            actual = apply_mode(cap, mode)
+            if actual.key() in seen:
+                continue
+            seen.add(actual.key())
+            interval = measure_frame_interval(cap, self.probe_frames, self.clock)
+            if interval is not None:
+                results.append(ProbeResult(mode, actual, interval))
+        return results
+
+    def choose(self, results):
+        """Lowest latency among the modes meeting the target, or among all modes if none does"""
+        qualifying = [r for r in results if r.meets(self.width, self.height, self.fps)]
+        return min(qualifying or results, key=lambda r: r.latency_ms, default=None)
+
+    def negotiate(self, cap, device, reprobe=False):
+        """Put cap into the saved or best probed mode; returns its ProbeResult (None if the probe failed)"""
+        saved = None if reprobe else load_profiles(self.profile_path).get(device)
+        if saved:
+            result = ProbeResult.from_dict(saved)
+            if apply_mode(cap, result.requested).key() == result.actual.key():
+                print(f"✓ Camera mode {result.actual} (saved profile, {result.interval_ms:.1f} ms/frame)")
+                return result
+            print("⚠ Saved camera mode no longer matches the device, probing again")
+
+        results = self.probe(cap)
+        best = self.choose(results)
+        if best is None:
+            print("⚠ Camera mode probe failed, keeping the driver defaults")
+            return None
+        apply_mode(cap, best.requested)
+        save_profile(self.profile_path, device, best)
+        print(f"✓ Camera mode {best.actual} ({best.interval_ms:.1f} ms/frame measured, "
+              f"{len(results)} modes probed)")
+        if not best.meets(self.width, self.height, self.fps):
+            print(f"⚠ No camera mode reaches {self.width}x{self.height} @ {self.fps} FPS")
+        return best
+
+
+def negotiate_camera(cap, index, reprobe=False):
+    """Negotiate the capture mode of an opened camera with the settings from config.py"""
+    return CameraNegotiator().negotiate(cap, device_key(cap, index), reprobe)
+
+
+class FakeCapture:
+    """VideoCapture stand-in with a table of supported modes, for testing without a camera
+
+    modes maps (fourcc, width, height) to the highest FPS of that mode. Like
+    real drivers it falls back silently: an unknown format keeps the current
+    one, an unknown size snaps to the closest size of the format and the rate
+    is capped at the mode maximum. Frames arrive 1/fps apart on the given
+    clock; a FakeClock is advanced instead of sleeping, so probing is instant.
+    """
+
+    def __init__(self, modes, clock=None, buffer_control=True, backend="FAKE"):
+        self.modes = dict(modes)
+        self.clock = clock
+        self.buffer_control = buffer_control
+        self.backend = backend
+        self.fourcc, self.width, self.height = next(iter(self.modes))
+        self.fps = self.modes[(self.fourcc, self.width, self.height)]
+        self.buffer_size = DEFAULT_DRIVER_BUFFER
+        self.opened = True
+        self.frames_read = 0
+
+    def _fit(self, width, height):
+        sizes = [(w, h) for fourcc, w, h in self.modes if fourcc == self.fourcc]
+        self.width, self.height = min(sizes, key=lambda s: abs(s[0] - width) + abs(s[1] - height))
+        self.fps = min(self.fps, self.modes[(self.fourcc, self.width, self.height)])
+
+    def isOpened(self):
+        return self.opened
+
+    def getBackendName(self):
+        return self.backend
+
+    def set(self, prop, value):
+        if prop == cv2.CAP_PROP_FOURCC:
+            name = fourcc_name(value)
+            if not any(fourcc == name for fourcc, _, _ in self.modes):
+                return False
+            self.fourcc = name
+            self._fit(self.width, self.height)
+        elif prop == cv2.CAP_PROP_FRAME_WIDTH:
+            self._fit(int(value), self.height)
+        elif prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            self._fit(self.width, int(value))
+        elif prop == cv2.CAP_PROP_FPS:
+            self.fps = min(float(value), self.modes[(self.fourcc, self.width, self.height)])
+        elif prop == cv2.CAP_PROP_BUFFERSIZE and self.buffer_control:
+            self.buffer_size = int(value)
+        else:
+            return False
+        return True
+
+    def get(self, prop):
+        values = {
+            cv2.CAP_PROP_FOURCC: float(fourcc_code(self.fourcc)),
+            cv2.CAP_PROP_FRAME_WIDTH: float(self.width),
+            cv2.CAP_PROP_FRAME_HEIGHT: float(self.height),
+            cv2.CAP_PROP_FPS: float(self.fps),
+            cv2.CAP_PROP_BUFFERSIZE: float(self.buffer_size),
+        }
+        return values.get(prop, 0.0)
+
+    def read(self):
+        if not self.opened:
+            return False, None
+        if hasattr(self.clock, 'advance'):
+            self.clock.advance(1.0 / self.fps)
+        else:
+            time.sleep(1.0 / self.fps)
+        self.frames_read += 1
+        return True, np.zeros((self.height, self.width, 3), dtype=np.uint8)
+
+    def release(self):
+        self.opened = False
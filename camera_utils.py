@@ -3,32 +3,234 @@ Camera and initialization utilities for Motion Controller
 """
 
 import cv2
+import os
 import time
+import threading
 from ui_helpers import show_loading_screen
-from config import CAMERA_INDEX
+from camera_modes import negotiate_camera
+from instrumentation import RollingHistogram
+from config import CAMERA_INDEX, CAPTURE_BUFFER_SIZE, CAMERA_NEGOTIATION_ENABLED
+from landmark_utils import LandmarkFrame
 
-def initialize_camera():
-    """Initialize camera with error handling"""
-    show_loading_screen("Connecting to camera...", 60)
-    cap = cv2.VideoCapture(CAMERA_INDEX)
-    
+def open_camera(index=CAMERA_INDEX, reprobe=False):
+    """Open the camera without touching the UI (safe to call from a startup thread)"""
+    cap = cv2.VideoCapture(index)
     if not cap.isOpened():
+        cap.release()
+        return None
+    if CAMERA_NEGOTIATION_ENABLED:
+        negotiate_camera(cap, index, reprobe)
+    return cap
+
+def report_camera_status(cap):
+    """Show the camera error screen or print the controls; returns False without a camera"""
+    if cap is None:
         show_loading_screen("ERROR: Camera not found!", 60)
-        time.sleep(2)
+        time.sleep(2)  # Keep the error readable before the window closes
         print("ERROR: Camera not found or access blocked!")
         print("Check camera connection and system permissions.")
         cv2.destroyAllWindows()
-        return None
+        return False
     
-    show_loading_screen("Camera connected successfully!", 80)
     print("✓ Camera connected successfully!")
     print("Controls: hands left/right, hands up (or space) to jump, hands down")
     print("💡 Both hands spread = mouse click (for game menus)")
     print("Press ESC to exit")
-    time.sleep(0.4)
-    
+    return True
+
+def initialize_camera():
+    """Initialize camera with error handling"""
+    show_loading_screen("Connecting to camera...", 60)
+    cap = open_camera()
+    if not report_camera_status(cap):
+        return None
+    show_loading_screen("Camera connected successfully!", 80)
     return cap
 
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp')
+
+class ImageSequenceCapture:
+    """VideoCapture-like reader over a directory of images, in file name order"""
+    
+    def __init__(self, directory):
+        self.paths = sorted(
+            os.path.join(directory, name) for name in os.listdir(directory)
+            if name.lower().endswith(IMAGE_EXTENSIONS)
+        )
+        self.index = 0
+    
+    def isOpened(self):
+        return self.index < len(self.paths)
+    
+    def read(self):
+        while self.index < len(self.paths):
+            image = cv2.imread(self.paths[self.index])
+            self.index += 1
+            if image is not None:
+                return True, image
+        return False, None
+    
+    def get(self, prop):
+        """Support the frame size properties of cv2.VideoCapture.get"""
+        if prop in (cv2.CAP_PROP_FRAME_WIDTH, cv2.CAP_PROP_FRAME_HEIGHT) and self.paths:
+            image = cv2.imread(self.paths[0])
+            if image is not None:
+                return image.shape[1] if prop == cv2.CAP_PROP_FRAME_WIDTH else image.shape[0]
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return len(self.paths)
+        return 0
+    
+    def release(self):
+        self.index = len(self.paths)
+
+def open_frame_source(source):
+    """Open a camera index, video file or image directory without any UI"""
+    if isinstance(source, int) or str(source).isdigit():
+        cap = cv2.VideoCapture(int(source))
+        if CAMERA_NEGOTIATION_ENABLED and cap.isOpened():
+            negotiate_camera(cap, int(source))
+        return cap
+    if os.path.isdir(source):
+        return ImageSequenceCapture(source)
+    return cv2.VideoCapture(source)
+
+class CapturedFrame:
+    """Single camera frame with its capture timestamp and sequence number"""
+    
+    __slots__ = ('image', 'timestamp', 'sequence')
+    
+    def __init__(self, image, timestamp, sequence):
+        self.image = image
+        self.timestamp = timestamp
+        self.sequence = sequence
+
+class ThreadedCapture:
+    """Reads camera frames on a background thread, keeping only the newest ones
+    
+    The reader thread overwrites the oldest buffered frame when the consumer
+    falls behind, so read() always returns the most recent capture instead of
+    a frame that has been waiting in the driver queue.
+    """
+    
+    def __init__(self, cap, buffer_size=CAPTURE_BUFFER_SIZE, clock=time.perf_counter):
+        self.cap = cap
+        self.buffer_size = max(1, buffer_size)
+        self.clock = clock
+        self._buffer = []
+        self._condition = threading.Condition()
+        self._thread = None
+        self._running = False
+        self._last_sequence = -1
+        self.frames_captured = 0
+        self.frames_dropped = 0
+        self.frames_delivered = 0
+        self.frame_intervals = RollingHistogram()  # Real time between captured frames, ms
+    
+    def start(self):
+        """Start the capture thread"""
+        if self._thread is None:
+            self._running = True
+            self._thread = threading.Thread(target=self._reader, name="camera-capture", daemon=True)
+            self._thread.start()
+        return self
+    
+    def _reader(self):
+        """Capture loop - runs on the background thread"""
+        sequence = 0
+        last_timestamp = None
+        while self._running:
+            success, image = self.cap.read()
+            timestamp = self.clock()
+            if not success:
+                break
+            with self._condition:
+                if last_timestamp is not None:
+                    self.frame_intervals.add((timestamp - last_timestamp) * 1000)
+                last_timestamp = timestamp
+                if len(self._buffer) >= self.buffer_size:
+                    self._buffer.pop(0)
+                    self.frames_dropped += 1
+                self._buffer.append(CapturedFrame(image, timestamp, sequence))
+                self.frames_captured += 1
+                self._condition.notify()
+            sequence += 1
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+    
+    def read(self, timeout=1.0):
+        """Return the newest captured frame, or None when the camera stopped
+        
+        Any older frames still in the buffer are discarded and counted as dropped.
+        """
+        with self._condition:
+            while not self._buffer and self._running:
+                if not self._condition.wait(timeout):
+                    return None
+            if not self._buffer:
+                return None
+            frame = self._buffer[-1]
+            self.frames_dropped += len(self._buffer) - 1
+            self._buffer.clear()
+        self.frames_delivered += 1
+        self._last_sequence = frame.sequence
+        return frame
+    
+    def is_running(self):
+        """Check if the capture thread is still producing frames"""
+        with self._condition:
+            return self._running or bool(self._buffer)
+    
+    def stats(self):
+        """Return capture counters"""
+        with self._condition:
+            return {
+                'captured': self.frames_captured,
+                'delivered': self.frames_delivered,
+                'dropped': self.frames_dropped,
+                'buffered': len(self._buffer),
+                'last_sequence': self._last_sequence,
+                'frame_interval_ms': self.frame_intervals.percentiles((50,))[0],
+            }
+    
+    def stop(self):
+        """Stop the capture thread and release the camera"""
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+        self.cap.release()
+
+
+class FrameReader:
+    """Reads frames directly, or through ThreadedCapture for live cameras"""
+
+    def __init__(self, cap, threaded):
+        self.capture = ThreadedCapture(cap).start() if threaded else None
+        self.cap = cap
+
+    def read(self):
+        """Return (image, capture timestamp) or (None, None) at the end of input"""
+        if self.capture is not None:
+            while self.capture.is_running():
+                captured = self.capture.read()
+                if captured is not None:
+                    return captured.image, captured.timestamp
+            return None, None
+        success, image = self.cap.read()
+        if not success:
+            return None, None
+        return image, time.perf_counter()
+
+    def release(self):
+        if self.capture is not None:
+            self.capture.stop()
+        else:
+            self.cap.release()
+
+
 def create_ui_callback(state):
     """Create mouse callback function with state closure"""
     def mouse_callback(event, x, y, flags, param):
@@ -49,12 +251,9 @@ def create_ui_callback(state):
                     print("  Left hand left - hold left mouse button (drag)")
                 else:
                     print("✓ Keyboard control mode enabled")
-                    # Release mouse button when exiting mouse mode
-                    if state.get('gesture_controller'):
-                        if state['gesture_controller'].keys_pressed.get('mouse_click', False):
-                            import pyautogui
-                            pyautogui.mouseUp()
-                            state['gesture_controller'].keys_pressed['mouse_click'] = False
+                    # Release mouse button when exiting mouse mode; applied by the thread running
+                    # the gesture controller (see apply_ui_requests in app.py)
+                    state['release_mouse_button'] = True
             # Check if click is on help button (bottom right corner, topmost)
             elif x > frame_w - 150 and x < frame_w - 30 and y > frame_h - 40 and y < frame_h - 10:
                 state['show_instructions'] = not state['show_instructions']
@@ -65,24 +264,14 @@ def create_ui_callback(state):
     
     return mouse_callback
 
-def extract_landmarks(results, mp_pose):
-    """Extract and organize pose landmarks"""
+def extract_landmarks(results, mp_pose=None, out=None):
+    """Copy the pose landmarks into a LandmarkFrame (out, reused every frame, if given)
+    
+    mp_pose is accepted for compatibility; landmark indices come from landmark_utils.
+    Returns None when no pose was detected.
+    """
     if not results.pose_landmarks:
         return None
-    
-    lm = results.pose_landmarks.landmark
-    
-    landmarks = {
-        'nose': lm[mp_pose.PoseLandmark.NOSE.value],
-        'left_wrist': lm[mp_pose.PoseLandmark.LEFT_WRIST.value],
-        'right_wrist': lm[mp_pose.PoseLandmark.RIGHT_WRIST.value],
-        'left_hip': lm[mp_pose.PoseLandmark.LEFT_HIP.value],
-        'right_hip': lm[mp_pose.PoseLandmark.RIGHT_HIP.value],
-    }
-    
-    # Add mirrored coordinates
-    landmarks['nose_mirror'] = 1 - landmarks['nose'].x
-    landmarks['left_wrist_mirror'] = 1 - landmarks['left_wrist'].x
-    landmarks['right_wrist_mirror'] = 1 - landmarks['right_wrist'].x
-    
-    return landmarks
\ No newline at end of file
+    if out is None:
+        out = LandmarkFrame()
+    return out.fill(results.pose_landmarks)
@@ -3,8 +3,6 @@ Configuration settings for Motion Controller
 All thresholds, colors, and constants in one place
 """
 
-import pyautogui
-
 # Gesture detection thresholds
 SIDE_THRESHOLD = 0.1  # How far from nose hand must move
 UP_THRESHOLD = 0.05
@@ -15,26 +13,223 @@ DEADZONE = 0.2  # Zone width where movements don't register
 MIN_Z = -0.7
 MAX_Z = 0.2
 
+# Keys sent for each control (pydirectinput/pyautogui key names, None disables the control)
+KEY_MAP = {'left': 'left', 'right': 'right', 'up': 'up', 'down': 'down', 'space': 'space'}
+
+# Gesture rules, compiled by gesture_rules.py. Expressions use landmark attributes
+# (nose, left_wrist, right_wrist, left_hip, right_hip with .x, .y, .z, .visibility and
+# .x_mirror = 1 - x), the features and conditions below, abs/min/max and the thresholds
+# deadzone, up_threshold and down_threshold
+GESTURE_FEATURES = {
+    'waist_y': "(left_hip.y + right_hip.y) / 2",
+}
+GESTURE_CONDITIONS = {
+    'left_hand_out': "left_wrist.x_mirror < nose.x_mirror - deadzone",
+    'right_hand_out': "right_wrist.x_mirror > nose.x_mirror + deadzone",
+    'hand_up': "left_wrist.y < nose.y - up_threshold or right_wrist.y < nose.y - up_threshold",
+    'hand_down': "left_wrist.y > waist_y + down_threshold or right_wrist.y > waist_y + down_threshold",
+    'both_hands_out': "left_hand_out and right_hand_out",
+}
+# Bindings per control mode: while 'when' is met, 'keys' are held (KEY_MAP controls or OS key names),
+# 'button' holds the mouse button and 'click' clicks the screen center once. An 'exclusive' binding
+# overrides the others, which keep their state meanwhile. The last met binding names the gesture.
+KEYBOARD_BINDINGS = [
+    {'name': "MOUSE CLICK", 'when': "both_hands_out", 'click': True, 'exclusive': True},
+    {'name': "LEFT", 'when': "left_hand_out", 'keys': ('left',)},
+    {'name': "RIGHT", 'when': "right_hand_out", 'keys': ('right',)},
+    {'name': "UP", 'when': "hand_up", 'keys': ('up', 'space')},
+    {'name': "DOWN", 'when': "hand_down", 'keys': ('down',)},
+]
+MOUSE_BINDINGS = [
+    {'name': "CLICK HOLD", 'when': "left_hand_out", 'button': True},
+]
+MOUSE_CURSOR = ("right_wrist.x_mirror", "right_wrist.y")  # Cursor position in mouse mode (0-1 of the screen)
+
+# Gesture state machine (gesture_state.py); all zero = off, every frame acts on the raw rules
+GESTURE_HYSTERESIS = {'deadzone': 0.0, 'up_threshold': 0.0, 'down_threshold': 0.0}  # Threshold relief while held
+GESTURE_MIN_HOLD_S = 0.0  # A started gesture stays active at least this long (bindings can set 'min_hold')
+GESTURE_MIN_RELEASE_S = 0.0  # A released gesture cannot start again for this long (bindings: 'min_release')
+GESTURE_MIN_VISIBILITY = 0.0  # Landmark visibility a gesture needs to start (0.0 - 1.0)
+
 # Hand visualization colors (BGR format)
 HAND_COLOR_LEFT = (255, 0, 0)  # Blue
 HAND_COLOR_RIGHT = (0, 0, 255)  # Red
 
 # Mouse control settings
-SCREEN_WIDTH, SCREEN_HEIGHT = pyautogui.size()
-MOUSE_SMOOTHING = 0.7  # Mouse movement smoothing factor (0.0 - 1.0, higher = faster response)
-INITIAL_MOUSE_X = SCREEN_WIDTH // 2
-INITIAL_MOUSE_Y = SCREEN_HEIGHT // 2
+SCREEN_SIZE = None  # (width, height) to skip screen detection, None = ask pyautogui on first use
+FALLBACK_SCREEN_SIZE = (1920, 1080)  # Used when pyautogui cannot load (no display)
+MOUSE_SMOOTHING = 0.7  # Mouse movement smoothing factor (0.0 - 1.0, higher = faster response; off with the cursor engine)
+
+_screen_size = SCREEN_SIZE
+
+
+def get_screen_size():
+    """Return (width, height) of the screen, detected once on first use"""
+    global _screen_size
+    if _screen_size is None:
+        try:
+            import pyautogui
+            _screen_size = tuple(pyautogui.size())
+        except Exception:  # pyautogui cannot load without a display (headless machines)
+            _screen_size = FALLBACK_SCREEN_SIZE
+    return _screen_size
+
+
+def __getattr__(name):
+    """Resolve the screen size constants lazily so importing config stays fast"""
+    if name == 'SCREEN_WIDTH':
+        return get_screen_size()[0]
+    if name == 'SCREEN_HEIGHT':
+        return get_screen_size()[1]
+    if name == 'INITIAL_MOUSE_X':
+        return get_screen_size()[0] // 2
+    if name == 'INITIAL_MOUSE_Y':
+        return get_screen_size()[1] // 2
+    raise AttributeError(f"module 'config' has no attribute '{name}'")
+
 
 # PyAutoGUI settings
 PYAUTOGUI_PAUSE = 0  # No delay between commands
 PYAUTOGUI_FAILSAFE = False  # Disable failsafe (moving mouse to corner won't stop program)
 
+# Input injection settings
+INPUT_BACKEND = 'auto'  # 'auto', 'pyautogui', 'pydirectinput', 'recording' or 'null'
+INPUT_DISPATCHER_ENABLED = True  # Inject input on a separate thread, sending only state changes
+
+# Cursor output engine (mouse mode) - moves the cursor between pose updates at a fixed rate
+CURSOR_ENGINE_ENABLED = True
+CURSOR_ENGINE_RATE = 120  # Cursor updates per second (120-240)
+CURSOR_PREDICTION = 1.0  # Share of a pose update interval to extrapolate ahead (0 = interpolate only, 1 = no added delay)
+CURSOR_STALE_TIMEOUT = 0.25  # Seconds without a new target before the cursor stops following
+
+# Frame loop structure (app.py)
+PIPELINE_MODE = 'sync'  # 'sync' loop or 'async' stages with bounded queues (pipeline.py); POSE_WORKERS uses 'sync'
+PIPELINE_FRAME_QUEUE = 1  # Frames waiting in front of each frame stage
+PIPELINE_FRAME_POLICY = 'drop_oldest'  # 'drop_oldest', 'drop_newest' or 'block'
+PIPELINE_RENDER_POLICY = 'drop_oldest'  # A slow window drops frames instead of stalling gesture recognition
+PIPELINE_INPUT_QUEUE = 32  # Frames of input events waiting for injection
+PIPELINE_INPUT_POLICY = 'block'  # Dropping input events can lose key releases
+
 # MediaPose settings
 MIN_DETECTION_CONFIDENCE = 0.5
 MIN_TRACKING_CONFIDENCE = 0.5
 
+# Region-of-interest inference (crop around the last known body)
+ROI_ENABLED = False  # Run pose inference on a crop around the previous pose
+ROI_PADDING = 0.35  # Extra margin around the landmark bounding box (fraction of its size)
+ROI_MIN_SIZE = 0.25  # Minimum crop side as a fraction of the frame side
+ROI_FULL_FRAME_INTERVAL = 30  # Force a full-frame pass every N frames
+ROI_MIN_VISIBILITY = 0.5  # Tracked landmarks below this visibility mean tracking is lost
+
+# Adaptive inference rate - skip pose inference while the player stands still
+ADAPTIVE_INFERENCE_ENABLED = False
+ADAPTIVE_POLICY = 'frame_diff'  # 'frame_diff', 'velocity' or 'both' (skip only when both are calm)
+ADAPTIVE_FRAME_DIFF_THRESHOLD = 1.0  # Mean gray-level change (0-255) of a thumbnail vs the last inferred frame
+ADAPTIVE_VELOCITY_THRESHOLD = 0.5  # Tracked landmark speed (normalized units per second)
+ADAPTIVE_MAX_SKIP = 2  # Consecutive frames that may be predicted instead of inferred
+ADAPTIVE_THUMBNAIL_SIZE = (32, 24)  # Size of the frame-difference thumbnail
+
+# Automatic quality tuning (auto_tuning.py) - trades model size and input resolution for frame rate
+AUTOTUNE_ENABLED = False
+AUTOTUNE_TARGET_FRAME_MS = 33.3  # Frame time to meet (33.3 ms = 30 FPS)
+AUTOTUNE_INFERENCE_SHARE = 0.75  # Part of the frame time pose inference may use (the rest: capture, UI)
+AUTOTUNE_WINDOW = 30  # Inferences measured before a decision (also the minimum time between switches)
+AUTOTUNE_UPGRADE_HEADROOM = 0.7  # Switch to a better level only if its expected cost fits this share of the budget
+AUTOTUNE_RETRY_S = 60.0  # Forget a level's measured cost after this long so it can be tried again
+AUTOTUNE_PROFILE_PATH = 'autotune_profile.json'  # Written by `python auto_tuning.py`
+# Quality levels from best to fastest; width is the inference input width (frames are never upscaled)
+AUTOTUNE_LEVELS = [
+    {'model_complexity': 2, 'width': 640, 'tracking_confidence': 0.5},
+    {'model_complexity': 1, 'width': 640, 'tracking_confidence': 0.5},
+    {'model_complexity': 1, 'width': 480, 'tracking_confidence': 0.5},
+    {'model_complexity': 0, 'width': 480, 'tracking_confidence': 0.4},
+    {'model_complexity': 0, 'width': 320, 'tracking_confidence': 0.3},
+]
+
+# Landmark filtering between pose detection and gesture recognition
+LANDMARK_FILTER = None  # None, 'one_euro' or 'kalman' (replaces the fixed MOUSE_SMOOTHING lerp)
+FILTER_PREDICTION_LEAD = 0.03  # Seconds of velocity-based forward prediction (offsets inference latency)
+ONE_EURO_MIN_CUTOFF = 1.0  # Hz - cutoff at rest, lower = less jitter
+ONE_EURO_BETA = 20.0  # Cutoff increase per unit of speed (normalized units per second), higher = less lag
+ONE_EURO_D_CUTOFF = 1.0  # Hz - cutoff of the speed estimate
+KALMAN_PROCESS_NOISE = 0.5  # Acceleration noise density, higher = follows fast moves more closely
+KALMAN_MEASUREMENT_NOISE = 1e-4  # Variance of the landmark measurement noise
+
+# Multiprocess pose inference
+POSE_WORKERS = 0  # Worker processes for pose inference (0 = main process; >1 detects every frame, no tracking)
+POSE_WORKER_SLOTS = 2  # Shared-memory frame slots per worker
+POSE_WORKER_MAX_RETRIES = 2  # Resubmissions of a frame whose worker crashed before giving up on it
+POSE_WORKER_DRAIN_S = 1.0  # On exit, wait this long per frame still in the workers before dropping it
+
+# Multi-player sessions (multiplayer.py) - one entry per player
+# source: camera index or video path; players with the same source share one capture.
+# region: (x0, y0, x1, y1) part of the camera frame (not mirrored) in 0-1 units, None = whole frame
+# keys: overrides of KEY_MAP for this player
+PLAYERS = [
+    {'name': 'Player 1', 'source': 0, 'region': (0.5, 0.0, 1.0, 1.0),
+     'keys': {'left': 'a', 'right': 'd', 'up': 'w', 'down': 's', 'space': 'space'}},
+    {'name': 'Player 2', 'source': 0, 'region': (0.0, 0.0, 0.5, 1.0),
+     'keys': {'left': 'left', 'right': 'right', 'up': 'up', 'down': 'down', 'space': None}},
+]
+
+# Networked split mode (remote_pose.py) - a vision node streams landmarks to the input node over UDP
+NET_HOST = '127.0.0.1'  # Input node address the vision node sends to
+NET_BIND = '0.0.0.0'  # Address the input node listens on
+NET_PORT = 5005
+NET_LANDMARKS = None  # Landmark names to send; None = the ones the gesture bindings use (plus the nose)
+NET_XY_RANGE = (-1.0, 2.0)  # Range of normalized x and y quantized to 16 bits (landmarks may lie off-frame)
+NET_Z_RANGE = (-3.0, 3.0)  # Range of z quantized to 16 bits
+NET_POSE_TIMEOUT_S = 0.25  # Input node releases all controls when no packet arrived for this long
+NET_STATS_INTERVAL_S = 5.0  # Seconds between link statistics printouts
+
 # Camera settings
 CAMERA_INDEX = 0  # Default camera
+CAPTURE_BUFFER_SIZE = 1  # Frames kept by the capture thread (older frames are dropped)
+
+# Camera mode negotiation (camera_modes.py) - probed once per device, then loaded from the profile file
+CAMERA_NEGOTIATION_ENABLED = True
+CAMERA_WIDTH = 640  # Minimum resolution the chosen mode must deliver
+CAMERA_HEIGHT = 480
+CAMERA_FPS = 60  # Target frame rate; modes that miss it are used only if no mode reaches it
+CAMERA_FOURCCS = ('MJPG', 'YUYV')  # Pixel formats to try (MJPEG usually reaches higher rates over USB)
+CAMERA_DRIVER_BUFFER = 1  # Frames the driver may queue (CAP_PROP_BUFFERSIZE)
+CAMERA_PROBE_FRAMES = 15  # Frames timed per probed mode
+CAMERA_PROFILE_PATH = 'camera_profiles.json'  # Chosen mode per device
+
+# Session recording
+TRACE_RECORD_PATH = None  # Set to a file path (e.g. 'session.trace') to record landmark traces
+
+# Threshold calibration (calibration.py) - searches gesture thresholds on labelled recorded sessions
+CALIBRATION_PROFILE_PATH = 'calibration_profile.json'  # Written by `python calibration.py`, loaded at start
+# Search range per threshold (GestureController argument -> (low, high))
+CALIBRATION_RANGES = {
+    'deadzone': (0.05, 0.35),
+    'up_threshold': (-0.05, 0.15),
+    'down_threshold': (-0.2, 0.1),
+    'min_z': (-1.2, -0.3),
+    'max_z': (0.0, 0.6),
+}
+# Score = sum of weight * count (lower is better)
+CALIBRATION_WEIGHTS = {'false_triggers': 1.0, 'missed': 2.0, 'churn': 0.1}
+CALIBRATION_TOLERANCE_FRAMES = 5  # Gesture onsets this close to a labelled segment still match it
+
+# Pose inference cache (pose_cache.py) - headless runs over recorded videos reuse the landmarks of earlier runs
+POSE_CACHE_ENABLED = True
+POSE_CACHE_DIR = '.pose_cache'  # One folder per video and model settings
+POSE_CACHE_MAX_MB = 512  # Total size; the least recently used videos are deleted beyond it
+POSE_CACHE_CHUNK_FRAMES = 256  # Frames per memory-mapped chunk file
+
+# Pipeline instrumentation
+PROFILING_ENABLED = False  # Per-stage latency histograms (near-zero overhead when disabled)
+PROFILING_HUD = False  # Show the latency/FPS overlay in the main window
+PROFILING_WINDOW = 300  # Samples kept per stage for percentiles
+PROFILING_EXPORT_PATH = None  # e.g. 'latency.csv' or 'latency.json' for periodic export
+PROFILING_EXPORT_INTERVAL = 5.0  # Seconds between exports
+
+# Motion-to-input latency tracing (capture time -> OS input event)
+LATENCY_TRACING_ENABLED = False
+LATENCY_WINDOW = 1000  # Events kept per gesture type for percentiles
+LATENCY_REPORT_PATH = None  # e.g. 'input_latency.json', written on exit
 
 # UI settings
 CHECKBOX_REGION_WIDTH = 150  # Width of checkbox area from right edge
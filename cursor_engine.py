@@ -0,0 +1,187 @@
+"""
+High-rate cursor output for Motion Controller
+Moves the cursor on its own thread between pose updates, so mouse mode moves smoothly instead of in steps
+"""
+
+import threading
+import time
+
+from instrumentation import FpsCounter, RollingHistogram
+from config import CURSOR_ENGINE_RATE, CURSOR_PREDICTION, CURSOR_STALE_TIMEOUT, get_screen_size
+
+# Bounds of the estimated time between pose updates (s)
+MIN_UPDATE_INTERVAL = 1 / 120
+MAX_UPDATE_INTERVAL = 0.2
+
+
+class CursorEngine:
+    """Cursor interpolation at a fixed output rate
+
+    move_to() only records a new target; the engine thread moves the cursor
+    from where it was shown when the target arrived to the target over one
+    estimated update interval. With prediction > 0 the end point is pushed
+    along the hand velocity by that share of an interval, which hides the
+    interval of delay the interpolation itself adds. Positions are clamped
+    to the screen and only changes of a whole pixel are sent. When no target
+    arrives for CURSOR_STALE_TIMEOUT the cursor simply stays put.
+
+    Has the same interface as the input backends; key and button events are
+    passed straight through to the wrapped output.
+    """
+
+    def __init__(self, output, screen_size=None, rate=CURSOR_ENGINE_RATE, prediction=CURSOR_PREDICTION,
+                 stale_timeout=CURSOR_STALE_TIMEOUT, clock=time.perf_counter):
+        self.output = output
+        self.screen_width, self.screen_height = screen_size or get_screen_size()
+        self.period = 1.0 / rate
+        self.prediction = prediction
+        self.stale_timeout = stale_timeout
+        self.clock = clock
+        self._lock = threading.Condition()
+        self._target = None  # Latest (x, y)
+        self._target_time = None
+        self._start = None  # Shown position when the latest target arrived
+        self._end = None  # Where the cursor should be one interval after the target arrived
+        self._velocity = (0.0, 0.0)
+        self._interval = 1 / 30  # Running estimate of the time between pose updates
+        self._shown = None  # Last computed position (float)
+        self._emitted = None  # Last position sent to the output (int)
+        self._running = False
+        self._thread = None
+        self._tag_frame = getattr(output, 'tag_frame', None)
+        self.output_rate = FpsCounter()
+        self.target_rate = FpsCounter()
+        self.errors = RollingHistogram()  # Distance between the shown cursor and each new target, px
+        self.moves_emitted = 0
+        self.late_ticks = 0
+
+    def start(self):
+        """Start the output thread"""
+        if self._thread is None:
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name="cursor-engine", daemon=True)
+            self._thread.start()
+        return self
+
+    # Backend-compatible interface used by GestureController
+
+    def tag_frame(self, capture_time):
+        if self._tag_frame is not None:
+            self._tag_frame(capture_time)
+
+    def move_to(self, x, y):
+        now = self.clock()
+        with self._lock:
+            shown = self._position_locked(now)
+            if shown is not None and now - self._target_time <= self.stale_timeout:
+                dt = now - self._target_time
+                self.errors.add(((shown[0] - x) ** 2 + (shown[1] - y) ** 2) ** 0.5)
+                if dt > 0:
+                    self._interval += (min(max(dt, MIN_UPDATE_INTERVAL), MAX_UPDATE_INTERVAL) - self._interval) * 0.2
+                    self._velocity = ((x - self._target[0]) / dt, (y - self._target[1]) / dt)
+                self._start = shown
+            else:
+                # First target or after a pause - jump there without interpolating
+                self._velocity = (0.0, 0.0)
+                self._start = self._clamp(x, y)
+            self._target = (x, y)
+            self._target_time = now
+            lead = self.prediction * self._interval
+            self._end = self._clamp(x + self._velocity[0] * lead, y + self._velocity[1] * lead)
+            self.target_rate.tick(now)
+            self._lock.notify_all()
+
+    def key_down(self, key):
+        self.output.key_down(key)
+
+    def key_up(self, key):
+        self.output.key_up(key)
+
+    def mouse_down(self):
+        self.output.mouse_down()
+
+    def mouse_up(self):
+        self.output.mouse_up()
+
+    def click(self, x, y):
+        self.output.click(x, y)
+
+    # Output thread
+
+    def _clamp(self, x, y):
+        return (min(max(float(x), 0.0), self.screen_width - 1.0), min(max(float(y), 0.0), self.screen_height - 1.0))
+
+    def _position_locked(self, now):
+        """Cursor position at time now (None before the first target)"""
+        if self._target is None:
+            return None
+        progress = min(1.0, (now - self._target_time) / self._interval)
+        return (self._start[0] + (self._end[0] - self._start[0]) * progress,
+                self._start[1] + (self._end[1] - self._start[1]) * progress)
+
+    def tick(self, now):
+        """Send the cursor position for time now if it moved by a whole pixel"""
+        with self._lock:
+            if self._target is None or now - self._target_time > self.stale_timeout + self._interval:
+                return False
+            self._shown = self._position_locked(now)
+            position = (int(round(self._shown[0])), int(round(self._shown[1])))
+            if position == self._emitted:
+                return False
+            self._emitted = position
+            self.moves_emitted += 1
+            self.output_rate.tick(now)
+        self.output.move_to(*position)
+        return True
+
+    def _run(self):
+        next_tick = self.clock()
+        while True:
+            with self._lock:
+                # Sleep until there is a fresh target to follow
+                while self._running and (self._target is None or
+                                         self.clock() - self._target_time > self.stale_timeout + self._interval):
+                    self._lock.wait(self.stale_timeout)
+                    next_tick = self.clock()
+                if not self._running:
+                    break
+            try:
+                self.tick(self.clock())
+            except Exception as e:
+                print(f"⚠ Cursor output failed: {e}")
+            next_tick += self.period
+            delay = next_tick - self.clock()
+            if delay > 0:
+                time.sleep(delay)
+            elif delay < -self.period:
+                self.late_ticks += 1
+                next_tick = self.clock()  # Fell behind - skip the missed ticks instead of bursting
+
+    # Monitoring and shutdown
+
+    def position(self):
+        """Last computed cursor position (None before the first move)"""
+        with self._lock:
+            return self._shown
+
+    def stats(self):
+        """Output and target rates, moves sent and the tracking error in pixels"""
+        with self._lock:
+            p50, p95 = self.errors.percentiles((50, 95))
+            return {
+                'output_hz': float(self.output_rate.fps()),
+                'target_hz': float(self.target_rate.fps()),
+                'moves_emitted': self.moves_emitted,
+                'late_ticks': self.late_ticks,
+                'error_p50_px': p50,
+                'error_p95_px': p95,
+            }
+
+    def stop(self, timeout=1.0):
+        """Stop the output thread"""
+        with self._lock:
+            self._running = False
+            self._lock.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
@@ -0,0 +1,220 @@
+"""
+Batch gesture classification for Motion Controller
+Side-effect-free, vectorized version of the keyboard-mode gesture logic for scoring recorded traces
+"""
+
+import contextlib
+import os
+
+import numpy as np
+
+from config import (
+    DEADZONE, UP_THRESHOLD, DOWN_THRESHOLD, MIN_Z, MAX_Z, GESTURE_FEATURES, GESTURE_CONDITIONS, KEYBOARD_BINDINGS,
+    GESTURE_HYSTERESIS, GESTURE_MIN_HOLD_S, GESTURE_MIN_RELEASE_S, GESTURE_MIN_VISIBILITY
+)
+from landmark_utils import NOSE, LEFT_WRIST, RIGHT_WRIST, LEFT_HIP, RIGHT_HIP, X, Y, Z, LandmarkFrame, landmarks_from_array
+from trace_utils import GESTURE_CODES
+
+# Bits of the per-frame gesture mask (conditions met in that frame)
+GESTURE_LEFT = 1
+GESTURE_RIGHT = 2
+GESTURE_UP = 4
+GESTURE_DOWN = 8
+GESTURE_CLICK = 16  # Both hands spread
+
+# Columns of the key state array
+KEY_NAMES = ('left', 'right', 'up', 'down', 'space')
+
+# Depth status codes
+DEPTH_OK = 0
+DEPTH_TOO_CLOSE = 1
+DEPTH_TOO_FAR = 2
+DEPTH_NO_POSE = 3
+
+# Keyboard rules the vectorized classifier implements (the config defaults), without any debouncing
+BATCH_FEATURES = {
+    'waist_y': "(left_hip.y + right_hip.y) / 2",
+}
+BATCH_CONDITIONS = {
+    'left_hand_out': "left_wrist.x_mirror < nose.x_mirror - deadzone",
+    'right_hand_out': "right_wrist.x_mirror > nose.x_mirror + deadzone",
+    'hand_up': "left_wrist.y < nose.y - up_threshold or right_wrist.y < nose.y - up_threshold",
+    'hand_down': "left_wrist.y > waist_y + down_threshold or right_wrist.y > waist_y + down_threshold",
+    'both_hands_out': "left_hand_out and right_hand_out",
+}
+BATCH_KEYBOARD_BINDINGS = [
+    {'name': "MOUSE CLICK", 'when': "both_hands_out", 'click': True, 'exclusive': True},
+    {'name': "LEFT", 'when': "left_hand_out", 'keys': ('left',)},
+    {'name': "RIGHT", 'when': "right_hand_out", 'keys': ('right',)},
+    {'name': "UP", 'when': "hand_up", 'keys': ('up', 'space')},
+    {'name': "DOWN", 'when': "hand_down", 'keys': ('down',)},
+]
+
+# Frame kinds that decide how controller state carries over
+_MISSING, _DEPTH_BAD, _BOTH_OUT, _NORMAL = 0, 1, 2, 3
+
+
+def _forward_fill(defined):
+    """For every frame, index of the latest frame <= it where state was defined (-1 if none)"""
+    index = np.where(defined, np.arange(len(defined)), -1)
+    return np.maximum.accumulate(index) if len(index) else index
+
+
+def matches_config():
+    """Whether GestureController runs exactly the keyboard logic of classify_keyboard_batch with config.py"""
+    return (GESTURE_FEATURES == BATCH_FEATURES and GESTURE_CONDITIONS == BATCH_CONDITIONS
+            and KEYBOARD_BINDINGS == BATCH_KEYBOARD_BINDINGS and not any(GESTURE_HYSTERESIS.values())
+            and not GESTURE_MIN_HOLD_S and not GESTURE_MIN_RELEASE_S and not GESTURE_MIN_VISIBILITY)
+
+
+def classify_keyboard_batch(landmarks, deadzone=DEADZONE, up_threshold=UP_THRESHOLD,
+                            down_threshold=DOWN_THRESHOLD, min_z=MIN_Z, max_z=MAX_Z):
+    """Classify an (N, 33, 4) landmark array the way GestureController does frame by frame
+
+    Frames whose nose x is NaN count as "no pose detected". Returns a dict of arrays:
+        gestures  (N,) uint8 - bitmask of GESTURE_* conditions met in the frame
+        active    (N,) int8 - gesture returned by the controller, as a trace gesture code
+        keys      (N, 5) bool - held state of KEY_NAMES after the frame
+        clicks    (N,) bool - frames where the both-hands mouse click fires
+        depth     (N,) int8 - DEPTH_* status of the frame
+    """
+    # Landmarks are stored as float32 (like LandmarkFrame); computed in float64 like the
+    # controller, which reads them as Python floats
+    lm = np.asarray(landmarks, dtype=np.float32)
+    nose_x = lm[:, NOSE, X].astype(np.float64)
+    nose_y = lm[:, NOSE, Y].astype(np.float64)
+    nose_z = lm[:, NOSE, Z].astype(np.float64)
+    lw_y = lm[:, LEFT_WRIST, Y].astype(np.float64)
+    rw_y = lm[:, RIGHT_WRIST, Y].astype(np.float64)
+    waist_y = (lm[:, LEFT_HIP, Y].astype(np.float64) + lm[:, RIGHT_HIP, Y].astype(np.float64)) / 2
+
+    nose_mirror = 1 - nose_x
+    lw_mirror = 1 - lm[:, LEFT_WRIST, X].astype(np.float64)
+    rw_mirror = 1 - lm[:, RIGHT_WRIST, X].astype(np.float64)
+
+    present = ~np.isnan(nose_x)
+    too_close = present & (nose_z < min_z)
+    too_far = present & ~too_close & (nose_z > max_z)
+    depth_ok = present & ~too_close & ~too_far
+
+    left = lw_mirror < nose_mirror - deadzone
+    right = rw_mirror > nose_mirror + deadzone
+    up = (lw_y < nose_y - up_threshold) | (rw_y < nose_y - up_threshold)
+    down = (lw_y > waist_y + down_threshold) | (rw_y > waist_y + down_threshold)
+    both_out = left & right
+
+    kind = np.full(len(lm), _MISSING, dtype=np.int8)
+    kind[too_close | too_far] = _DEPTH_BAD
+    kind[depth_ok & both_out] = _BOTH_OUT
+    kind[depth_ok & ~both_out] = _NORMAL
+
+    # Key state: set on normal frames, cleared by release_all on bad depth,
+    # carried over unchanged on missing and both-hands-out frames
+    computed = np.stack([left, right, up, down, up], axis=1) & (kind == _NORMAL)[:, None]
+    last = _forward_fill((kind == _NORMAL) | (kind == _DEPTH_BAD))
+    keys = np.where((last >= 0)[:, None], computed[np.maximum(last, 0)], False)
+
+    # both_sides flag: True after a both-hands-out frame, False after normal or bad depth frames
+    last = _forward_fill(kind != _MISSING)
+    both_sides = np.where(last >= 0, (kind == _BOTH_OUT)[np.maximum(last, 0)], False)
+    previous = np.concatenate(([False], both_sides[:-1]))
+    clicks = (kind == _BOTH_OUT) & ~previous
+
+    normal = kind == _NORMAL
+    gestures = np.zeros(len(lm), dtype=np.uint8)
+    gestures[normal & left] |= GESTURE_LEFT
+    gestures[normal & right] |= GESTURE_RIGHT
+    gestures[normal & up] |= GESTURE_UP
+    gestures[normal & down] |= GESTURE_DOWN
+    gestures[kind == _BOTH_OUT] |= GESTURE_CLICK
+
+    # Later checks in the controller overwrite the returned gesture
+    active = np.zeros(len(lm), dtype=np.int8)
+    for bit, name in ((GESTURE_LEFT, "LEFT"), (GESTURE_RIGHT, "RIGHT"), (GESTURE_UP, "UP"),
+                      (GESTURE_DOWN, "DOWN"), (GESTURE_CLICK, "MOUSE CLICK")):
+        active[(gestures & bit) != 0] = GESTURE_CODES[name]
+
+    depth = np.full(len(lm), DEPTH_NO_POSE, dtype=np.int8)
+    depth[depth_ok] = DEPTH_OK
+    depth[too_close] = DEPTH_TOO_CLOSE
+    depth[too_far] = DEPTH_TOO_FAR
+
+    return {'gestures': gestures, 'active': active, 'keys': keys, 'clicks': clicks, 'depth': depth}
+
+
+def classify_keyboard_sequential(landmarks, **thresholds):
+    """Reference implementation: run GestureController frame by frame with a recording backend
+
+    Returns the same dict as classify_keyboard_batch (without the gesture bitmask),
+    used to check that the vectorized classifier matches the controller exactly.
+    """
+    from gesture_controller import GestureController
+    from input_helpers import RecordingBackend
+
+    backend = RecordingBackend()
+    controller = GestureController(backend, **thresholds)
+    depth_codes = {"ok": DEPTH_OK, "too_close": DEPTH_TOO_CLOSE, "too_far": DEPTH_TOO_FAR}
+    count = len(landmarks)
+    active = np.zeros(count, dtype=np.int8)
+    keys = np.zeros((count, len(KEY_NAMES)), dtype=bool)
+    clicks = np.zeros(count, dtype=bool)
+    depth = np.full(count, DEPTH_NO_POSE, dtype=np.int8)
+    landmark_frame = LandmarkFrame()
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for i in range(count):
+            frame = landmarks_from_array(landmarks[i], out=landmark_frame)
+            if frame is not None:
+                status, _, gesture = controller.process_frame(frame, False, 480, 1920, 1080, 1.0)
+                depth[i] = depth_codes[status]
+                active[i] = GESTURE_CODES.get(gesture, 0)
+                clicks[i] = any(action == 'click' for _, action, _ in backend.events)
+                backend.clear()
+            keys[i] = [controller.keys_pressed[k] for k in KEY_NAMES]
+
+    return {'active': active, 'keys': keys, 'clicks': clicks, 'depth': depth}
+
+
+def count_key_events(keys):
+    """Count key press and release transitions in an (N, K) key state array"""
+    keys = np.asarray(keys, dtype=np.int8)
+    if len(keys) == 0:
+        return 0
+    changes = np.abs(np.diff(keys, axis=0)).sum()
+    return int(changes + keys[0].sum())
+
+
+def main(argv=None):
+    """Score recorded traces with the batch classifier"""
+    import argparse
+    import time
+    from trace_utils import TraceReader, GESTURE_NAMES
+
+    parser = argparse.ArgumentParser(description="Classify recorded landmark traces offline")
+    parser.add_argument("traces", nargs="+", help="Landmark trace files")
+    parser.add_argument("--deadzone", type=float, default=DEADZONE)
+    parser.add_argument("--up-threshold", type=float, default=UP_THRESHOLD)
+    parser.add_argument("--down-threshold", type=float, default=DOWN_THRESHOLD)
+    parser.add_argument("--verify", action="store_true",
+                        help="Also run the frame-by-frame controller and check the results match")
+    args = parser.parse_args(argv)
+    thresholds = {'deadzone': args.deadzone, 'up_threshold': args.up_threshold,
+                  'down_threshold': args.down_threshold}
+
+    for path in args.traces:
+        with TraceReader(path) as trace:
+            start = time.perf_counter()
+            result = classify_keyboard_batch(trace.landmarks, **thresholds)
+            elapsed = time.perf_counter() - start
+            counts = np.bincount(result['active'], minlength=len(GESTURE_NAMES))
+            summary = ", ".join(f"{name}: {counts[code]}" for code, name in enumerate(GESTURE_NAMES) if name)
+            print(f"{path}: {len(trace)} frames in {elapsed * 1000:.1f} ms | {summary} | "
+                  f"key events: {count_key_events(result['keys'])}, clicks: {int(result['clicks'].sum())}")
+            if args.verify:
+                reference = classify_keyboard_sequential(trace.landmarks, **thresholds)
+                match = all(np.array_equal(result[k], reference[k]) for k in reference)
+                print(f"  matches controller: {'yes' if match else 'NO'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,153 +3,268 @@ Gesture recognition logic for Motion Controller
 Handles pose detection and gesture interpretation
 """
 
-import pyautogui
-from config import DEADZONE, UP_THRESHOLD, DOWN_THRESHOLD, MIN_Z, MAX_Z
-from input_helpers import press_key, release_key
+import time
+
+from config import (
+    DEADZONE, UP_THRESHOLD, DOWN_THRESHOLD, MIN_Z, MAX_Z, KEY_MAP, KEYBOARD_BINDINGS, MOUSE_BINDINGS, MOUSE_CURSOR,
+    GESTURE_HYSTERESIS, GESTURE_MIN_HOLD_S, GESTURE_MIN_RELEASE_S, GESTURE_MIN_VISIBILITY
+)
+from gesture_rules import compile_rules
+from gesture_state import GestureStateMachine
+from input_helpers import create_backend
 
 class GestureController:
     """Manages gesture recognition and input control"""
     
-    def __init__(self):
-        self.keys_pressed = {
-            'left': False,
-            'right': False,
-            'up': False,
-            'down': False,
-            'space': False,
-            'mouse_click': False,
-            'both_sides': False
-        }
+    def __init__(self, output=None, deadzone=DEADZONE, up_threshold=UP_THRESHOLD,
+                 down_threshold=DOWN_THRESHOLD, min_z=MIN_Z, max_z=MAX_Z, key_map=None,
+                 keyboard_bindings=None, mouse_bindings=None, hysteresis=None, min_hold=GESTURE_MIN_HOLD_S,
+                 min_release=GESTURE_MIN_RELEASE_S, min_visibility=GESTURE_MIN_VISIBILITY):
+        # Input backend or InputDispatcher that receives key and mouse events
+        self.output = output if output is not None else create_backend()
+        # Logical control (left, right, up, down, space) -> OS key name, None disables a control
+        self.key_map = dict(KEY_MAP, **(key_map or {}))
+        # Outputs that trace latency accept the capture time of each frame, or (capture time, gesture)
+        # for the events of a gesture so they are reported under its binding name instead of the OS key
+        self._tag_frame = getattr(self.output, 'tag_frame', None)
+        self.deadzone = deadzone
+        self.up_threshold = up_threshold
+        self.down_threshold = down_threshold
+        self.min_z = min_z
+        self.max_z = max_z
+        # Bindings are compiled once with the thresholds inlined; held gestures use the relaxed exit thresholds
+        thresholds = {'deadzone': deadzone, 'up_threshold': up_threshold, 'down_threshold': down_threshold}
+        hysteresis = dict(GESTURE_HYSTERESIS, **(hysteresis or {}))
+        exit_thresholds = {name: value - hysteresis.get(name, 0.0) for name, value in thresholds.items()}
+        self.keyboard_rules = compile_rules(keyboard_bindings or KEYBOARD_BINDINGS, thresholds,
+                                            exit_params=exit_thresholds, min_visibility=min_visibility)
+        self.mouse_rules = compile_rules(mouse_bindings or MOUSE_BINDINGS, thresholds, cursor=MOUSE_CURSOR,
+                                         exit_params=exit_thresholds, min_visibility=min_visibility)
+        # Gesture state machines, only when some debouncing is configured (otherwise rules act directly)
+        self.keyboard_states = None
+        self.mouse_states = None
+        bindings = self.keyboard_rules.bindings + self.mouse_rules.bindings
+        if (any(hysteresis.values()) or min_hold or min_release or min_visibility
+                or any('min_hold' in b or 'min_release' in b for b in bindings)):
+            self.keyboard_states = GestureStateMachine(self.keyboard_rules, min_hold, min_release)
+            self.mouse_states = GestureStateMachine(self.mouse_rules, min_hold, min_release)
+        self.frame_time = None
+        # Latency tracing: per rule set, each output's raw value (plain rules, no debouncing), the capture
+        # time that last changed and the capture time the output itself last changed
+        self._onsets = {}
+        self.keys_pressed = {'left': False, 'right': False, 'up': False, 'down': False, 'space': False}
+        for name in self.keyboard_rules.keys() + self.mouse_rules.keys():
+            self.keys_pressed[name] = False
+        self.keys_pressed['mouse_click'] = False
+        # Click bindings fire once when met; latched until they are no longer met
+        self.clicks_latched = {}
+        # State vector sent last and its rule set; None when keys_pressed may differ from it
+        self._last_state = None
+        self._last_rules = None
         self.last_mouse_x = None
         self.last_mouse_y = None
     
+    def _key_down(self, name):
+        key = self.key_map.get(name, name)
+        if key is not None:
+            self.output.key_down(key)
+
+    def _key_up(self, name):
+        key = self.key_map.get(name, name)
+        if key is not None:
+            self.output.key_up(key)
+    
     def check_depth(self, nose_z):
         """Check if user is at correct distance from camera"""
-        if nose_z < MIN_Z:
+        if nose_z < self.min_z:
             return "too_close", "Move back (too close)"
-        elif nose_z > MAX_Z:
+        elif nose_z > self.max_z:
             return "too_far", "Move closer (too far)"
         return "ok", "Position OK"
     
-    def handle_keyboard_mode(self, landmarks, nose_x_mirror, frame_h, show_hints, screen_width, screen_height):
-        """Process gestures in keyboard control mode"""
-        lw = landmarks['left_wrist']
-        rw = landmarks['right_wrist']
-        lh = landmarks['left_hip']
-        rh = landmarks['right_hip']
-        
-        lw_x_mirror = landmarks['left_wrist_mirror']
-        rw_x_mirror = landmarks['right_wrist_mirror']
-        
-        # Check for both hands spread (mouse click gesture)
-        both_hands_out = (lw_x_mirror < nose_x_mirror - DEADZONE) and (rw_x_mirror > nose_x_mirror + DEADZONE)
-        
-        if both_hands_out:
-            if not self.keys_pressed['both_sides']:
-                pyautogui.click(screen_width // 2, screen_height // 2)
-                self.keys_pressed['both_sides'] = True
-                print("🖱️ Mouse click (both hands spread)")
-            return "MOUSE CLICK"
-        else:
-            self.keys_pressed['both_sides'] = False
+    def process_frame(self, landmarks, mouse_enabled, frame_h, screen_width, screen_height,
+                      mouse_smoothing, show_hints=False, capture_time=None, raw_landmarks=None):
+        """Run the depth check and the active control mode for one frame
         
-        active_gesture = None
+        landmarks is a LandmarkFrame (see landmark_utils).
+        capture_time tags the input events of this frame for latency tracing.
+        raw_landmarks are the unfiltered landmarks when landmarks went through
+        a filter; latency is traced from the frame they first asked for an input.
+        Returns (depth_status, hint_text, active_gesture)
+        """
+        self.frame_time = capture_time
+        if self._tag_frame is not None:
+            self._tag_frame(capture_time)
+        if self._tag_frame is not None and capture_time is not None:
+            self._track_onsets(self.mouse_rules if mouse_enabled else self.keyboard_rules,
+                               raw_landmarks if raw_landmarks else landmarks)
+        depth_status, hint_text = self.check_depth(landmarks.nose.z)
+        if depth_status != "ok":
+            # User too close or too far - release all controls
+            self.release_all()
+            return depth_status, hint_text, None
         
-        # LEFT gesture
-        if lw_x_mirror < nose_x_mirror - DEADZONE and not both_hands_out:
-            if not self.keys_pressed['left']:
-                press_key('left')
-                self.keys_pressed['left'] = True
-            active_gesture = "LEFT"
+        if mouse_enabled:
+            active_gesture = self.handle_mouse_mode(
+                landmarks, landmarks.nose.x_mirror, screen_width, screen_height, mouse_smoothing
+            )
         else:
-            if self.keys_pressed['left']:
-                release_key('left')
-                self.keys_pressed['left'] = False
-        
-        # RIGHT gesture
-        if rw_x_mirror > nose_x_mirror + DEADZONE and not both_hands_out:
-            if not self.keys_pressed['right']:
-                press_key('right')
-                self.keys_pressed['right'] = True
-            active_gesture = "RIGHT"
-        else:
-            if self.keys_pressed['right']:
-                release_key('right')
-                self.keys_pressed['right'] = False
-        
-        # UP gesture
-        if lw.y < landmarks['nose'].y - UP_THRESHOLD or rw.y < landmarks['nose'].y - UP_THRESHOLD:
-            if not self.keys_pressed['up']:
-                press_key('up')
-                self.keys_pressed['up'] = True
-            if not self.keys_pressed['space']:
-                press_key('space')
-                self.keys_pressed['space'] = True
-            active_gesture = "UP"
-        else:
-            if self.keys_pressed['up']:
-                release_key('up')
-                self.keys_pressed['up'] = False
-            if self.keys_pressed['space']:
-                release_key('space')
-                self.keys_pressed['space'] = False
-        
-        # DOWN gesture
-        waist_y = (lh.y + rh.y) / 2
-        if lw.y > waist_y + DOWN_THRESHOLD or rw.y > waist_y + DOWN_THRESHOLD:
-            if not self.keys_pressed['down']:
-                press_key('down')
-                self.keys_pressed['down'] = True
-            active_gesture = "DOWN"
-        else:
-            if self.keys_pressed['down']:
-                release_key('down')
-                self.keys_pressed['down'] = False
-        
+            active_gesture = self.handle_keyboard_mode(
+                landmarks, landmarks.nose.x_mirror, frame_h, show_hints, screen_width, screen_height
+            )
+        return depth_status, hint_text, active_gesture
+    
+    def _evaluate(self, rules, states, landmarks):
+        """(state, gesture, exclusive, cursor) of a frame, through the gesture state machine when enabled"""
+        if states is None:
+            return rules.evaluate(landmarks)
+        enter, met, visible, cursor = rules.conditions(landmarks, states.active)
+        now = self.frame_time if self.frame_time is not None else time.perf_counter()
+        state, active_gesture, exclusive = rules.combine(states.update(enter, met, visible, now))
+        return state, active_gesture, exclusive, cursor
+    
+    def _apply_state(self, rules, state, exclusive, screen_width, screen_height):
+        """Send the changes of a rule set's state vector against the previous frame"""
+        if state is None:
+            # Exclusive binding met - only its click changes, everything else stays as it is
+            self._set_output(rules, rules.outputs[exclusive], True, screen_width, screen_height)
+            self._last_state = None
+            return
+        for output, value in zip(rules.outputs, state):
+            self._set_output(rules, output, value, screen_width, screen_height)
+        self._last_state = state
+        self._last_rules = rules
+    
+    def _track_onsets(self, rules, landmarks):
+        """Note the frames where each output of the plain rules (normal thresholds, no debouncing) changed"""
+        onsets = self._onsets.get(rules)
+        if onsets is None:
+            count = len(rules.outputs)
+            onsets = self._onsets[rules] = ([False] * count, [self.frame_time] * count, [self.frame_time] * count)
+        raw, changed, _ = onsets
+        state, exclusive = None, None
+        if self.check_depth(landmarks.nose.z)[0] == "ok":
+            state, _, exclusive, _ = rules.evaluate(landmarks)
+            if state is None:
+                state = [value or i == exclusive for i, value in enumerate(raw)]
+        for i in range(len(raw)):
+            value = state is not None and state[i]
+            if value != raw[i]:
+                raw[i] = value
+                changed[i] = self.frame_time
+
+    def _tag_output(self, output, value, rules=None):
+        """Tag the next event with the motion onset behind an output change and its binding name
+
+        The onset is the frame where the plain rules on the raw landmarks
+        last changed the output to this value, so hysteresis, hold times and
+        filter lag count towards the traced latency - but never before the
+        output's own previous change. When they disagree (exit, a filtered
+        gesture the raw landmarks never made) it is the current frame.
+        """
+        capture_time, label = self.frame_time, output[1]
+        for candidate in (rules,) if rules is not None else (self.keyboard_rules, self.mouse_rules):
+            sources = candidate.sources.get(output)
+            if not sources:
+                continue
+            label = candidate.names[sources[0]]
+            if candidate in self._onsets:
+                raw, changed, emitted = self._onsets[candidate]
+                i = candidate.outputs.index(output)
+                if capture_time is not None:
+                    if raw[i] == value:
+                        capture_time = max(changed[i], emitted[i])
+                    emitted[i] = self.frame_time
+            break
+        self._tag_frame((capture_time, label if value else f"{label} release"))
+
+    def _set_output(self, rules, output, value, screen_width, screen_height):
+        kind, name = output
+        if kind == 'click':
+            if value and not self.clicks_latched.get(name):
+                if self._tag_frame is not None:
+                    self._tag_output(output, True, rules)
+                self.output.click(screen_width // 2, screen_height // 2)
+                print(f"🖱️ Mouse click ({name})")
+            self.clicks_latched[name] = value
+        elif value != self.keys_pressed[name]:
+            if self._tag_frame is not None:
+                self._tag_output(output, value, rules)
+            if kind == 'button':
+                self.output.mouse_down() if value else self.output.mouse_up()
+            elif value:
+                self._key_down(name)
+            else:
+                self._key_up(name)
+            self.keys_pressed[name] = value
+    
+    def handle_keyboard_mode(self, landmarks, nose_x_mirror, frame_h, show_hints, screen_width, screen_height):
+        """Process gestures in keyboard control mode (KEYBOARD_BINDINGS)"""
+        rules = self.keyboard_rules
+        state, active_gesture, exclusive, _ = self._evaluate(rules, self.keyboard_states, landmarks)
+        # Only frames that change the state vector send anything
+        if state is None or state != self._last_state or rules is not self._last_rules:
+            self._apply_state(rules, state, exclusive, screen_width, screen_height)
         return active_gesture
     
     def handle_mouse_mode(self, landmarks, nose_x_mirror, screen_width, screen_height, mouse_smoothing):
-        """Process gestures in mouse control mode"""
-        rw = landmarks['right_wrist']
-        lw_x_mirror = landmarks['left_wrist_mirror']
-        
-        # Right hand controls cursor
-        target_x = int((1 - rw.x) * screen_width)
-        target_y = int(rw.y * screen_height)
+        """Process gestures in mouse control mode (MOUSE_CURSOR and MOUSE_BINDINGS)"""
+        state, active_gesture, exclusive, cursor = self._evaluate(self.mouse_rules, self.mouse_states, landmarks)
         
         # Initialize mouse position if needed
         if self.last_mouse_x is None:
             self.last_mouse_x = screen_width // 2
             self.last_mouse_y = screen_height // 2
         
-        # Smooth movement
+        # Smooth movement towards the cursor target
+        target_x = int(cursor[0] * screen_width)
+        target_y = int(cursor[1] * screen_height)
         new_x = int(self.last_mouse_x + (target_x - self.last_mouse_x) * mouse_smoothing)
         new_y = int(self.last_mouse_y + (target_y - self.last_mouse_y) * mouse_smoothing)
         
-        pyautogui.moveTo(new_x, new_y)
+        self.output.move_to(new_x, new_y)
         self.last_mouse_x = new_x
         self.last_mouse_y = new_y
         
-        # Left hand left - hold mouse button
-        active_gesture = None
-        if lw_x_mirror < nose_x_mirror - DEADZONE:
-            if not self.keys_pressed['mouse_click']:
-                pyautogui.mouseDown()
-                self.keys_pressed['mouse_click'] = True
-            active_gesture = "CLICK HOLD"
-        else:
-            if self.keys_pressed['mouse_click']:
-                pyautogui.mouseUp()
-                self.keys_pressed['mouse_click'] = False
-        
+        if state is None or state != self._last_state or self.mouse_rules is not self._last_rules:
+            self._apply_state(self.mouse_rules, state, exclusive, screen_width, screen_height)
         return active_gesture
     
     def release_all(self):
         """Release all pressed keys and buttons"""
         for k in self.keys_pressed:
             if self.keys_pressed[k]:
+                if self._tag_frame is not None:
+                    self._tag_output(('button', k) if k == 'mouse_click' else ('key', k), False)
                 if k == 'mouse_click':
-                    pyautogui.mouseUp()
-                elif k != 'both_sides':
-                    release_key(k)
+                    self.output.mouse_up()
+                else:
+                    self._key_up(k)
                 self.keys_pressed[k] = False
+        self.clicks_latched.clear()
+        self._last_state = None
+        for states in (self.keyboard_states, self.mouse_states):
+            if states is not None:
+                states.reset()
+    
+    def gesture_names(self):
+        """Names of the gestures process_frame can return (the named bindings of both control modes)"""
+        return [binding['name'] for rules in (self.keyboard_rules, self.mouse_rules)
+                for binding in rules.bindings if binding.get('name')]
+
+    def gesture_stats(self):
+        """GestureStateMachine statistics per control mode ({} when debouncing is off)"""
+        stats = {}
+        if self.keyboard_states is not None:
+            stats['keyboard'] = self.keyboard_states.stats()
+            stats['mouse'] = self.mouse_states.stats()
+        return stats
+    
+    def release_mouse_button(self):
+        """Release the mouse button held by a gesture (when leaving mouse mode)"""
+        if self.keys_pressed['mouse_click']:
+            if self._tag_frame is not None:
+                self._tag_output(('button', 'mouse_click'), False)
+            self.output.mouse_up()
+            self.keys_pressed['mouse_click'] = False
+            self._last_state = None
@@ -0,0 +1,295 @@
+"""
+Gesture rule engine for Motion Controller
+Compiles the gesture bindings declared in config.py into one generated evaluator function per control mode
+"""
+
+import ast
+
+from config import GESTURE_FEATURES, GESTURE_CONDITIONS
+from landmark_utils import LANDMARK_NAMES
+
+# Landmarks rule expressions can use (all pose landmarks of a LandmarkFrame)
+LANDMARKS = LANDMARK_NAMES
+# Landmark attributes (columns of LandmarkFrame.points); x_mirror is 1 - x, the position in the mirrored camera view
+ATTRIBUTES = ('x', 'y', 'z', 'visibility', 'x_mirror')
+# Functions rule expressions can call
+FUNCTIONS = ('abs', 'min', 'max')
+
+_ALLOWED_NODES = (
+    ast.Expression, ast.BoolOp, ast.And, ast.Or, ast.UnaryOp, ast.Not, ast.USub, ast.UAdd,
+    ast.BinOp, ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Compare, ast.Lt, ast.LtE, ast.Gt, ast.GtE,
+    ast.Eq, ast.NotEq, ast.Call, ast.Name, ast.Attribute, ast.Constant, ast.Load, ast.IfExp,
+)
+
+
+class _Resolver(ast.NodeTransformer):
+    """Rewrites the names of one expression into the evaluator's local variables"""
+
+    def __init__(self, compiler, context):
+        self.compiler = compiler
+        self.context = context
+        self.landmarks = set()
+
+    def error(self, message):
+        return ValueError(f"Gesture rule {self.context}: {message}")
+
+    def generic_visit(self, node):
+        if not isinstance(node, _ALLOWED_NODES):
+            raise self.error(f"{type(node).__name__} is not allowed in rule expressions")
+        return super().generic_visit(node)
+
+    def visit_Constant(self, node):
+        if not isinstance(node.value, (int, float)):
+            raise self.error(f"constant {node.value!r} is not a number")
+        return node
+
+    def visit_Call(self, node):
+        if not isinstance(node.func, ast.Name) or node.func.id not in FUNCTIONS or node.keywords:
+            raise self.error(f"only {', '.join(FUNCTIONS)} can be called")
+        node.args = [self.visit(arg) for arg in node.args]
+        return node
+
+    def visit_Attribute(self, node):
+        if not isinstance(node.value, ast.Name) or node.value.id not in LANDMARKS:
+            raise self.error(f"unknown landmark in {ast.unparse(node)} (expected one of {', '.join(LANDMARKS)})")
+        if node.attr not in ATTRIBUTES:
+            raise self.error(f"unknown attribute {node.attr} (expected one of {', '.join(ATTRIBUTES)})")
+        self.landmarks.add(node.value.id)
+        return ast.Name(self.compiler.landmark_attribute(node.value.id, node.attr), ast.Load())
+
+    def visit_Name(self, node):
+        compiler = self.compiler
+        if node.id in compiler.params:
+            return ast.Constant(compiler.params[node.id])
+        if node.id in compiler.features or node.id in compiler.conditions:
+            if node.id in compiler.features:
+                var = compiler.named(node.id, compiler.features, 'f_')
+            else:
+                var = compiler.named(node.id, compiler.conditions, 'c_')
+            self.landmarks |= compiler.uses.get(var, frozenset())
+            return ast.Name(var, ast.Load())
+        if node.id in LANDMARKS:
+            raise self.error(f"use an attribute of {node.id} (e.g. {node.id}.y)")
+        raise self.error(f"unknown name {node.id}")
+
+
+class _Compiler:
+    """Emits an evaluator body; every feature and condition becomes one local variable computed once"""
+
+    def __init__(self, params, features, conditions):
+        self.params = dict(params)
+        self.features = features
+        self.conditions = conditions
+        self.suffix = ""  # Appended to feature and condition variables compiled with other params
+        self.lines = []
+        self.defined = set()
+        self.names = {}  # Feature or condition variable (with suffix) -> variable holding it
+        self.sources = {}  # Emitted source -> variable, so equal expressions share one variable
+        self.uses = {}  # Variable -> landmarks it depends on
+        self.attributes = []  # Landmark attributes read from the frame
+        self._resolving = []
+        self._inline = 0
+
+    def emit(self, name, source):
+        self.lines.append(f"    {name} = {source}")
+        self.defined.add(name)
+
+    def define(self, preferred, source, uses):
+        """Variable holding source; emitted under the preferred name unless an equal one exists"""
+        if source.isidentifier():
+            return source
+        if source not in self.sources:
+            self.emit(preferred, source)
+            self.sources[source] = preferred
+            self.uses[preferred] = uses
+        return self.sources[source]
+
+    def landmark_attribute(self, landmark, attr):
+        name = f"{landmark}_{attr}"
+        if name not in self.defined:
+            if attr == 'x_mirror':
+                self.emit(name, f"1 - {self.landmark_attribute(landmark, 'x')}")
+            else:
+                # Plain floats straight from the frame's flat memoryview
+                if "values" not in self.defined:
+                    self.emit("values", "landmarks.values")
+                self.emit(name, f"values[{LANDMARKS.index(landmark) * 4 + ATTRIBUTES.index(attr)}]")
+                self.attributes.append(f"{landmark}.{attr}")
+            self.uses[name] = frozenset((landmark,))
+        return name
+
+    def named(self, name, table, prefix):
+        """Variable of a named feature or condition, emitting it (and what it uses) on first use"""
+        key = prefix + name + self.suffix
+        if key not in self.names:
+            if key in self._resolving:
+                raise ValueError(f"Gesture rule {name} refers to itself")
+            self._resolving.append(key)
+            source, uses = self.expression(table[name], name)
+            self._resolving.pop()
+            self.names[key] = self.define(key, source, uses)
+        return self.names[key]
+
+    def expression(self, text, context):
+        """Python source of a rule expression over the evaluator's variables and the landmarks it uses"""
+        try:
+            tree = ast.parse(str(text).strip(), mode='eval')
+        except SyntaxError as e:
+            raise ValueError(f"Gesture rule {context}: {e.msg} in {text!r}") from None
+        resolver = _Resolver(self, context)
+        return ast.unparse(resolver.visit(tree).body), frozenset(resolver.landmarks)
+
+    def value(self, text, context):
+        """Variable holding an expression (a condition name or an inline expression)"""
+        if isinstance(text, str) and text.strip() in self.conditions:
+            return self.named(text.strip(), self.conditions, 'c_')
+        source, uses = self.expression(text, context)
+        self._inline += 1
+        return self.define(f"v{self._inline}{self.suffix}", source, uses)
+
+    def visible(self, var, min_visibility, preferred):
+        """Variable that is True when every landmark var depends on has at least min_visibility"""
+        names = [self.landmark_attribute(landmark, 'visibility') for landmark in sorted(self.uses.get(var, ()))]
+        if not names:
+            return "True"
+        lowest = names[0] if len(names) == 1 else f"min({', '.join(names)})"
+        return self.define(preferred, f"{lowest} >= {min_visibility!r}", frozenset())
+
+
+class RuleSet:
+    """A compiled control mode
+
+    evaluate(landmarks) returns (state, gesture, exclusive, cursor):
+        state      tuple aligned with outputs, or None while an exclusive binding is met
+        gesture    name of the last met binding (None when no binding is met)
+        exclusive  index in outputs of the met exclusive binding's click, or None
+        cursor     normalized (x, y) from the cursor expressions, or None without them
+    outputs lists (kind, name) per state entry: ('key', logical key),
+    ('button', 'mouse_click') and ('click', binding name); sources maps each
+    output to the indices of the bindings that drive it.
+
+    For the gesture state machine the same decision is split in two steps:
+    conditions(landmarks, held) returns (enter, met, visible, cursor) per
+    binding - enter with the normal thresholds, met with the exit thresholds
+    for the bindings held active, visible None without visibility gating -
+    and combine(active) turns the active bindings into (state, gesture, exclusive).
+    """
+
+    def __init__(self, bindings, names, outputs, sources, functions, attributes, source):
+        self.bindings = bindings
+        self.names = names
+        self.outputs = outputs
+        self.sources = sources
+        self.evaluate = functions['evaluate']
+        self.conditions = functions['conditions']
+        self.combine = functions['combine']
+        self.attributes = attributes
+        self.source = source
+
+    def keys(self):
+        return [name for kind, name in self.outputs if kind == 'key']
+
+
+def _decide(lines, bindings, names, outputs, var, tail=""):
+    """Append the lines that turn binding values into (state, gesture, exclusive); var(i) is binding i's value"""
+    # Exclusive bindings are checked first, so the other bindings are only computed without them
+    for i, binding in enumerate(bindings):
+        if binding.get('exclusive'):
+            lines.append(f"    if {var(i)}:")
+            lines.append(f"        return None, {names[i]!r}, {outputs.index(('click', names[i]))}{tail}")
+
+    sources = {output: [] for output in outputs}
+    gesture = "None"
+    for i, binding in enumerate(bindings):
+        if binding.get('exclusive'):
+            continue
+        value = var(i)
+        for key in binding.get('keys', ()):
+            sources[('key', key)].append(value)
+        if binding.get('button'):
+            sources[('button', 'mouse_click')].append(value)
+        if binding.get('click'):
+            sources[('click', names[i])].append(value)
+        if binding.get('name'):
+            gesture = f"{names[i]!r} if {value} else {gesture}"
+    state = [" or ".join(sources[output]) or "False" for output in outputs]
+    lines.append(f"    return ({', '.join(state)},), {gesture}, None{tail}")
+
+
+def compile_rules(bindings, params, cursor=None, exit_params=None, min_visibility=0.0,
+                  features=None, conditions=None):
+    """Compile bindings into a RuleSet
+
+    params binds threshold names (deadzone, ...) to their values; they are
+    inlined as constants. exit_params are the thresholds an active gesture is
+    tested with (hysteresis) and min_visibility the landmark visibility a
+    gesture needs to start; both only apply to conditions(). Only the
+    landmark attributes, features and conditions the bindings reach are
+    computed, each once per frame. Exclusive bindings (a one-shot click, e.g.
+    both hands spread) take precedence over the others, which keep their
+    state while one is met.
+    """
+    features = GESTURE_FEATURES if features is None else features
+    conditions = GESTURE_CONDITIONS if conditions is None else conditions
+    for i, binding in enumerate(bindings):
+        unknown = set(binding) - {'name', 'when', 'keys', 'button', 'click', 'exclusive', 'min_hold', 'min_release'}
+        if unknown or 'when' not in binding:
+            raise ValueError(f"Gesture binding {i}: needs 'when', unknown fields {sorted(unknown)}")
+        if binding.get('exclusive') and (binding.get('keys') or binding.get('button') or not binding.get('click')):
+            raise ValueError(f"Gesture binding {binding.get('name', i)}: exclusive bindings can only click")
+    names = [binding.get('name') or f"binding {i}" for i, binding in enumerate(bindings)]
+
+    outputs = []
+    for binding in bindings:
+        if not binding.get('exclusive'):
+            outputs += [('key', key) for key in binding.get('keys', ()) if ('key', key) not in outputs]
+    if any(binding.get('button') and not binding.get('exclusive') for binding in bindings):
+        outputs.append(('button', 'mouse_click'))
+    outputs += [('click', names[i]) for i, b in enumerate(bindings) if b.get('click') and not b.get('exclusive')]
+    outputs += [('click', names[i]) for i, b in enumerate(bindings) if b.get('exclusive')]
+    output_sources = {output: [] for output in outputs}
+    for i, binding in enumerate(bindings):
+        if binding.get('exclusive') or binding.get('click'):
+            output_sources[('click', names[i])].append(i)
+        if not binding.get('exclusive'):
+            for key in binding.get('keys', ()):
+                output_sources[('key', key)].append(i)
+            if binding.get('button'):
+                output_sources[('button', 'mouse_click')].append(i)
+
+    def cursor_source(compiler):
+        if cursor is None:
+            return "None"
+        return f"({compiler.value(cursor[0], 'cursor x')}, {compiler.value(cursor[1], 'cursor y')})"
+
+    # evaluate(): the whole decision in one pass
+    compiler = _Compiler(params, features, conditions)
+    tail = f", {cursor_source(compiler)}"
+    _decide(compiler.lines, bindings, names, outputs, lambda i: compiler.value(bindings[i]['when'], names[i]), tail)
+    attributes = compiler.attributes
+    sources = ["def evaluate(landmarks):\n" + "\n".join(compiler.lines)]
+
+    # conditions(): every binding with the enter and exit thresholds
+    compiler = _Compiler(params, features, conditions)
+    cursor_values = cursor_source(compiler)
+    enter = [compiler.value(binding['when'], name) for binding, name in zip(bindings, names)]
+    compiler.params = dict(params, **(exit_params or {}))
+    compiler.suffix = "__exit"
+    stay = [compiler.value(binding['when'], name) for binding, name in zip(bindings, names)]
+    met = [e if e == s else f"({s} if held[{i}] else {e})" for i, (e, s) in enumerate(zip(enter, stay))]
+    visible = "None"
+    if min_visibility > 0:
+        gates = [compiler.visible(e, min_visibility, f"g{i}") for i, e in enumerate(enter)]
+        visible = f"({', '.join(gates)},)"
+    sources.append("def conditions(landmarks, held):\n" + "\n".join(compiler.lines) + "\n"
+                   f"    return ({', '.join(enter)},), ({', '.join(met)},), {visible}, {cursor_values}")
+
+    # combine(): the decision over the state machine's active bindings
+    lines = [f"    {''.join(f'b{i}, ' for i in range(len(bindings)))}= active"]
+    _decide(lines, bindings, names, outputs, lambda i: f"b{i}")
+    sources.append("def combine(active):\n" + "\n".join(lines))
+
+    source = "\n\n".join(sources) + "\n"
+    namespace = {}
+    exec(compile(source, "<gesture rules>", "exec"), namespace)
+    return RuleSet(bindings, names, outputs, output_sources, namespace, attributes, source)
@@ -0,0 +1,100 @@
+"""
+Gesture state machine for Motion Controller
+Debounces the compiled gesture rules with hysteresis, minimum hold and release times and visibility gating
+"""
+
+import math
+
+from config import GESTURE_MIN_HOLD_S, GESTURE_MIN_RELEASE_S
+
+# Why a wanted state change was held back
+BLOCK_REASONS = ('hold', 'release', 'visibility')
+
+
+class GestureStateMachine:
+    """Active state per binding of a RuleSet that only changes once the change is confirmed
+
+    The rule set applies the hysteresis: a gesture that is active is tested
+    with its relaxed exit thresholds. On top of that a gesture stays active
+    for at least its minimum hold time, cannot start again within its
+    minimum release time after it ended, and cannot start while the
+    landmarks it uses are below the visibility limit. Releases are never
+    held back by visibility, so a key does not stay pressed when the hand
+    leaves the frame. Every change of the
+    plain rules (normal thresholds, no timing) that does not reach the
+    output is counted as a suppressed transition.
+    """
+
+    def __init__(self, rules, min_hold=GESTURE_MIN_HOLD_S, min_release=GESTURE_MIN_RELEASE_S):
+        self.names = rules.names
+        self.min_hold = [binding.get('min_hold', min_hold) for binding in rules.bindings]
+        self.min_release = [binding.get('min_release', min_release) for binding in rules.bindings]
+        count = len(self.names)
+        self.active = [False] * count  # Also passed to the rule set as the held state
+        self.changed_at = [-math.inf] * count
+        self._raw = [False] * count
+        self._blocked = [None] * count  # Reason the pending change is held back
+        self.transitions = [0] * count
+        self.raw_transitions = [0] * count
+        self.blocked = {reason: [0] * count for reason in BLOCK_REASONS}
+
+    def update(self, enter, met, visible, now):
+        """Advance one frame with the rule set's conditions() output; returns the active state per binding"""
+        active = self.active
+        for i, want in enumerate(met):
+            if enter[i] != self._raw[i]:
+                self._raw[i] = enter[i]
+                self.raw_transitions[i] += 1
+            if want == active[i]:
+                self._blocked[i] = None
+                continue
+            if not active[i] and visible is not None and not visible[i]:
+                reason = 'visibility'
+            elif active[i] and now - self.changed_at[i] < self.min_hold[i]:
+                reason = 'hold'
+            elif not active[i] and now - self.changed_at[i] < self.min_release[i]:
+                reason = 'release'
+            else:
+                active[i] = want
+                self.changed_at[i] = now
+                self.transitions[i] += 1
+                self._blocked[i] = None
+                continue
+            if self._blocked[i] != reason:
+                # Count each held-back change once, not every frame it waits
+                self._blocked[i] = reason
+                self.blocked[reason][i] += 1
+        return active
+
+    def reset(self):
+        """Make every gesture idle without counting transitions (controls released by the depth check)"""
+        for i in range(len(self.active)):
+            self.active[i] = False
+            self._raw[i] = False
+            self._blocked[i] = None
+            self.changed_at[i] = -math.inf
+
+    def stats(self):
+        """Applied, raw and suppressed transitions, in total and per gesture"""
+        gestures = {}
+        for i, name in enumerate(self.names):
+            gestures[name] = {
+                'transitions': self.transitions[i],
+                'raw_transitions': self.raw_transitions[i],
+                'suppressed': max(self.raw_transitions[i] - self.transitions[i], 0),
+                **{f"blocked_{reason}": self.blocked[reason][i] for reason in BLOCK_REASONS},
+            }
+        return {
+            'transitions': sum(self.transitions),
+            'raw_transitions': sum(self.raw_transitions),
+            'suppressed': sum(g['suppressed'] for g in gestures.values()),
+            'blocked': {reason: sum(counts) for reason, counts in self.blocked.items()},
+            'gestures': gestures,
+        }
+
+
+def format_stats(stats):
+    """One-line summary of GestureStateMachine.stats()"""
+    blocked = ", ".join(f"{reason} {count}" for reason, count in stats['blocked'].items())
+    return (f"{stats['transitions']} gesture transitions of {stats['raw_transitions']} raw "
+            f"({stats['suppressed']} suppressed; held back by {blocked})")
@@ -0,0 +1,369 @@
+"""
+Headless pipeline for Motion Controller
+Runs capture -> pose detection -> gesture recognition without any GUI windows
+
+Usage:
+    python headless.py --video session.mp4 --output events.jsonl
+    python headless.py --images frames/ --mouse
+    python headless.py --camera 0 --max-frames 600 --record session.trace
+    python headless.py --video session.mp4 --no-cache --model-complexity 2
+    python headless.py --trace session.trace
+    python headless.py --trace session.trace --no-events --hysteresis 0.03 --min-hold-ms 100
+    python headless.py --trace session.trace --latency --replay-delay-ms 33 --latency-report latency.json
+"""
+
+import argparse
+import contextlib
+import json
+import sys
+import time
+
+import cv2
+import mediapipe as mp
+
+from calibration import load_calibration
+from camera_utils import open_frame_source, extract_landmarks, FrameReader
+from gesture_controller import GestureController
+from gesture_state import format_stats
+from pose_utils import AdaptivePoseEstimator
+from pose_cache import PoseCache, CachedPoseEstimator
+from landmark_filters import FILTER_KINDS, LandmarkFilter
+from input_helpers import RecordingBackend, create_backend
+from latency_tracing import FakeClock, LatencyTracer, TracingBackend
+from landmark_utils import LandmarkFrame, landmarks_from_array
+from trace_utils import TraceReader, TraceWriter
+from config import (
+    SCREEN_WIDTH, SCREEN_HEIGHT, MOUSE_SMOOTHING,
+    MIN_DETECTION_CONFIDENCE, MIN_TRACKING_CONFIDENCE, INPUT_BACKEND, POSE_CACHE_ENABLED, POSE_CACHE_DIR,
+    CALIBRATION_PROFILE_PATH
+)
+
+
+class EventWriter:
+    """Writes recognised gestures and input events as JSON lines"""
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, record):
+        self.stream.write(json.dumps(record) + "\n")
+
+    def write_frame(self, frame_index, timestamp, depth_status, gesture, events):
+        self.write({
+            'frame': frame_index,
+            'timestamp': round(timestamp, 6),
+            'depth': depth_status,
+            'gesture': gesture,
+        })
+        self.write_events(frame_index, events)
+
+    def write_events(self, frame_index, events):
+        for event_time, action, args in events:
+            self.write({
+                'frame': frame_index,
+                'timestamp': round(event_time, 6),
+                'event': action,
+                'args': list(args),
+            })
+
+
+def run_pipeline(reader, pose, controller, backend, writer, mouse_enabled=False, max_frames=None,
+                 recorder=None, landmark_filter=None):
+    """Process frames until the source ends, return timing statistics
+
+    stats['source_ended'] is True when every frame of the source was read
+    (also when it ends exactly at max_frames).
+    """
+    mouse_smoothing = 1.0 if landmark_filter else MOUSE_SMOOTHING
+    stats = {'frames': 0, 'detected': 0, 'events': 0, 'read_s': 0.0, 'inference_s': 0.0, 'gesture_s': 0.0,
+             'source_ended': False}
+    landmark_frame = LandmarkFrame()
+    start = time.perf_counter()
+
+    while max_frames is None or stats['frames'] < max_frames:
+        t0 = time.perf_counter()
+        frame, timestamp = reader.read()
+        if frame is None:
+            stats['source_ended'] = True
+            break
+        t1 = time.perf_counter()
+
+        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        if isinstance(pose, AdaptivePoseEstimator):
+            results = pose.process(rgb, timestamp)
+        else:
+            results = pose.process(rgb)
+        t2 = time.perf_counter()
+
+        depth_status, gesture = None, None
+        raw = landmarks = extract_landmarks(results, mp.solutions.pose, out=landmark_frame)
+        if landmark_filter is not None:
+            landmarks = landmark_filter.filter_frame(raw, timestamp)
+        if landmarks:
+            stats['detected'] += 1
+            depth_status, _, gesture = controller.process_frame(
+                landmarks, mouse_enabled, frame.shape[0],
+                SCREEN_WIDTH, SCREEN_HEIGHT, mouse_smoothing, capture_time=timestamp, raw_landmarks=raw
+            )
+        t3 = time.perf_counter()
+
+        if recorder is not None:
+            recorder.write(timestamp, raw, gesture, mouse_enabled)
+        if writer is not None:
+            writer.write_frame(stats['frames'], timestamp, depth_status, gesture, backend.events)
+        stats['events'] += len(backend.events)
+        backend.clear()
+
+        stats['frames'] += 1
+        stats['read_s'] += t1 - t0
+        stats['inference_s'] += t2 - t1
+        stats['gesture_s'] += t3 - t2
+
+    if not stats['source_ended']:
+        # Stopped at max_frames: check whether that was the last frame
+        stats['source_ended'] = reader.read()[0] is None
+    controller.release_all()
+    if writer is not None:
+        writer.write_events(stats['frames'], backend.events)
+    stats['events'] += len(backend.events)
+    backend.clear()
+
+    stats['elapsed_s'] = time.perf_counter() - start
+    return stats
+
+
+def run_replay(trace, controller, backend, writer, force_mouse=False, max_frames=None,
+               clock=None, delay=0.0, landmark_filter=None):
+    """Feed a recorded landmark trace straight into the controller (no camera, no inference)
+
+    With a FakeClock, time is set to each frame's recorded capture time plus
+    delay seconds (standing in for the skipped inference), which makes the
+    traced motion-to-input latencies deterministic. Latency is traced from
+    the frame where the unfiltered landmarks first met (or left) a gesture,
+    so it is delay plus the frames the filter and the debouncing held it back.
+    """
+    stats = {'frames': 0, 'detected': 0, 'events': 0, 'read_s': 0.0, 'inference_s': 0.0, 'gesture_s': 0.0}
+    frame_h = trace.frame_h or 480
+    mouse_smoothing = 1.0 if landmark_filter else MOUSE_SMOOTHING
+    landmark_frame = LandmarkFrame()
+    raw_frame = LandmarkFrame()
+    start = time.perf_counter()
+
+    for timestamp, points, _, recorded_mouse in trace.frames(stop=max_frames):
+        t0 = time.perf_counter()
+        if clock is not None:
+            clock.set(timestamp + delay)
+        depth_status, gesture = None, None
+        raw = None
+        if landmark_filter is not None:
+            if clock is not None and points is not None:
+                raw = landmarks_from_array(points, out=raw_frame)
+            points = landmark_filter.apply(points, timestamp)
+        landmarks = landmarks_from_array(points, out=landmark_frame) if points is not None else None
+        if landmarks:
+            stats['detected'] += 1
+            depth_status, _, gesture = controller.process_frame(
+                landmarks, force_mouse or recorded_mouse, frame_h,
+                SCREEN_WIDTH, SCREEN_HEIGHT, mouse_smoothing, capture_time=timestamp, raw_landmarks=raw
+            )
+        stats['gesture_s'] += time.perf_counter() - t0
+
+        if writer is not None:
+            writer.write_frame(stats['frames'], timestamp, depth_status, gesture, backend.events)
+        stats['events'] += len(backend.events)
+        backend.clear()
+        stats['frames'] += 1
+
+    controller.release_all()
+    if writer is not None:
+        writer.write_events(stats['frames'], backend.events)
+    stats['events'] += len(backend.events)
+    backend.clear()
+
+    stats['elapsed_s'] = time.perf_counter() - start
+    return stats
+
+
+def print_summary(stats):
+    """Print throughput summary to stderr so it does not mix with the event stream"""
+    frames = max(stats['frames'], 1)
+    elapsed = max(stats['elapsed_s'], 1e-9)
+    print(f"Frames: {stats['frames']} (pose detected in {stats['detected']}), input events: {stats['events']}",
+          file=sys.stderr)
+    print(f"Elapsed: {elapsed:.2f} s, throughput: {stats['frames'] / elapsed:.1f} FPS", file=sys.stderr)
+    print(f"Per frame: read {stats['read_s'] / frames * 1000:.2f} ms, "
+          f"inference {stats['inference_s'] / frames * 1000:.2f} ms, "
+          f"gesture {stats['gesture_s'] / frames * 1000:.3f} ms", file=sys.stderr)
+    adaptive = stats.get('adaptive')
+    if adaptive:
+        print(f"Adaptive inference: {adaptive['inferred']} inferred, {adaptive['predicted']} predicted "
+              f"({adaptive['inference_ratio'] * 100:.0f}% of frames)", file=sys.stderr)
+    cache = stats.get('cache')
+    if cache:
+        cached = "whole video" if cache['complete'] else f"{cache['cached_frames']} frames"
+        print(f"Pose cache: {cache['hits']} frames from cache, {cache['misses']} inferred "
+              f"({cached} cached in {cache['key']})", file=sys.stderr)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Run the Motion Controller pipeline without a GUI")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--video", help="Video file to process")
+    source.add_argument("--images", help="Directory of images, processed in name order")
+    source.add_argument("--camera", type=int, help="Camera index")
+    source.add_argument("--trace", help="Replay a recorded landmark trace (skips camera and inference)")
+    parser.add_argument("--output", default="-", help="Event output file ('-' for stdout)")
+    parser.add_argument("--no-events", action="store_true", help="Only print the throughput summary")
+    parser.add_argument("--mouse", action="store_true", help="Use mouse control mode")
+    parser.add_argument("--inject", action="store_true", help="Also send events to the OS input backend")
+    parser.add_argument("--max-frames", type=int, default=None, help="Stop after this many frames")
+    parser.add_argument("--record", help="Record a landmark trace of the processed frames")
+    parser.add_argument("--filter", choices=FILTER_KINDS,
+                        help="Filter landmarks before gesture recognition instead of fixed mouse smoothing")
+    parser.add_argument("--adaptive", action="store_true",
+                        help="Skip pose inference on still frames and predict the landmarks")
+    parser.add_argument("--model-complexity", type=int, choices=(0, 1, 2), default=1,
+                        help="MediaPipe pose model complexity")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Always run pose inference on videos instead of using the pose cache")
+    parser.add_argument("--cache-dir", default=POSE_CACHE_DIR, help="Pose cache directory")
+    parser.add_argument("--hysteresis", type=float, default=None,
+                        help="Relax every gesture threshold by this much while the gesture is held")
+    parser.add_argument("--min-hold-ms", type=float, default=None, help="Minimum time a gesture stays active")
+    parser.add_argument("--min-release-ms", type=float, default=None,
+                        help="Minimum time before a released gesture can start again")
+    parser.add_argument("--min-visibility", type=float, default=None,
+                        help="Landmark visibility a gesture needs to change state")
+    parser.add_argument("--calibration", default=CALIBRATION_PROFILE_PATH,
+                        help="Threshold profile written by calibration.py (used when the file exists)")
+    parser.add_argument("--latency", action="store_true",
+                        help="Trace motion-to-input latency per gesture (replay uses a fake clock)")
+    parser.add_argument("--latency-report", help="Save the latency report as JSON")
+    parser.add_argument("--replay-delay-ms", type=float, default=0.0,
+                        help="Simulated capture-to-gesture delay for latency tracing in replay")
+    return parser
+
+
+def run_live(args, controller, backend, writer):
+    """Run capture and pose inference on a video, image directory or camera"""
+    if args.video is not None:
+        source = args.video
+    elif args.images is not None:
+        source = args.images
+    else:
+        source = args.camera
+
+    cap = open_frame_source(source)
+    if not cap.isOpened():
+        print(f"ERROR: Could not open input source: {source}", file=sys.stderr)
+        return None
+
+    recorder = None
+    if args.record:
+        recorder = TraceWriter(args.record, int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                               int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)), controller.gesture_names())
+    reader = FrameReader(cap, threaded=args.camera is not None)
+
+    # Recorded videos reuse the landmarks of earlier runs with the same model settings
+    cache = entry = None
+    if POSE_CACHE_ENABLED and not args.no_cache and args.camera is None:
+        if args.adaptive:
+            print("⚠ Pose cache not used with --adaptive (predicted frames are not inference results)")
+        else:
+            cache = PoseCache(args.cache_dir)
+            entry = cache.open(source, model_complexity=args.model_complexity,
+                               min_detection_confidence=MIN_DETECTION_CONFIDENCE,
+                               min_tracking_confidence=MIN_TRACKING_CONFIDENCE,
+                               mediapipe_version=mp.__version__)
+
+    try:
+        if entry is not None and entry.complete:
+            pose_context = contextlib.nullcontext()  # Every frame is cached, no pose graph needed
+        else:
+            pose_context = mp.solutions.pose.Pose(model_complexity=args.model_complexity,
+                                                  min_detection_confidence=MIN_DETECTION_CONFIDENCE,
+                                                  min_tracking_confidence=MIN_TRACKING_CONFIDENCE)
+        with pose_context as pose:
+            estimator = pose
+            if entry is not None:
+                estimator = CachedPoseEstimator(pose, entry)
+            elif args.adaptive:
+                estimator = AdaptivePoseEstimator(pose)
+            stats = run_pipeline(reader, estimator, controller, backend, writer,
+                                 mouse_enabled=args.mouse, max_frames=args.max_frames, recorder=recorder,
+                                 landmark_filter=LandmarkFilter(args.filter) if args.filter else None)
+            if args.adaptive:
+                stats['adaptive'] = estimator.stats()
+            if entry is not None:
+                if stats['source_ended']:
+                    entry.finish()  # The source ended, so the whole video is cached
+                stats['cache'] = estimator.stats()
+            return stats
+    finally:
+        reader.release()
+        if recorder is not None:
+            recorder.close()
+        if entry is not None:
+            entry.close()
+            cache.evict(keep=entry.meta['key'])
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    # Replayed traces carry recorded capture times, so latency is measured on a fake clock
+    tracing = args.latency or args.latency_report is not None
+    clock = FakeClock() if tracing and args.trace is not None else time.perf_counter
+    backend = RecordingBackend(clock, forward=create_backend(INPUT_BACKEND) if args.inject else None)
+    tracer = LatencyTracer(clock) if tracing else None
+    debounce = {}
+    if args.hysteresis is not None:
+        debounce['hysteresis'] = dict.fromkeys(('deadzone', 'up_threshold', 'down_threshold'), args.hysteresis)
+    if args.min_hold_ms is not None:
+        debounce['min_hold'] = args.min_hold_ms / 1000
+    if args.min_release_ms is not None:
+        debounce['min_release'] = args.min_release_ms / 1000
+    if args.min_visibility is not None:
+        debounce['min_visibility'] = args.min_visibility
+    calibration = load_calibration(args.calibration) if args.calibration else {}
+    if calibration:
+        print(f"✓ Calibrated thresholds loaded from {args.calibration}", file=sys.stderr)
+    controller = GestureController(TracingBackend(backend, tracer) if tracer else backend,
+                                   **calibration, **debounce)
+
+    out = None
+    if not args.no_events:
+        out = sys.stdout if args.output == "-" else open(args.output, "w")
+    writer = EventWriter(out) if out is not None else None
+
+    try:
+        # Status messages go to stderr so stdout carries only the event stream
+        with contextlib.redirect_stdout(sys.stderr):
+            if args.trace is not None:
+                with TraceReader(args.trace) as trace:
+                    stats = run_replay(trace, controller, backend, writer,
+                                       force_mouse=args.mouse, max_frames=args.max_frames,
+                                       clock=clock if tracing else None,
+                                       delay=args.replay_delay_ms / 1000,
+                                       landmark_filter=LandmarkFilter(args.filter) if args.filter else None)
+            else:
+                stats = run_live(args, controller, backend, writer)
+    finally:
+        if out is not None and out is not sys.stdout:
+            out.close()
+
+    if stats is None:
+        return 1
+    print_summary(stats)
+    for mode, gesture_stats in controller.gesture_stats().items():
+        if gesture_stats['raw_transitions']:
+            print(f"Gesture state machine ({mode}): {format_stats(gesture_stats)}", file=sys.stderr)
+    if tracer is not None:
+        tracer.print_report(file=sys.stderr)
+        if args.latency_report:
+            tracer.save(args.latency_report)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,325 @@
+"""
+Asynchronous input dispatcher for Motion Controller
+Injects key and mouse events on a separate thread so slow OS calls never stall the frame loop
+"""
+
+import threading
+import time
+from collections import deque
+
+
+def percentile(sorted_values, q):
+    """Return the q-th percentile (0-100) of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(q / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class InputDispatcher:
+    """Coalescing input dispatcher with a pluggable backend
+
+    The frame loop only updates the desired input state (pressed keys, mouse
+    button, cursor target). The worker thread compares it with the state it
+    has already emitted and sends only the differences to the backend, so
+    several cursor moves collapse into a single move to the latest target.
+    A press and release that both arrive before the worker sends the press
+    are kept as a tap (one down/up pair), so short gestures are not lost.
+    Failed backend calls leave the emitted state unchanged and are retried
+    after retry_interval seconds.
+
+    Exposes the same methods as the input backends, so it can be passed to
+    GestureController in place of a backend.
+    """
+
+    def __init__(self, backend, clock=time.perf_counter, latency_window=1000, retry_interval=0.1):
+        self.backend = backend
+        self.clock = clock
+        self.retry_interval = retry_interval
+        self._lock = threading.Condition()
+        self._desired_keys = {}  # key -> (pressed, submit time, capture time)
+        self._emitted_keys = set()
+        self._sending_keys = {}  # key -> pressed, for key events taken by the worker but not yet sent
+        self._desired_button = None  # (pressed, submit time, capture time) or None when unchanged
+        self._emitted_button = False
+        self._sending_button = None  # Button state being sent by the worker, None when idle
+        self._taps = deque()  # (action, args, submit time, capture time) of pressed-and-released inputs
+        self._cursor_target = None  # (x, y, submit time, capture time)
+        self._clicks = deque()  # (x, y, submit time, capture time)
+        self._capture_time = None  # Latency tracing tag of the frame being submitted
+        self._backend_tag = getattr(backend, 'tag_frame', None)
+        self._busy = False
+        self._running = False
+        self._thread = None
+        self.latencies = deque(maxlen=latency_window)
+        self.events_emitted = 0
+        self.moves_coalesced = 0
+        self.max_queue_depth = 0
+
+    def start(self):
+        """Start the dispatch thread"""
+        if self._thread is None:
+            self._running = True
+            self._thread = threading.Thread(target=self._worker, name="input-dispatcher", daemon=True)
+            self._thread.start()
+        return self
+
+    # Backend-compatible interface used by GestureController
+
+    def tag_frame(self, capture_time):
+        """Set the capture time carried by the events submitted from now on"""
+        self._capture_time = capture_time
+
+    def key_down(self, key):
+        self._set_key(key, True)
+
+    def key_up(self, key):
+        self._set_key(key, False)
+
+    def move_to(self, x, y):
+        with self._lock:
+            if self._cursor_target is not None:
+                self.moves_coalesced += 1
+            self._cursor_target = (x, y, self.clock(), self._capture_time)
+            self._notify()
+
+    def mouse_down(self):
+        self._set_button(True)
+
+    def mouse_up(self):
+        self._set_button(False)
+
+    def click(self, x, y):
+        with self._lock:
+            self._clicks.append((x, y, self.clock(), self._capture_time))
+            self._notify()
+
+    def submit(self, keys=None, mouse_button=None, cursor=None):
+        """Submit the complete desired input state for one frame
+
+        keys is the set of keys that should be held, mouse_button whether the
+        left button should be held and cursor the (x, y) target position.
+        None leaves that part of the state unchanged.
+        """
+        now = self.clock()
+        with self._lock:
+            if keys is not None:
+                keys = set(keys)
+                for key in keys | set(self._desired_keys) | self._emitted_keys:
+                    self._desired_key_locked(key, key in keys, now)
+            if mouse_button is not None:
+                self._desired_button_locked(mouse_button, now)
+            if cursor is not None:
+                if self._cursor_target is not None:
+                    self.moves_coalesced += 1
+                self._cursor_target = (cursor[0], cursor[1], now, self._capture_time)
+            self._notify()
+
+    def _set_key(self, key, pressed):
+        with self._lock:
+            self._desired_key_locked(key, pressed, self.clock())
+            self._notify()
+
+    def _key_sent_locked(self, key):
+        """Whether the key is held once the events taken by the worker are sent"""
+        return self._sending_keys.get(key, key in self._emitted_keys)
+
+    def _button_sent_locked(self):
+        return self._emitted_button if self._sending_button is None else self._sending_button
+
+    def _desired_key_locked(self, key, pressed, now):
+        current = self._desired_keys.get(key)
+        if current is None or current[0] != pressed:
+            if not pressed and current is not None and not self._key_sent_locked(key):
+                # Released before the worker took the press: send both as a tap
+                self._taps.append(('key_down', (key,), current[1], current[2]))
+                self._taps.append(('key_up', (key,), now, self._capture_time))
+            self._desired_keys[key] = (pressed, now, self._capture_time)
+
+    def _set_button(self, pressed):
+        with self._lock:
+            self._desired_button_locked(pressed, self.clock())
+            self._notify()
+
+    def _desired_button_locked(self, pressed, now):
+        current = self._desired_button
+        if current is None or current[0] != pressed:
+            if not pressed and current is not None and not self._button_sent_locked():
+                self._taps.append(('mouse_down', (), current[1], current[2]))
+                self._taps.append(('mouse_up', (), now, self._capture_time))
+                self._desired_button = None
+                return
+            self._desired_button = (pressed, now, self._capture_time)
+
+    def _notify(self):
+        self.max_queue_depth = max(self.max_queue_depth, self._queue_depth_locked())
+        self._lock.notify_all()
+
+    # Worker thread
+
+    def _pending_events_locked(self):
+        """Collect the events needed to bring the emitted state to the desired state
+
+        Returns (action, args, submit time, capture time, tap) tuples; tap
+        events come in down/up pairs and leave the emitted state unchanged.
+        """
+        events = [event + (True,) for event in self._taps]
+        self._taps.clear()
+        for key, (pressed, submitted, tag) in self._desired_keys.items():
+            if not pressed and self._key_sent_locked(key):
+                events.append(('key_up', (key,), submitted, tag, False))
+                self._sending_keys[key] = False
+        for key, (pressed, submitted, tag) in self._desired_keys.items():
+            if pressed and not self._key_sent_locked(key):
+                events.append(('key_down', (key,), submitted, tag, False))
+                self._sending_keys[key] = True
+        self._desired_keys = {k: v for k, v in self._desired_keys.items() if v[0]}
+
+        if self._cursor_target is not None:
+            x, y, submitted, tag = self._cursor_target
+            events.append(('move_to', (x, y), submitted, tag, False))
+            self._cursor_target = None
+
+        if self._desired_button is not None:
+            pressed, submitted, tag = self._desired_button
+            if pressed != self._button_sent_locked():
+                events.append(('mouse_down' if pressed else 'mouse_up', (), submitted, tag, False))
+                self._sending_button = pressed
+            self._desired_button = None
+
+        while self._clicks:
+            x, y, submitted, tag = self._clicks.popleft()
+            events.append(('click', (x, y), submitted, tag, False))
+        return events
+
+    def _queue_depth_locked(self):
+        depth = len(self._clicks) + len(self._taps)
+        for key, (pressed, _, _) in self._desired_keys.items():
+            if pressed != self._key_sent_locked(key):
+                depth += 1
+        if self._cursor_target is not None:
+            depth += 1
+        if self._desired_button is not None and self._desired_button[0] != self._button_sent_locked():
+            depth += 1
+        return depth
+
+    def _worker(self):
+        while True:
+            with self._lock:
+                while self._running and self._queue_depth_locked() == 0:
+                    self._lock.wait()
+                events = self._pending_events_locked()
+                if not events and not self._running:
+                    break
+                self._busy = True
+
+            failed = False
+            skip_release = False
+            for action, args, submitted, tag, tap in events:
+                if skip_release:
+                    # The press of this tap failed, so there is nothing to release
+                    skip_release = False
+                    continue
+                if self._backend_tag is not None:
+                    self._backend_tag(tag)
+                try:
+                    getattr(self.backend, action)(*args)
+                except Exception as e:
+                    print(f"⚠ Input injection failed ({action}): {e}")
+                    failed = True
+                    with self._lock:
+                        if not tap:
+                            self._event_done_locked(action, args)
+                            self._retry_locked(action, args, submitted, tag)
+                        elif action in ('key_down', 'mouse_down'):
+                            skip_release = True
+                        else:
+                            # The tap was pressed but not released: hold it and retry the release
+                            self._event_sent_locked('key_down' if action == 'key_up' else 'mouse_down', args)
+                            self._retry_locked(action, args, submitted, tag)
+                    continue
+                latency = self.clock() - submitted
+                with self._lock:
+                    if not tap:
+                        self._event_sent_locked(action, args)
+                        self._event_done_locked(action, args)
+                    self.latencies.append(latency)
+                    self.events_emitted += 1
+
+            with self._lock:
+                self._busy = False
+                self._lock.notify_all()
+                if failed and self._running:
+                    self._lock.wait(self.retry_interval)
+
+    def _event_sent_locked(self, action, args):
+        """Record a successfully injected key or button event in the emitted state"""
+        if action == 'key_down':
+            self._emitted_keys.add(args[0])
+        elif action == 'key_up':
+            self._emitted_keys.discard(args[0])
+        elif action in ('mouse_down', 'mouse_up'):
+            self._emitted_button = action == 'mouse_down'
+
+    def _event_done_locked(self, action, args):
+        """Clear the in-flight state of a key or button event taken from the desired state"""
+        if action in ('key_down', 'key_up'):
+            self._sending_keys.pop(args[0], None)
+        elif action in ('mouse_down', 'mouse_up'):
+            self._sending_button = None
+
+    def _retry_locked(self, action, args, submitted, tag):
+        """Queue a failed event again unless a newer desired state replaces it (only while running)"""
+        if not self._running:
+            return
+        if action in ('key_down', 'key_up'):
+            self._desired_keys.setdefault(args[0], (action == 'key_down', submitted, tag))
+        elif action in ('mouse_down', 'mouse_up'):
+            if self._desired_button is None:
+                self._desired_button = (action == 'mouse_down', submitted, tag)
+        elif action == 'click':
+            self._clicks.appendleft((args[0], args[1], submitted, tag))
+        elif self._cursor_target is None:
+            self._cursor_target = (args[0], args[1], submitted, tag)
+
+    # Monitoring and shutdown
+
+    def queue_depth(self):
+        """Number of input events waiting to be injected"""
+        with self._lock:
+            return self._queue_depth_locked()
+
+    def flush(self, timeout=1.0):
+        """Wait until all pending events have been injected"""
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            while self._busy or self._queue_depth_locked() > 0:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._running:
+                    return False
+                self._lock.wait(remaining)
+        return True
+
+    def stats(self):
+        """Return queue depth, event counters and injection latency percentiles (ms)"""
+        with self._lock:
+            latencies = sorted(self.latencies)
+            return {
+                'queue_depth': self._queue_depth_locked(),
+                'max_queue_depth': self.max_queue_depth,
+                'events_emitted': self.events_emitted,
+                'moves_coalesced': self.moves_coalesced,
+                'latency_p50_ms': percentile(latencies, 50) * 1000,
+                'latency_p95_ms': percentile(latencies, 95) * 1000,
+                'latency_max_ms': (latencies[-1] if latencies else 0.0) * 1000,
+            }
+
+    def stop(self, timeout=1.0):
+        """Inject any remaining events and stop the dispatch thread"""
+        self.flush(timeout)
+        with self._lock:
+            self._running = False
+            self._lock.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
@@ -3,11 +3,21 @@ Input Helper functions for Motion Controller
 Contains functions for keyboard and mouse input handling
 """
 
-import pyautogui
+import time
 
 # Global variable to track which input method is available
 use_directinput = False
 pydirectinput = None
+pyautogui = None
+
+
+def load_pyautogui():
+    """Import pyautogui on first use (it needs a display to import)"""
+    global pyautogui
+    if pyautogui is None:
+        import pyautogui as pag
+        pyautogui = pag
+    return pyautogui
 
 
 def init_input_system():
@@ -30,7 +40,7 @@ def press_key(key):
     if use_directinput and pydirectinput:
         pydirectinput.keyDown(key)
     else:
-        pyautogui.keyDown(key)
+        load_pyautogui().keyDown(key)
 
 
 def release_key(key):
@@ -38,13 +48,141 @@ def release_key(key):
     if use_directinput and pydirectinput:
         pydirectinput.keyUp(key)
     else:
-        pyautogui.keyUp(key)
+        load_pyautogui().keyUp(key)
 
 def release_all_keys(keys_pressed):
     """Release all currently pressed keys"""
     for k in keys_pressed:
         if keys_pressed[k]:
             if k == 'mouse_click':
-                pyautogui.mouseUp()
+                load_pyautogui().mouseUp()
             elif k != 'both_sides':  # both_sides is a state flag, not a key
-                release_key(k)
\ No newline at end of file
+                release_key(k)
+
+
+class PyAutoGuiBackend:
+    """Input backend that injects events through pyautogui"""
+    
+    name = 'pyautogui'
+    
+    def __init__(self):
+        self.pag = load_pyautogui()
+    
+    def key_down(self, key):
+        self.pag.keyDown(key)
+    
+    def key_up(self, key):
+        self.pag.keyUp(key)
+    
+    def move_to(self, x, y):
+        self.pag.moveTo(x, y)
+    
+    def mouse_down(self):
+        self.pag.mouseDown()
+    
+    def mouse_up(self):
+        self.pag.mouseUp()
+    
+    def click(self, x, y):
+        self.pag.click(x, y)
+
+
+class DirectInputBackend(PyAutoGuiBackend):
+    """Input backend that sends keys through pydirectinput (mouse stays on pyautogui)"""
+    
+    name = 'pydirectinput'
+    
+    def __init__(self):
+        super().__init__()
+        if pydirectinput is None and not init_input_system():
+            raise ImportError("pydirectinput is not installed")
+        self.pdi = pydirectinput
+    
+    def key_down(self, key):
+        self.pdi.keyDown(key)
+    
+    def key_up(self, key):
+        self.pdi.keyUp(key)
+
+
+class RecordingBackend:
+    """In-memory input backend that records events instead of injecting them
+    
+    When a forward backend is given, events are recorded and then passed on to it.
+    """
+    
+    name = 'recording'
+    
+    def __init__(self, clock=time.perf_counter, forward=None):
+        self.clock = clock
+        self.forward = forward
+        self.events = []  # (timestamp, action, args)
+    
+    def _record(self, action, *args):
+        self.events.append((self.clock(), action, args))
+        if self.forward is not None:
+            getattr(self.forward, action)(*args)
+    
+    def key_down(self, key):
+        self._record('key_down', key)
+    
+    def key_up(self, key):
+        self._record('key_up', key)
+    
+    def move_to(self, x, y):
+        self._record('move_to', x, y)
+    
+    def mouse_down(self):
+        self._record('mouse_down')
+    
+    def mouse_up(self):
+        self._record('mouse_up')
+    
+    def click(self, x, y):
+        self._record('click', x, y)
+    
+    def actions(self):
+        """Return recorded events without timestamps"""
+        return [(action,) + args for _, action, args in self.events]
+    
+    def clear(self):
+        self.events.clear()
+
+
+class NullBackend:
+    """Input backend that discards all events (for benchmarks)"""
+    
+    name = 'null'
+    
+    def key_down(self, key):
+        pass
+    
+    def key_up(self, key):
+        pass
+    
+    def move_to(self, x, y):
+        pass
+    
+    def mouse_down(self):
+        pass
+    
+    def mouse_up(self):
+        pass
+    
+    def click(self, x, y):
+        pass
+
+
+def create_backend(name='auto'):
+    """Create an input backend by name ('auto', 'pyautogui', 'pydirectinput', 'recording', 'null')"""
+    if name == 'auto':
+        name = 'pydirectinput' if use_directinput and pydirectinput else 'pyautogui'
+    if name == 'pyautogui':
+        return PyAutoGuiBackend()
+    if name == 'pydirectinput':
+        return DirectInputBackend()
+    if name == 'recording':
+        return RecordingBackend()
+    if name == 'null':
+        return NullBackend()
+    raise ValueError(f"Unknown input backend: {name}")
@@ -0,0 +1,155 @@
+"""
+Pipeline instrumentation for Motion Controller
+Per-stage latency histograms, FPS counters and periodic CSV/JSON export
+"""
+
+import csv
+import json
+import os
+import time
+
+import numpy as np
+
+from config import (
+    PROFILING_ENABLED, PROFILING_WINDOW, PROFILING_EXPORT_PATH, PROFILING_EXPORT_INTERVAL
+)
+
+
+class RollingHistogram:
+    """Keeps the last N samples in a ring buffer and reports percentiles"""
+
+    def __init__(self, size=PROFILING_WINDOW):
+        self.samples = np.zeros(size, dtype=np.float64)
+        self.index = 0
+        self.count = 0
+        self.total = 0
+
+    def add(self, value):
+        self.samples[self.index] = value
+        self.index = (self.index + 1) % len(self.samples)
+        self.count = min(self.count + 1, len(self.samples))
+        self.total += 1
+
+    def percentiles(self, qs=(50, 95, 99)):
+        """Return percentiles of the samples in the window (zeros when empty)"""
+        if self.count == 0:
+            return [0.0] * len(qs)
+        return [float(v) for v in np.percentile(self.samples[:self.count], qs)]
+
+    def mean(self):
+        return float(self.samples[:self.count].mean()) if self.count else 0.0
+
+
+class FpsCounter:
+    """Frames per second over a sliding window of frame timestamps"""
+
+    def __init__(self, size=PROFILING_WINDOW):
+        self.times = np.zeros(size, dtype=np.float64)
+        self.index = 0
+        self.count = 0
+
+    def tick(self, now):
+        self.times[self.index] = now
+        self.index = (self.index + 1) % len(self.times)
+        self.count = min(self.count + 1, len(self.times))
+
+    def fps(self):
+        if self.count < 2:
+            return 0.0
+        newest = self.times[self.index - 1]
+        oldest = self.times[self.index % self.count] if self.count == len(self.times) else self.times[0]
+        elapsed = newest - oldest
+        return (self.count - 1) / elapsed if elapsed > 0 else 0.0
+
+
+def _noop(*args, **kwargs):
+    pass
+
+
+class PipelineProfiler:
+    """Lap timer for the stages of the frame loop
+
+    Call begin_frame() at the top of the loop and lap(stage) after each stage;
+    the time since the previous lap is recorded for that stage. When disabled,
+    begin_frame/lap/gauge are bound to a no-op function, so the calls can stay
+    in production code at negligible cost.
+    """
+
+    def __init__(self, enabled=PROFILING_ENABLED, window=PROFILING_WINDOW,
+                 export_path=PROFILING_EXPORT_PATH, export_interval=PROFILING_EXPORT_INTERVAL,
+                 clock=time.perf_counter):
+        self.enabled = enabled
+        self.window = window
+        self.export_path = export_path
+        self.export_interval = export_interval
+        self.clock = clock
+        self.stages = {}
+        self.gauges = {}
+        self.fps_counter = FpsCounter(window)
+        self.frame_start = None
+        self._last = None
+        self._last_export = clock()
+        if not enabled:
+            self.begin_frame = _noop
+            self.lap = _noop
+            self.gauge = _noop
+
+    def begin_frame(self):
+        """Mark the start of a frame; closes the previous frame's 'frame' total"""
+        now = self.clock()
+        if self.frame_start is not None:
+            self._histogram('frame').add((now - self.frame_start) * 1000)
+        self.fps_counter.tick(now)
+        self.frame_start = now
+        self._last = now
+        if self.export_path and now - self._last_export >= self.export_interval:
+            self.export(self.export_path)
+            self._last_export = now
+
+    def lap(self, stage):
+        """Record the time since the previous lap (or frame start) for a stage"""
+        now = self.clock()
+        if self._last is not None:
+            self._histogram(stage).add((now - self._last) * 1000)
+        self._last = now
+
+    def gauge(self, name, value):
+        """Record an instantaneous value (queue depth, dropped frames, ...)"""
+        self.gauges[name] = value
+
+    def _histogram(self, stage):
+        histogram = self.stages.get(stage)
+        if histogram is None:
+            histogram = self.stages[stage] = RollingHistogram(self.window)
+        return histogram
+
+    def snapshot(self):
+        """Return current statistics: per-stage percentiles in ms, FPS and gauges"""
+        stages = {}
+        for name, histogram in self.stages.items():
+            p50, p95, p99 = histogram.percentiles()
+            stages[name] = {
+                'p50_ms': p50, 'p95_ms': p95, 'p99_ms': p99,
+                'mean_ms': histogram.mean(), 'samples': histogram.total,
+            }
+        return {'fps': self.fps_counter.fps(), 'stages': stages, 'gauges': dict(self.gauges)}
+
+    def export(self, path):
+        """Append the current statistics to a CSV file, or overwrite a JSON file"""
+        if not self.enabled:
+            return
+        snapshot = self.snapshot()
+        timestamp = time.strftime('%Y-%m-%dT%H:%M:%S')
+        if path.endswith('.json'):
+            with open(path, 'w') as f:
+                json.dump(dict(snapshot, timestamp=timestamp), f, indent=2)
+            return
+        new_file = not os.path.exists(path)
+        with open(path, 'a', newline='') as f:
+            writer = csv.writer(f)
+            if new_file:
+                writer.writerow(['timestamp', 'stage', 'p50_ms', 'p95_ms', 'p99_ms', 'mean_ms', 'samples', 'fps'])
+            for name, s in snapshot['stages'].items():
+                writer.writerow([timestamp, name, f"{s['p50_ms']:.3f}", f"{s['p95_ms']:.3f}",
+                                 f"{s['p99_ms']:.3f}", f"{s['mean_ms']:.3f}", s['samples'],
+                                 f"{snapshot['fps']:.2f}"])
@@ -0,0 +1,183 @@
+"""
+Landmark filtering for Motion Controller
+Adaptive per-landmark filters (One Euro, constant-velocity Kalman) with forward prediction
+"""
+
+import math
+
+import numpy as np
+
+from config import (
+    LANDMARK_FILTER, FILTER_PREDICTION_LEAD, ONE_EURO_MIN_CUTOFF, ONE_EURO_BETA, ONE_EURO_D_CUTOFF,
+    KALMAN_PROCESS_NOISE, KALMAN_MEASUREMENT_NOISE
+)
+from landmark_utils import NUM_LANDMARKS, X, VISIBILITY, LandmarkFrame
+
+FILTER_KINDS = ('one_euro', 'kalman')
+
+# Time step used when timestamps do not advance (e.g. duplicated frames)
+DEFAULT_DT = 1 / 30
+
+
+class OneEuroFilter:
+    """One Euro filter over an array of independent signals
+
+    The cutoff frequency rises with the signal speed, so slow movements are
+    smoothed heavily (less jitter) and fast ones pass almost unfiltered (less lag).
+    """
+
+    def __init__(self, shape, min_cutoff=ONE_EURO_MIN_CUTOFF, beta=ONE_EURO_BETA, d_cutoff=ONE_EURO_D_CUTOFF):
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.value = np.zeros(shape, dtype=np.float64)
+        self.velocity = np.zeros(shape, dtype=np.float64)
+        self._raw_velocity = np.zeros(shape, dtype=np.float64)
+        self._alpha = np.zeros(shape, dtype=np.float64)
+        self._last_time = None
+
+    def reset(self):
+        self._last_time = None
+
+    def update(self, measurement, timestamp):
+        """Filter one sample; returns the internal value array"""
+        if self._last_time is None:
+            self.value[...] = measurement
+            self.velocity.fill(0)
+            self._last_time = timestamp
+            return self.value
+        dt = timestamp - self._last_time
+        if dt <= 0:
+            dt = DEFAULT_DT
+        self._last_time = timestamp
+
+        # Smoothed derivative with a fixed cutoff
+        np.subtract(measurement, self.value, out=self._raw_velocity)
+        self._raw_velocity /= dt
+        alpha_d = 1.0 / (1.0 + 1.0 / (2 * math.pi * self.d_cutoff * dt))
+        self.velocity += alpha_d * (self._raw_velocity - self.velocity)
+
+        # Speed-dependent cutoff for the value: alpha = 1 / (1 + 1 / (2 pi cutoff dt))
+        np.abs(self.velocity, out=self._alpha)
+        self._alpha *= self.beta
+        self._alpha += self.min_cutoff
+        self._alpha *= 2 * math.pi * dt
+        np.divide(self._alpha, self._alpha + 1.0, out=self._alpha)
+        self.value += self._alpha * (measurement - self.value)
+        return self.value
+
+
+class KalmanFilter:
+    """Constant-velocity Kalman filter run independently on every element of an array
+
+    State per element is (position, velocity) with a 2x2 covariance, kept as
+    separate arrays so the whole pose is updated with a few vector operations.
+    """
+
+    def __init__(self, shape, process_noise=KALMAN_PROCESS_NOISE, measurement_noise=KALMAN_MEASUREMENT_NOISE):
+        self.process_noise = process_noise
+        self.measurement_noise = measurement_noise
+        self.value = np.zeros(shape, dtype=np.float64)
+        self.velocity = np.zeros(shape, dtype=np.float64)
+        self._p00 = np.zeros(shape, dtype=np.float64)
+        self._p01 = np.zeros(shape, dtype=np.float64)
+        self._p11 = np.zeros(shape, dtype=np.float64)
+        self._gain0 = np.zeros(shape, dtype=np.float64)
+        self._gain1 = np.zeros(shape, dtype=np.float64)
+        self._innovation = np.zeros(shape, dtype=np.float64)
+        self._last_time = None
+
+    def reset(self):
+        self._last_time = None
+
+    def update(self, measurement, timestamp):
+        """Predict to the sample time and correct with the measurement; returns the value array"""
+        if self._last_time is None:
+            self.value[...] = measurement
+            self.velocity.fill(0)
+            self._p00.fill(self.measurement_noise)
+            self._p01.fill(0)
+            self._p11.fill(1.0)  # Velocity unknown at start
+            self._last_time = timestamp
+            return self.value
+        dt = timestamp - self._last_time
+        if dt <= 0:
+            dt = DEFAULT_DT
+        self._last_time = timestamp
+
+        # Predict (white-noise acceleration model)
+        q = self.process_noise
+        self.value += self.velocity * dt
+        self._p00 += dt * (2 * self._p01 + dt * self._p11) + q * dt ** 3 / 3
+        self._p01 += dt * self._p11 + q * dt ** 2 / 2
+        self._p11 += q * dt
+
+        # Correct
+        np.divide(self._p00, self._p00 + self.measurement_noise, out=self._gain0)
+        np.divide(self._p01, self._p00 + self.measurement_noise, out=self._gain1)
+        np.subtract(measurement, self.value, out=self._innovation)
+        self.value += self._gain0 * self._innovation
+        self.velocity += self._gain1 * self._innovation
+        self._p11 -= self._gain1 * self._p01
+        self._p01 *= 1 - self._gain0
+        self._p00 *= 1 - self._gain0
+        return self.value
+
+
+class LandmarkFilter:
+    """Filters the x, y, z coordinates of all 33 landmarks between pose detection and gestures
+
+    lead seconds of velocity-based forward prediction are added to the
+    filtered positions to make up for the inference latency. Visibility is
+    passed through unchanged; the filter restarts whenever the pose is lost.
+    """
+
+    def __init__(self, kind=LANDMARK_FILTER, lead=FILTER_PREDICTION_LEAD, **params):
+        if kind == 'one_euro':
+            self.filter = OneEuroFilter((NUM_LANDMARKS, 3), **params)
+        elif kind == 'kalman':
+            self.filter = KalmanFilter((NUM_LANDMARKS, 3), **params)
+        else:
+            raise ValueError(f"Unknown landmark filter: {kind}")
+        self.kind = kind
+        self.lead = lead
+        self._raw = LandmarkFrame()
+        self.output = np.zeros((NUM_LANDMARKS, 4), dtype=np.float32)
+        self.frame = LandmarkFrame(self.output)  # Filtered landmarks, a view of output
+
+    def reset(self):
+        self.filter.reset()
+
+    def apply(self, points, timestamp):
+        """Filter a (33, 4) landmark array; returns the internal output array, or None if no pose"""
+        if points is None or np.isnan(points[0, X]):
+            self.filter.reset()
+            return None
+        value = self.filter.update(points[:, X:VISIBILITY], timestamp)
+        if self.lead:
+            np.multiply(self.filter.velocity, self.lead, out=self.output[:, X:VISIBILITY], casting='unsafe')
+            self.output[:, X:VISIBILITY] += value
+        else:
+            self.output[:, X:VISIBILITY] = value
+        self.output[:, VISIBILITY] = points[:, VISIBILITY]
+        return self.output
+
+    def filter_frame(self, frame, timestamp, out=None):
+        """Filter a LandmarkFrame (or None if no pose)
+
+        Returns the filter's own frame, overwritten by the next call, or a copy
+        in out when given; None if no pose is present.
+        """
+        if self.apply(frame.points if frame is not None else None, timestamp) is None:
+            return None
+        if out is None:
+            return self.frame
+        out.points[:] = self.output
+        return out
+
+    def filter_results(self, results, timestamp, out=None):
+        """Filter a MediaPipe pose result and return the LandmarkFrame for GestureController"""
+        if not results.pose_landmarks:
+            self.filter.reset()
+            return None
+        return self.filter_frame(self._raw.fill(results.pose_landmarks), timestamp, out)
@@ -0,0 +1,203 @@
+"""
+Landmark helpers for Motion Controller
+Index constants, preallocated landmark frames and synthetic landmark streams
+"""
+
+import numpy as np
+
+# MediaPipe pose landmark indices used by the gesture logic
+NUM_LANDMARKS = 33
+NOSE = 0
+LEFT_WRIST = 15
+RIGHT_WRIST = 16
+LEFT_HIP = 23
+RIGHT_HIP = 24
+
+TRACKED_LANDMARKS = (NOSE, LEFT_WRIST, RIGHT_WRIST, LEFT_HIP, RIGHT_HIP)
+
+# Names of all MediaPipe pose landmarks in index order (attributes of LandmarkFrame)
+LANDMARK_NAMES = (
+    'nose', 'left_eye_inner', 'left_eye', 'left_eye_outer', 'right_eye_inner', 'right_eye',
+    'right_eye_outer', 'left_ear', 'right_ear', 'mouth_left', 'mouth_right',
+    'left_shoulder', 'right_shoulder', 'left_elbow', 'right_elbow', 'left_wrist', 'right_wrist',
+    'left_pinky', 'right_pinky', 'left_index', 'right_index', 'left_thumb', 'right_thumb',
+    'left_hip', 'right_hip', 'left_knee', 'right_knee', 'left_ankle', 'right_ankle',
+    'left_heel', 'right_heel', 'left_foot_index', 'right_foot_index',
+)
+
+# Coordinate columns of a (33, 4) landmark array
+X, Y, Z, VISIBILITY = 0, 1, 2, 3
+
+# Serialized MediaPipe NormalizedLandmarkList with all 33 landmarks and all five
+# fields set: per landmark a 2 byte header and five 5 byte fields (tag + float32)
+# x, y, z, visibility, presence - so the floats sit at fixed offsets
+_WIRE_LANDMARK_SIZE = 27
+_WIRE_FIELD_SIZE = 5
+_WIRE_FIRST_VALUE = 3
+_WIRE_SIZE = NUM_LANDMARKS * _WIRE_LANDMARK_SIZE
+_WIRE_DTYPE = np.dtype('<f4')
+
+
+class Landmark:
+    """Minimal stand-in for a MediaPipe landmark (x, y, z, visibility)"""
+
+    __slots__ = ('x', 'y', 'z', 'visibility')
+
+    def __init__(self, x, y, z=0.0, visibility=1.0):
+        self.x = x
+        self.y = y
+        self.z = z
+        self.visibility = visibility
+
+
+class LandmarkView:
+    """One landmark of a LandmarkFrame (x, y, z, visibility, x_mirror), read from the frame's array"""
+
+    __slots__ = ('_values', '_offset')
+
+    def __init__(self, values, index):
+        self._values = values
+        self._offset = index * 4
+
+    @property
+    def x(self):
+        return self._values[self._offset]
+
+    @property
+    def y(self):
+        return self._values[self._offset + 1]
+
+    @property
+    def z(self):
+        return self._values[self._offset + 2]
+
+    @property
+    def visibility(self):
+        return self._values[self._offset + 3]
+
+    @property
+    def x_mirror(self):
+        """x in the mirrored camera view"""
+        return 1 - self._values[self._offset]
+
+
+class LandmarkFrame:
+    """All 33 pose landmarks of one frame in a preallocated (33, 4) float32 array
+
+    points is the array (x, y, z, visibility per landmark) for NumPy code;
+    every landmark is also an attribute (frame.nose, frame.left_wrist, ...)
+    that reads straight from it. values is a flat memoryview of points, so
+    frame.values[index * 4 + column] gives a plain float without creating
+    any objects. A frame is meant to be filled again every frame.
+    """
+
+    __slots__ = ('points', 'values') + LANDMARK_NAMES
+
+    def __init__(self, points=None):
+        if points is None:
+            points = np.zeros((NUM_LANDMARKS, 4), dtype=np.float32)
+        elif points.shape != (NUM_LANDMARKS, 4) or points.dtype != np.float32 or not points.flags.c_contiguous:
+            raise ValueError("LandmarkFrame needs a C-contiguous (33, 4) float32 array")
+        self.points = points
+        self.values = memoryview(points.reshape(-1))
+        for index, name in enumerate(LANDMARK_NAMES):
+            setattr(self, name, LandmarkView(self.values, index))
+
+    def fill(self, landmark_list):
+        """Copy a MediaPipe landmark list (results.pose_landmarks) into the frame; returns the frame"""
+        points = getattr(landmark_list, 'points', None)
+        if points is not None:
+            # Pose result rebuilt from an array (pose_utils.LandmarkResults)
+            self.points[:] = points
+            return self
+        landmarks = landmark_list.landmark
+        serialize = getattr(landmark_list, 'SerializeToString', None)
+        if serialize is not None and len(landmarks) == NUM_LANDMARKS:
+            data = serialize()
+            if len(data) == _WIRE_SIZE:
+                # Read the floats straight out of the protobuf wire format
+                self.points[:] = np.ndarray((NUM_LANDMARKS, 4), _WIRE_DTYPE, data, _WIRE_FIRST_VALUE,
+                                            (_WIRE_LANDMARK_SIZE, _WIRE_FIELD_SIZE))
+                return self
+        landmarks_to_array(landmarks, out=self.points)
+        return self
+
+
+def landmarks_from_array(points, out=None):
+    """LandmarkFrame holding a copy of a (33, 4) array (filled into out if given), or None if no pose is present"""
+    if np.isnan(points[NOSE, X]):
+        return None
+    if out is None:
+        out = LandmarkFrame()
+    out.points[:] = points
+    return out
+
+
+def landmarks_to_array(landmark_list, out=None):
+    """Copy MediaPipe landmarks into a (33, 4) float32 array"""
+    if out is None:
+        out = np.empty((NUM_LANDMARKS, 4), dtype=np.float32)
+    for i, lm in enumerate(landmark_list):
+        out[i, X] = lm.x
+        out[i, Y] = lm.y
+        out[i, Z] = lm.z
+        out[i, VISIBILITY] = lm.visibility
+    return out
+
+
+def synthetic_landmark_stream(num_frames, seed=0, missing_rate=0.02):
+    """Generate a (N, 33, 4) float32 stream of a player cycling through all gestures
+
+    The player sways slightly, moves the wrists through the LEFT, RIGHT, UP,
+    DOWN and both-hands-spread zones, occasionally steps too close or too
+    far, and some frames have no detected pose (all NaN).
+    """
+    rng = np.random.default_rng(seed)
+    t = np.arange(num_frames, dtype=np.float64)
+    stream = np.zeros((num_frames, NUM_LANDMARKS, 4), dtype=np.float64)
+
+    # Body: nose and hips with a slow sway and a depth drift
+    sway = 0.05 * np.sin(t / 45.0)
+    nose_x = 0.5 + sway
+    nose_y = 0.3 + 0.01 * np.sin(t / 13.0)
+    nose_z = -0.25 + 0.55 * np.sin(t / 170.0)
+    stream[:, :, X] = nose_x[:, None]
+    stream[:, :, Y] = 0.5
+    stream[:, :, VISIBILITY] = 0.95
+    stream[:, NOSE, X] = nose_x
+    stream[:, NOSE, Y] = nose_y
+    stream[:, NOSE, Z] = nose_z
+    stream[:, LEFT_HIP, X] = nose_x + 0.06
+    stream[:, RIGHT_HIP, X] = nose_x - 0.06
+    stream[:, LEFT_HIP, Y] = 0.7
+    stream[:, RIGHT_HIP, Y] = 0.7
+
+    # Wrists: cycle through gesture poses with smooth transitions
+    # (camera coordinates - the left wrist has larger x before mirroring)
+    poses = np.array([
+        # left_x offset, left_y, right_x offset, right_y
+        [0.10, 0.50, -0.10, 0.50],   # idle
+        [0.30, 0.45, -0.10, 0.50],   # LEFT
+        [0.10, 0.50, -0.30, 0.45],   # RIGHT
+        [0.10, 0.15, -0.10, 0.15],   # UP
+        [0.10, 0.80, -0.10, 0.80],   # DOWN
+        [0.30, 0.40, -0.30, 0.40],   # both hands spread
+    ])
+    phase = t / 30.0
+    index = rng.integers(0, len(poses), size=int(phase[-1]) + 2 if num_frames else 1)
+    start = poses[index[phase.astype(int)]]
+    end = poses[index[phase.astype(int) + 1]]
+    blend = np.clip((phase % 1.0) * 2.0, 0.0, 1.0)[:, None]
+    wrist = start + (end - start) * blend
+    wrist += rng.normal(0.0, 0.01, size=wrist.shape)
+
+    stream[:, LEFT_WRIST, X] = nose_x + wrist[:, 0]
+    stream[:, LEFT_WRIST, Y] = wrist[:, 1]
+    stream[:, RIGHT_WRIST, X] = nose_x + wrist[:, 2]
+    stream[:, RIGHT_WRIST, Y] = wrist[:, 3]
+
+    stream[:, :, :3] += rng.normal(0.0, 0.002, size=(num_frames, NUM_LANDMARKS, 3))
+
+    missing = rng.random(num_frames) < missing_rate
+    stream[missing] = np.nan
+    return stream.astype(np.float32)
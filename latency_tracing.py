@@ -0,0 +1,145 @@
+"""
+Motion-to-input latency tracing for Motion Controller
+Tags frames with their capture time and measures how long until the resulting OS input event fires
+"""
+
+import json
+import time
+
+from input_helpers import RecordingBackend
+from instrumentation import RollingHistogram
+from config import LATENCY_WINDOW
+
+
+def event_label(action, args):
+    """Label of an event tagged without a gesture (GestureController tags its key and button events)"""
+    if action == 'key_down':
+        return args[0]
+    if action == 'key_up':
+        return f"{args[0]} release"
+    if action == 'move_to':
+        return "MOUSE MOVE"
+    if action == 'click':
+        return "MOUSE CLICK"
+    if action == 'mouse_down':
+        return "CLICK HOLD"
+    return "CLICK RELEASE"
+
+
+class FakeClock:
+    """Manually driven clock for deterministic latency measurements in replay"""
+
+    def __init__(self, start=0.0):
+        self.now = start
+
+    def __call__(self):
+        return self.now
+
+    def set(self, value):
+        self.now = value
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+class LatencyTracer:
+    """Collects motion-to-input latency per gesture type"""
+
+    def __init__(self, clock=time.perf_counter, window=LATENCY_WINDOW):
+        self.clock = clock
+        self.window = window
+        self.histograms = {}
+        self.untagged = 0
+
+    def record(self, action, args, tag):
+        """Record one injected event; tag is the capture time of its frame or (capture time, gesture)"""
+        capture_time, label = tag if isinstance(tag, tuple) else (tag, None)
+        if capture_time is None:
+            self.untagged += 1
+            return
+        label = label or event_label(action, args)
+        histogram = self.histograms.get(label)
+        if histogram is None:
+            histogram = self.histograms[label] = RollingHistogram(self.window)
+        histogram.add((self.clock() - capture_time) * 1000)
+
+    def report(self):
+        """Return count, p50/p95/p99/max latency (ms) per gesture type"""
+        report = {}
+        for label, histogram in sorted(self.histograms.items()):
+            p50, p95, p99, p100 = histogram.percentiles((50, 95, 99, 100))
+            report[label] = {'count': histogram.total, 'p50_ms': p50, 'p95_ms': p95,
+                             'p99_ms': p99, 'max_ms': p100}
+        return report
+
+    def print_report(self, file=None):
+        report = self.report()
+        if not report:
+            print("⏱ No input events traced", file=file)
+            return
+        print(f"⏱ Motion-to-input latency ({self.untagged} untagged events):", file=file)
+        print(f"  {'gesture':<20}{'count':>7}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}", file=file)
+        for label, r in report.items():
+            print(f"  {label:<20}{r['count']:>7}{r['p50_ms']:>9.2f}{r['p95_ms']:>9.2f}"
+                  f"{r['p99_ms']:>9.2f}{r['max_ms']:>9.2f}", file=file)
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump({'untagged': self.untagged, 'gestures': self.report()}, f, indent=2)
+
+
+class TracingBackend:
+    """Input backend wrapper that reports every injected event to a LatencyTracer
+
+    tag_frame() sets the tag of the events sent from now on: the capture time
+    of their frame, or (capture time, gesture name) for the key and button
+    events of a gesture binding. GestureController and InputDispatcher call
+    it before forwarding events, so the tag survives the hop to the
+    dispatcher thread.
+    """
+
+    def __init__(self, backend, tracer):
+        self.backend = backend
+        self.tracer = tracer
+        self.tag = None
+
+    def tag_frame(self, tag):
+        self.tag = tag
+
+    def _emit(self, action, *args):
+        getattr(self.backend, action)(*args)
+        self.tracer.record(action, args, self.tag)
+
+    def key_down(self, key):
+        self._emit('key_down', key)
+
+    def key_up(self, key):
+        self._emit('key_up', key)
+
+    def move_to(self, x, y):
+        self._emit('move_to', x, y)
+
+    def mouse_down(self):
+        self._emit('mouse_down')
+
+    def mouse_up(self):
+        self._emit('mouse_up')
+
+    def click(self, x, y):
+        self._emit('click', x, y)
+
+
+class TaggedEventBuffer(RecordingBackend):
+    """RecordingBackend that stores each event's latency tag in place of its timestamp
+
+    Used as the GestureController output when its events are forwarded
+    later (async pipeline); forward the events with their tags through
+    the output's tag_frame().
+    """
+
+    def __init__(self):
+        super().__init__(clock=lambda: self.tag)
+        self.tag = None
+
+    def tag_frame(self, tag):
+        self.tag = tag
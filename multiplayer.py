@@ -0,0 +1,235 @@
+"""
+Multi-player sessions for Motion Controller
+Several players, each with their own camera or frame region, key map and pose worker process
+
+Usage:
+    python multiplayer.py                                   # players from PLAYERS in config.py
+    python multiplayer.py --video p1.mp4 --video p2.mp4     # one player per video
+    python multiplayer.py --camera 0 --split --show         # one wide camera split into PLAYERS regions
+"""
+
+import argparse
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from camera_utils import open_frame_source, FrameReader
+from gesture_controller import GestureController
+from input_dispatcher import InputDispatcher
+from input_helpers import RecordingBackend, create_backend
+from instrumentation import FpsCounter, RollingHistogram
+from landmark_utils import LandmarkFrame, landmarks_from_array
+from pose_workers import PoseWorkerPool
+from config import PLAYERS, SCREEN_WIDTH, SCREEN_HEIGHT, MOUSE_SMOOTHING, INPUT_BACKEND, KEY_MAP
+
+
+class Player:
+    """One player: frame region, GestureController with its own key map and a pose worker"""
+
+    def __init__(self, name, source, region, key_map, output, clock=time.perf_counter):
+        self.name = name
+        self.source = source
+        self.region = region
+        self.controller = GestureController(output, key_map=key_map)
+        self.pool = PoseWorkerPool(1)
+        self.clock = clock
+        self.latency = RollingHistogram()
+        self.fps = FpsCounter()
+        self.frames = 0
+        self.detected = 0
+        self.gesture = None
+        self.depth_status = None
+        self.view = None  # Last processed crop, for the preview window
+        self.landmarks = LandmarkFrame()  # Filled in place with each pose result
+
+    def crop(self, frame):
+        """Return this player's part of a camera frame"""
+        if self.region is None:
+            return frame
+        frame_h, frame_w = frame.shape[:2]
+        x0, y0, x1, y1 = self.region
+        return frame[int(y0 * frame_h):int(y1 * frame_h), int(x0 * frame_w):int(x1 * frame_w)]
+
+    def submit(self, frame, timestamp):
+        view = self.crop(frame)
+        self.pool.submit(view, (view, timestamp))
+
+    def collect(self):
+        """Wait for this player's pose result and run the gesture logic on it"""
+        result = self.pool.get()
+        self.view, timestamp = result.tag
+        self.gesture = None
+        self.depth_status = None
+        landmarks = landmarks_from_array(result.landmarks, out=self.landmarks) if result.landmarks is not None else None
+        if landmarks:
+            self.detected += 1
+            self.depth_status, _, self.gesture = self.controller.process_frame(
+                landmarks, False, self.view.shape[0], SCREEN_WIDTH, SCREEN_HEIGHT, MOUSE_SMOOTHING,
+                capture_time=timestamp
+            )
+        now = self.clock()
+        self.latency.add((now - timestamp) * 1000)
+        self.fps.tick(now)
+        self.frames += 1
+
+    def stats(self):
+        p50, p95, p99 = self.latency.percentiles()
+        return {
+            'frames': self.frames,
+            'detected': self.detected,
+            'fps': self.fps.fps(),
+            'latency_p50_ms': p50,
+            'latency_p95_ms': p95,
+            'latency_p99_ms': p99,
+        }
+
+    def close(self):
+        self.controller.release_all()
+        self.pool.close()
+
+
+class MultiPlayerSession:
+    """Runs all players frame by frame with one shared input dispatcher
+
+    Every source is read once per step; each player's crop goes to its own
+    pose worker, so inference for all players runs in parallel, and the
+    gesture results are applied in player order through the shared dispatcher.
+    """
+
+    def __init__(self, players, backend, clock=time.perf_counter):
+        self.clock = clock
+        self.readers = {}
+        for player in players:
+            source = player['source']
+            if source not in self.readers:
+                cap = open_frame_source(source)
+                if not cap.isOpened():
+                    self.close()
+                    raise RuntimeError(f"Could not open input source: {source}")
+                self.readers[source] = FrameReader(cap, threaded=isinstance(source, int))
+        self.dispatcher = InputDispatcher(backend, clock).start()
+        self.players = [
+            Player(p.get('name', f"Player {i + 1}"), p['source'], p.get('region'), p.get('keys'),
+                   self.dispatcher, clock)
+            for i, p in enumerate(players)
+        ]
+
+    def step(self):
+        """Process one frame for every player; returns False when a source has ended"""
+        frames = {}
+        for source, reader in self.readers.items():
+            image, timestamp = reader.read()
+            if image is None:
+                return False
+            frames[source] = (image, timestamp)
+        for player in self.players:
+            player.submit(*frames[player.source])
+        for player in self.players:
+            player.collect()
+        return True
+
+    def run(self, max_frames=None, show=False):
+        """Run until a source ends, max_frames steps or ESC in the preview window"""
+        steps = 0
+        while (max_frames is None or steps < max_frames) and self.step():
+            steps += 1
+            if show:
+                cv2.imshow('Motion Controller - Players', draw_players(self.players))
+                if cv2.waitKey(1) & 0xFF == 27:
+                    break
+        return steps
+
+    def stats(self):
+        return {player.name: player.stats() for player in self.players}
+
+    def close(self):
+        for player in getattr(self, 'players', []):
+            player.close()
+        if hasattr(self, 'dispatcher'):
+            self.dispatcher.stop()
+        for reader in self.readers.values():
+            reader.release()
+
+
+def draw_players(players, height=360):
+    """Side-by-side mirrored preview of every player's view with name, gesture and FPS"""
+    views = []
+    for player in players:
+        if player.view is None:
+            continue
+        view = cv2.flip(player.view, 1)
+        scale = height / view.shape[0]
+        view = cv2.resize(view, (int(view.shape[1] * scale), height))
+        cv2.putText(view, player.name, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 0), 2)
+        cv2.putText(view, f"{player.fps.fps():.0f} FPS", (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1)
+        if player.gesture:
+            cv2.putText(view, player.gesture, (10, height - 20), cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 255, 0), 2)
+        views.append(view)
+    return cv2.hconcat(views) if views else np.zeros((height, height, 3), dtype=np.uint8)
+
+
+def build_players(args):
+    """Player list from the command line, falling back to PLAYERS in config.py"""
+    sources = args.video + args.camera
+    if not sources:
+        return PLAYERS
+    if args.split:
+        if len(sources) != 1:
+            raise SystemExit("--split needs exactly one --video or --camera")
+        return [dict(p, source=sources[0]) for p in PLAYERS]
+    players = []
+    for i, source in enumerate(sources):
+        template = PLAYERS[i] if i < len(PLAYERS) else {'keys': KEY_MAP}
+        players.append({'name': template.get('name', f"Player {i + 1}"), 'source': source,
+                        'region': None, 'keys': template.get('keys')})
+    return players
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a multi-player Motion Controller session")
+    parser.add_argument("--video", action="append", default=[], help="Video file standing in for a camera")
+    parser.add_argument("--camera", action="append", type=int, default=[], help="Camera index")
+    parser.add_argument("--split", action="store_true", help="Split a single source into the PLAYERS regions")
+    parser.add_argument("--max-frames", type=int, default=None, help="Stop after this many frames")
+    parser.add_argument("--inject", action="store_true", help="Send events to the OS instead of recording them")
+    parser.add_argument("--show", action="store_true", help="Show a preview window of all players")
+    args = parser.parse_args(argv)
+
+    backend = create_backend(INPUT_BACKEND) if args.inject else RecordingBackend()
+    try:
+        session = MultiPlayerSession(build_players(args), backend)
+    except RuntimeError as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 1
+
+    start = time.perf_counter()
+    try:
+        steps = session.run(args.max_frames, show=args.show)
+    except KeyboardInterrupt:
+        steps = None
+    finally:
+        session.close()
+        if args.show:
+            cv2.destroyAllWindows()
+    elapsed = time.perf_counter() - start
+
+    if steps is not None:
+        print(f"\n{steps} steps in {elapsed:.1f} s")
+    for name, s in session.stats().items():
+        print(f"{name}: {s['frames']} frames (pose in {s['detected']}), {s['fps']:.1f} FPS, "
+              f"latency p50 {s['latency_p50_ms']:.1f} ms, p95 {s['latency_p95_ms']:.1f} ms")
+    dispatch = session.dispatcher.stats()
+    print(f"Input: {dispatch['events_emitted']} events, injection p95 {dispatch['latency_p95_ms']:.2f} ms")
+    if isinstance(backend, RecordingBackend):
+        keys = {}
+        for _, action, key_args in backend.events:
+            if action == 'key_down':
+                keys[key_args[0]] = keys.get(key_args[0], 0) + 1
+        print("Key presses: " + ", ".join(f"{key}: {count}" for key, count in sorted(keys.items())))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,283 @@
+"""
+asyncio pipeline orchestrator for Motion Controller
+Stages connected by bounded queues with explicit backpressure policies and per-stage utilization
+"""
+
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+
+from instrumentation import FpsCounter, RollingHistogram
+
+# What put() does when a queue is full
+POLICIES = ('drop_oldest', 'drop_newest', 'block')
+
+
+class PipelineStop(Exception):
+    """Raised by a stage function to end the pipeline (end of input, ESC pressed)"""
+
+
+class StageQueue:
+    """Bounded queue in front of a stage
+
+    drop_oldest replaces the oldest waiting item (live frames: always work on
+    the newest), drop_newest discards the incoming item and block makes the
+    upstream stage wait (events that must not be lost).
+    """
+
+    def __init__(self, maxsize=1, policy='drop_oldest'):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown backpressure policy: {policy} (expected one of {', '.join(POLICIES)})")
+        self.queue = asyncio.Queue(maxsize)
+        self.policy = policy
+        self.put_count = 0
+        self.dropped = 0
+        self.blocked_s = 0.0
+        self.max_depth = 0
+
+    async def put(self, item):
+        """Queue an item; returns False when the policy dropped it"""
+        self.put_count += 1
+        if self.queue.full():
+            if self.policy == 'drop_newest':
+                self.dropped += 1
+                return False
+            if self.policy == 'drop_oldest':
+                self.queue.get_nowait()
+                self.dropped += 1
+            else:
+                start = time.perf_counter()
+                await self.queue.put(item)
+                self.blocked_s += time.perf_counter() - start
+                self.max_depth = max(self.max_depth, self.queue.qsize())
+                return True
+        self.queue.put_nowait(item)
+        self.max_depth = max(self.max_depth, self.queue.qsize())
+        return True
+
+    async def get(self):
+        return await self.queue.get()
+
+    def depth(self):
+        return self.queue.qsize()
+
+
+class MainThreadExecutor(Executor):
+    """Runs submitted calls on the thread that calls serve() - OpenCV windows belong to the main thread"""
+
+    def __init__(self):
+        self._work = queue.Queue()
+
+    def submit(self, fn, /, *args, **kwargs):
+        future = Future()
+        self._work.put((future, fn, args, kwargs))
+        return future
+
+    def serve(self, until):
+        """Run submitted calls until the until event is set"""
+        while not until.is_set():
+            try:
+                future, fn, args, kwargs = self._work.get(timeout=0.05)
+            except queue.Empty:
+                continue
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except BaseException as e:
+                future.set_exception(e)
+
+    def shutdown(self, wait=True, *, cancel_futures=False):
+        while True:
+            try:
+                future, _, _, _ = self._work.get_nowait()
+            except queue.Empty:
+                break
+            future.cancel()
+
+
+class Stage:
+    """One pipeline step: fn(item) -> item for the next stages, or None to pass nothing on"""
+
+    def __init__(self, name, fn, queue=None, threaded=False, clock=time.perf_counter, drain=False):
+        self.name = name
+        self.fn = fn
+        self.queue = queue  # None for the source stage, which is called without an item
+        # False: on the event loop, True: on a dedicated thread, 'main': on the thread that called run()
+        self.threaded = threaded
+        # Process the items still queued when the pipeline stops instead of discarding them
+        self.drain = drain
+        self.clock = clock
+        self.outputs = []
+        self.executor = None
+        self.durations = RollingHistogram()  # ms per call
+        self.busy_s = 0.0
+        self.items = 0
+
+    async def call(self, *args):
+        start = self.clock()
+        if self.threaded:
+            result = await asyncio.get_running_loop().run_in_executor(self.executor, self.fn, *args)
+        else:
+            result = self.fn(*args)
+        elapsed = self.clock() - start
+        self.busy_s += elapsed
+        self.durations.add(elapsed * 1000)
+        self.items += 1
+        return result
+
+    async def drain_queue(self):
+        """Call fn on every item left in the queue (after the stage task was cancelled)"""
+        while self.queue is not None and self.queue.depth():
+            await self.call(self.queue.queue.get_nowait())
+
+    async def run(self):
+        while True:
+            if self.queue is None:
+                result = await self.call()
+            else:
+                result = await self.call(await self.queue.get())
+            if result is not None:
+                for output in self.outputs:
+                    await output.put(result)
+            elif self.queue is None:
+                await asyncio.sleep(0)  # Source had nothing - let the other stages run
+
+
+class Pipeline:
+    """asyncio orchestrator for a tree of stages
+
+    The first stage is the source; every further stage reads from its own
+    bounded queue fed by an upstream stage (the previous one unless `after`
+    names another), so one stage can feed several. Threaded stages run on a
+    dedicated single-thread executor each, which keeps blocking work (camera
+    reads, inference, slow input injection) off the event loop and preserves
+    per-stage order and thread affinity. Stages marked threaded='main' run on
+    the thread that called run() (the GUI thread) while the event loop moves
+    to a background thread. A slow stage only fills or drops its own queue,
+    so the stages upstream of a dropping queue keep running at their own pace.
+    When the pipeline stops, queued items are discarded except in front of
+    stages added with drain=True (input events that must reach the OS).
+    """
+
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.stages = {}
+        self.fps_counter = FpsCounter()
+        self._main_executor = MainThreadExecutor()
+        self._started = None
+        self._stopped = None
+
+    def source(self, name, fn, threaded=False):
+        """Add the source stage: fn() returns the next item (None = nothing yet)"""
+        if self.stages:
+            raise ValueError("The source must be the first stage")
+        self.stages[name] = Stage(name, fn, None, threaded, self.clock)
+        return self
+
+    def stage(self, name, fn, queue_size=1, policy='drop_oldest', threaded=False, after=None, drain=False):
+        """Add a stage fed by `after` (default: the previously added stage)"""
+        if not self.stages:
+            raise ValueError("Add the source stage first")
+        upstream = self.stages[after] if after is not None else list(self.stages.values())[-1]
+        stage = Stage(name, fn, StageQueue(queue_size, policy), threaded, self.clock, drain)
+        upstream.outputs.append(stage.queue)
+        self.stages[name] = stage
+        return self
+
+    def tick(self):
+        """Count one finished frame (call from the last stage) for the FPS figure"""
+        self.fps_counter.tick(self.clock())
+
+    async def run_async(self):
+        self._started = self.clock()
+        for stage in self.stages.values():
+            if stage.threaded == 'main':
+                stage.executor = self._main_executor
+            elif stage.threaded:
+                stage.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"stage-{stage.name}")
+        tasks = [asyncio.create_task(stage.run(), name=stage.name) for stage in self.stages.values()]
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                error = task.exception()
+                if error is not None and not isinstance(error, PipelineStop):
+                    raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            # A call cancelled mid-flight still finishes on its executor thread, ahead of the drained items
+            for stage in self.stages.values():
+                if stage.drain:
+                    await stage.drain_queue()
+            self._stopped = self.clock()
+            for stage in self.stages.values():
+                if stage.executor is not None:
+                    stage.executor.shutdown(wait=False, cancel_futures=True)
+
+    def run(self):
+        """Run until a stage raises PipelineStop (re-raises any other stage error)"""
+        if not any(stage.threaded == 'main' for stage in self.stages.values()):
+            asyncio.run(self.run_async())
+            return
+        done = threading.Event()
+        errors = []
+
+        def run_loop():
+            try:
+                asyncio.run(self.run_async())
+            except BaseException as e:
+                errors.append(e)
+            finally:
+                done.set()
+
+        thread = threading.Thread(target=run_loop, name="pipeline-loop", daemon=True)
+        thread.start()
+        self._main_executor.serve(done)
+        thread.join()
+        if errors:
+            raise errors[0]
+
+    def stats(self):
+        """Per stage: items, mean time, utilization (busy share of the run time), queue depth and drops"""
+        end = self._stopped if self._stopped is not None else self.clock()
+        elapsed = max(end - self._started, 1e-9) if self._started is not None else 0.0
+        stats = {}
+        for name, stage in self.stages.items():
+            queue = stage.queue
+            stats[name] = {
+                'items': stage.items,
+                'mean_ms': stage.durations.mean(),
+                'utilization': stage.busy_s / elapsed if elapsed else 0.0,
+                'policy': queue.policy if queue else None,
+                'queue_depth': queue.depth() if queue else 0,
+                'max_queue_depth': queue.max_depth if queue else 0,
+                'dropped': queue.dropped if queue else 0,
+                'blocked_ms': queue.blocked_s * 1000 if queue else 0.0,
+            }
+        return stats
+
+    def snapshot(self):
+        """Statistics in the PipelineProfiler.snapshot() format, for the HUD and exports"""
+        stages = {}
+        gauges = {}
+        for name, stage in self.stages.items():
+            p50, p95, p99 = stage.durations.percentiles()
+            stages[name] = {
+                'p50_ms': p50, 'p95_ms': p95, 'p99_ms': p99,
+                'mean_ms': stage.durations.mean(), 'samples': stage.durations.total,
+            }
+        for name, s in self.stats().items():
+            gauges[f"{name}%"] = round(s['utilization'] * 100)
+            if s['dropped']:
+                gauges[f"{name} drop"] = s['dropped']
+        return {'fps': self.fps_counter.fps(), 'stages': stages, 'gauges': gauges}
+
+    def print_stats(self):
+        print(f"{'stage':<12}{'items':>8}{'mean ms':>9}{'busy':>7}{'policy':>13}{'dropped':>9}{'blocked ms':>12}")
+        for name, s in self.stats().items():
+            print(f"{name:<12}{s['items']:>8}{s['mean_ms']:>9.2f}{s['utilization'] * 100:>6.0f}%"
+                  f"{s['policy'] or '-':>13}{s['dropped']:>9}{s['blocked_ms']:>12.1f}")
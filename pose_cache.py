@@ -0,0 +1,257 @@
+"""
+Pose inference cache for Motion Controller
+Stores the pose landmarks of recorded videos on disk so later runs over the same footage skip inference
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+
+from camera_utils import IMAGE_EXTENSIONS
+from config import POSE_CACHE_DIR, POSE_CACHE_MAX_MB, POSE_CACHE_CHUNK_FRAMES
+from landmark_utils import NUM_LANDMARKS, LandmarkFrame
+from pose_utils import LandmarkResults
+
+# Bumped when the stored layout changes; older entries are then never matched
+CACHE_VERSION = 1
+# Block size used to hash video files
+HASH_BLOCK_SIZE = 1 << 20
+# File mapping source paths to content hashes (skips rehashing unchanged files)
+HASH_INDEX_NAME = 'hashes.json'
+META_NAME = 'meta.json'
+
+
+def _load_json(path, default):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def _save_json(path, data):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _source_files(source):
+    """Files whose content makes up a video source (the file, or the images of a directory in read order)"""
+    if os.path.isdir(source):
+        return sorted(os.path.join(source, name) for name in os.listdir(source)
+                      if name.lower().endswith(IMAGE_EXTENSIONS))
+    return [source]
+
+
+def content_hash(source):
+    """BLAKE2 hash of a video file or image directory content"""
+    digest = hashlib.blake2b(digest_size=16)
+    for path in _source_files(source):
+        digest.update(os.path.basename(path).encode() + b"\0")
+        with open(path, 'rb') as f:
+            while True:
+                block = f.read(HASH_BLOCK_SIZE)
+                if not block:
+                    break
+                digest.update(block)
+    return digest.hexdigest()
+
+
+class PoseCacheEntry:
+    """Cached landmarks of one video with one set of model settings
+
+    Frames are stored in order as (33, 4) float32 rows (all NaN = no pose)
+    in memory-mapped chunk files of chunk_frames frames each. Only a prefix
+    of the video is filled when a run stopped early; the next run reads that
+    prefix and appends from where it ended. meta.json records how many
+    frames are filled and is rewritten whenever a chunk is full and on close,
+    so a crash loses at most the frames of the current chunk.
+    """
+
+    def __init__(self, path, meta):
+        self.path = path
+        self.meta = meta
+        self.chunk_frames = meta['chunk_frames']
+        self._chunk = None
+        self._chunk_index = None
+        self._scratch = LandmarkFrame()
+
+    @property
+    def frames(self):
+        return self.meta['frames']
+
+    @property
+    def complete(self):
+        return self.meta['complete']
+
+    def size(self):
+        """Bytes on disk"""
+        return sum(entry.stat().st_size for entry in os.scandir(self.path) if entry.is_file())
+
+    def _chunk_path(self, index):
+        return os.path.join(self.path, f"chunk_{index:05d}.npy")
+
+    def _open_chunk(self, index, create=False):
+        if index != self._chunk_index:
+            if self._chunk is not None:
+                self._chunk.flush()
+            path = self._chunk_path(index)
+            if create and not os.path.exists(path):
+                self._chunk = np.lib.format.open_memmap(path, mode='w+', dtype=np.float32,
+                                                        shape=(self.chunk_frames, NUM_LANDMARKS, 4))
+            else:
+                self._chunk = np.load(path, mmap_mode='r+')
+            self._chunk_index = index
+        return self._chunk
+
+    def get(self, index):
+        """(33, 4) landmarks of a frame (NaN without a pose), or None if the frame is not cached"""
+        if index >= self.meta['frames']:
+            return None
+        return self._open_chunk(index // self.chunk_frames)[index % self.chunk_frames]
+
+    def append(self, results):
+        """Store the MediaPipe result of the next uncached frame"""
+        index = self.meta['frames']
+        row = self._open_chunk(index // self.chunk_frames, create=True)[index % self.chunk_frames]
+        if results.pose_landmarks:
+            row[:] = self._scratch.fill(results.pose_landmarks).points
+        else:
+            row[:] = np.nan
+        self.meta['frames'] = index + 1
+        if (index + 1) % self.chunk_frames == 0:
+            self.save()
+
+    def finish(self):
+        """Mark the video as fully cached (the source ended)"""
+        self.meta['complete'] = True
+        self.save()
+
+    def save(self):
+        if self._chunk is not None:
+            self._chunk.flush()
+        _save_json(os.path.join(self.path, META_NAME), self.meta)
+
+    def close(self):
+        self.save()
+        self._chunk = None
+        self._chunk_index = None
+
+
+class PoseCache:
+    """Directory of PoseCacheEntry folders, bounded in size by evicting the least recently used videos"""
+
+    def __init__(self, directory=POSE_CACHE_DIR, max_mb=POSE_CACHE_MAX_MB, chunk_frames=POSE_CACHE_CHUNK_FRAMES):
+        self.directory = directory
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.chunk_frames = chunk_frames
+        os.makedirs(directory, exist_ok=True)
+
+    def source_hash(self, source):
+        """Content hash of a source, reused while the files keep their size and modification time"""
+        index_path = os.path.join(self.directory, HASH_INDEX_NAME)
+        index = _load_json(index_path, {})
+        files = _source_files(source)
+        stamp = [[os.path.basename(p), os.path.getsize(p), os.stat(p).st_mtime_ns] for p in files]
+        key = os.path.abspath(source)
+        known = index.get(key)
+        if known and known['stamp'] == stamp:
+            return known['hash']
+        digest = content_hash(source)
+        index[key] = {'stamp': stamp, 'hash': digest}
+        _save_json(index_path, index)
+        return digest
+
+    def open(self, source, **settings):
+        """Entry for a video file or image directory and the model settings it is inferred with"""
+        video_hash = self.source_hash(source)
+        description = json.dumps({'video': video_hash, 'settings': settings, 'version': CACHE_VERSION},
+                                 sort_keys=True)
+        key = hashlib.blake2b(description.encode(), digest_size=12).hexdigest()
+        path = os.path.join(self.directory, key)
+        meta = _load_json(os.path.join(path, META_NAME), None)
+        if meta is None:
+            os.makedirs(path, exist_ok=True)
+            meta = {'key': key, 'video_hash': video_hash, 'settings': settings, 'version': CACHE_VERSION,
+                    'chunk_frames': self.chunk_frames, 'frames': 0, 'complete': False}
+        meta['source'] = os.path.abspath(source)
+        meta['last_used'] = time.time()
+        entry = PoseCacheEntry(path, meta)
+        entry.save()
+        self.evict(keep=key)
+        return entry
+
+    def entries(self):
+        """Meta data of all cached videos, least recently used first"""
+        found = []
+        for name in os.listdir(self.directory):
+            meta = _load_json(os.path.join(self.directory, name, META_NAME), None)
+            if meta is not None:
+                found.append(meta)
+        return sorted(found, key=lambda meta: meta['last_used'])
+
+    def evict(self, keep=None):
+        """Delete least recently used entries until the cache fits max_mb; returns the deleted keys"""
+        entries = [(meta, PoseCacheEntry(os.path.join(self.directory, meta['key']), meta).size())
+                   for meta in self.entries()]
+        total = sum(size for _, size in entries)
+        deleted = []
+        for meta, size in entries:
+            if total <= self.max_bytes:
+                break
+            if meta['key'] == keep:
+                continue  # Never the entry in use
+            shutil.rmtree(os.path.join(self.directory, meta['key']), ignore_errors=True)
+            total -= size
+            deleted.append(meta['key'])
+        if deleted:
+            self.prune_hash_index()
+        return deleted
+
+    def prune_hash_index(self):
+        """Drop the content hashes of sources no remaining entry was inferred from"""
+        index_path = os.path.join(self.directory, HASH_INDEX_NAME)
+        index = _load_json(index_path, {})
+        cached = {meta['video_hash'] for meta in self.entries()}
+        kept = {source: record for source, record in index.items() if record['hash'] in cached}
+        if len(kept) != len(index):
+            _save_json(index_path, kept)
+
+
+class CachedPoseEstimator:
+    """Wraps a MediaPipe pose graph; frames already in the cache entry skip inference
+
+    process() is called once per video frame in order. Cached frames are
+    returned as LandmarkResults; the first uncached frame and all after it
+    run the pose graph and are appended to the entry. MediaPipe tracks the
+    pose from frame to frame, so after a resumed partial fill the graph
+    starts from a fresh detection, just like at the start of a video.
+    """
+
+    def __init__(self, pose, entry):
+        self.pose = pose
+        self.entry = entry
+        self.index = 0
+        self.hits = 0
+        self.misses = 0
+
+    def process(self, image):
+        points = self.entry.get(self.index)
+        self.index += 1
+        if points is not None:
+            self.hits += 1
+            return LandmarkResults(None if np.isnan(points[0, 0]) else points)
+        results = self.pose.process(image)
+        if self.index == self.entry.frames + 1:
+            self.entry.append(results)
+        self.misses += 1
+        return results
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'cached_frames': self.entry.frames,
+                'complete': self.entry.complete, 'key': self.entry.meta['key']}
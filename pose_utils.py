@@ -0,0 +1,276 @@
+"""
+Pose inference helpers for Motion Controller
+Region-of-interest tracking and motion-adaptive inference around MediaPipe Pose
+"""
+
+import time
+
+import cv2
+import numpy as np
+from config import (
+    ROI_PADDING, ROI_MIN_SIZE, ROI_FULL_FRAME_INTERVAL, ROI_MIN_VISIBILITY,
+    ADAPTIVE_POLICY, ADAPTIVE_FRAME_DIFF_THRESHOLD, ADAPTIVE_VELOCITY_THRESHOLD,
+    ADAPTIVE_MAX_SKIP, ADAPTIVE_THUMBNAIL_SIZE
+)
+from landmark_utils import NUM_LANDMARKS, TRACKED_LANDMARKS, X, Z, VISIBILITY, Landmark, landmarks_to_array
+
+ADAPTIVE_POLICIES = ('frame_diff', 'velocity', 'both')
+
+
+class RoiPoseEstimator:
+    """Wraps a MediaPipe Pose and runs it on a padded crop around the previous pose
+
+    Landmarks found in the crop are mapped back to full-frame normalized
+    coordinates in place, so the returned results look exactly like a
+    full-frame pass to extract_landmarks and GestureController.
+    """
+
+    def __init__(self, pose, padding=ROI_PADDING, min_size=ROI_MIN_SIZE,
+                 full_frame_interval=ROI_FULL_FRAME_INTERVAL, min_visibility=ROI_MIN_VISIBILITY):
+        self.pose = pose
+        self.padding = padding
+        self.min_size = min_size
+        self.full_frame_interval = full_frame_interval
+        self.min_visibility = min_visibility
+        self.roi = None  # (x0, y0, x1, y1) in pixels, None when tracking is lost
+        self.frames_since_full = 0
+        self.full_passes = 0
+        self.roi_passes = 0
+        self.tracking_lost = 0
+
+    def process(self, rgb):
+        """Run pose inference, on the tracked region when possible"""
+        frame_h, frame_w = rgb.shape[:2]
+        results = None
+
+        if self.roi is not None and self.frames_since_full < self.full_frame_interval:
+            x0, y0, x1, y1 = self.roi
+            crop = np.ascontiguousarray(rgb[y0:y1, x0:x1])
+            results = self.pose.process(crop)
+            self.roi_passes += 1
+            self.frames_since_full += 1
+            if results.pose_landmarks:
+                self._map_to_frame(results, x0, y0, x1 - x0, y1 - y0, frame_w, frame_h)
+            else:
+                results = None
+                self.tracking_lost += 1
+
+        if results is None:
+            results = self.pose.process(rgb)
+            self.full_passes += 1
+            self.frames_since_full = 0
+
+        self.roi = self._compute_roi(results, frame_w, frame_h)
+        return results
+
+    def reset(self):
+        """Forget the tracked region so the next frame gets a full-frame pass"""
+        self.roi = None
+        self.frames_since_full = 0
+
+    def stats(self):
+        """Return counters of full-frame and ROI passes"""
+        total = self.full_passes + self.roi_passes
+        return {
+            'full_passes': self.full_passes,
+            'roi_passes': self.roi_passes,
+            'tracking_lost': self.tracking_lost,
+            'roi_ratio': self.roi_passes / total if total else 0.0,
+        }
+
+    @staticmethod
+    def _map_to_frame(results, x0, y0, crop_w, crop_h, frame_w, frame_h):
+        """Convert crop-normalized landmarks to full-frame normalized coordinates"""
+        scale_x = crop_w / frame_w
+        scale_y = crop_h / frame_h
+        offset_x = x0 / frame_w
+        offset_y = y0 / frame_h
+        for lm in results.pose_landmarks.landmark:
+            lm.x = offset_x + lm.x * scale_x
+            lm.y = offset_y + lm.y * scale_y
+            lm.z = lm.z * scale_x  # z uses roughly the same scale as x
+
+    def _compute_roi(self, results, frame_w, frame_h):
+        """Compute a padded pixel bounding box from the tracked landmarks"""
+        if not results.pose_landmarks:
+            return None
+
+        lm = results.pose_landmarks.landmark
+        points = [lm[i] for i in TRACKED_LANDMARKS]
+        if min(p.visibility for p in points) < self.min_visibility:
+            return None
+
+        xs = [p.x for p in points]
+        ys = [p.y for p in points]
+        min_x, max_x = min(xs), max(xs)
+        min_y, max_y = min(ys), max(ys)
+
+        # Pad relative to the box size, keep a minimum size for fast arm movements
+        pad_x = (max_x - min_x) * self.padding
+        pad_y = (max_y - min_y) * self.padding
+        width = max(max_x - min_x + 2 * pad_x, self.min_size)
+        height = max(max_y - min_y + 2 * pad_y, self.min_size)
+        center_x = (min_x + max_x) / 2
+        center_y = (min_y + max_y) / 2
+
+        x0 = int(max(0.0, center_x - width / 2) * frame_w)
+        x1 = int(min(1.0, center_x + width / 2) * frame_w)
+        y0 = int(max(0.0, center_y - height / 2) * frame_h)
+        y1 = int(min(1.0, center_y + height / 2) * frame_h)
+
+        if x1 - x0 < 16 or y1 - y0 < 16:
+            return None
+        return x0, y0, x1, y1
+
+
+class LandmarkResults:
+    """Pose result built from a (33, 4) landmark array (or None), shaped like a MediaPipe result"""
+
+    class _LandmarkList:
+        __slots__ = ('_landmark', 'points')
+
+        def __init__(self, points):
+            self._landmark = None
+            self.points = points  # Source array, copied directly by LandmarkFrame.fill
+
+        @property
+        def landmark(self):
+            # Landmark objects only for consumers that read them (LandmarkFrame.fill copies points)
+            if self._landmark is None:
+                self._landmark = [Landmark(*p) for p in self.points.tolist()]
+            return self._landmark
+
+    def __init__(self, points):
+        self.pose_landmarks = None if points is None else self._LandmarkList(points)
+
+
+class AdaptivePoseEstimator:
+    """Skips pose inference while the player is still and predicts the landmarks instead
+
+    A frame is predicted rather than inferred when the scene barely changed
+    since the last inferred frame (mean difference of a small grayscale
+    thumbnail) and/or the tracked landmarks move slowly, depending on the
+    policy. Predicted landmarks are extrapolated from the velocity between the
+    last two inferred poses, so GestureController still gets a pose every frame.
+    """
+
+    def __init__(self, pose, policy=ADAPTIVE_POLICY, frame_diff_threshold=ADAPTIVE_FRAME_DIFF_THRESHOLD,
+                 velocity_threshold=ADAPTIVE_VELOCITY_THRESHOLD, max_skip=ADAPTIVE_MAX_SKIP,
+                 thumbnail_size=ADAPTIVE_THUMBNAIL_SIZE, clock=time.perf_counter):
+        if policy not in ADAPTIVE_POLICIES:
+            raise ValueError(f"Unknown adaptive inference policy: {policy}")
+        self.pose = pose
+        self.policy = policy
+        self.frame_diff_threshold = frame_diff_threshold
+        self.velocity_threshold = velocity_threshold
+        self.max_skip = max_skip
+        self.thumbnail_size = thumbnail_size
+        self.clock = clock
+
+        # Landmarks of the last two inferred poses and their velocity (preallocated)
+        self._last = np.zeros((NUM_LANDMARKS, 4), dtype=np.float32)
+        self._previous = np.zeros((NUM_LANDMARKS, 4), dtype=np.float32)
+        self._velocity = np.zeros((NUM_LANDMARKS, 3), dtype=np.float32)
+        self._predicted = np.zeros((NUM_LANDMARKS, 4), dtype=np.float32)
+        self._last_time = None  # None while the last inference found no pose
+        self._thumbnail = None
+        self.speed = None  # Fastest tracked landmark between the last two poses
+        self.frame_diff = None
+        self.skipped_in_row = 0
+
+        self.frames = 0
+        self.inferred = 0
+        self.predicted = 0
+        self._first_time = None
+        self._latest_time = None
+
+    def process(self, rgb, timestamp=None):
+        """Run pose inference, or predict the landmarks if the frame can be skipped"""
+        now = self.clock() if timestamp is None else timestamp
+        if self._first_time is None:
+            self._first_time = now
+        self._latest_time = now
+        self.frames += 1
+
+        thumbnail = self._make_thumbnail(rgb) if self.policy != 'velocity' else None
+        if self._can_skip(thumbnail):
+            self.skipped_in_row += 1
+            self.predicted += 1
+            return self._predict(now)
+
+        results = self.pose.process(rgb)
+        self.inferred += 1
+        self.skipped_in_row = 0
+        self._thumbnail = thumbnail
+        self._remember(results, now)
+        return results
+
+    def reset(self):
+        """Forget the motion history so the next frame is inferred"""
+        self._last_time = None
+        self._thumbnail = None
+        self.speed = None
+        self.skipped_in_row = 0
+        if hasattr(self.pose, 'reset'):
+            self.pose.reset()
+
+    def inference_ratio(self):
+        """Fraction of frames that ran full pose inference"""
+        return self.inferred / self.frames if self.frames else 0.0
+
+    def stats(self):
+        """Return the inference rate achieved against the capture rate"""
+        elapsed = (self._latest_time - self._first_time) if self.frames > 1 else 0.0
+        capture_fps = (self.frames - 1) / elapsed if elapsed > 0 else 0.0
+        ratio = self.inference_ratio()
+        return {
+            'frames': self.frames,
+            'inferred': self.inferred,
+            'predicted': self.predicted,
+            'inference_ratio': ratio,
+            'capture_fps': capture_fps,
+            'inference_fps': capture_fps * ratio,
+        }
+
+    def _make_thumbnail(self, rgb):
+        small = cv2.resize(rgb, self.thumbnail_size, interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_RGB2GRAY)
+
+    def _can_skip(self, thumbnail):
+        if self._last_time is None or self.skipped_in_row >= self.max_skip:
+            return False
+        if self.policy != 'velocity':
+            self.frame_diff = float(cv2.absdiff(thumbnail, self._thumbnail).mean())
+            if self.frame_diff > self.frame_diff_threshold:
+                return False
+        if self.policy != 'frame_diff':
+            if self.speed is None or self.speed > self.velocity_threshold:
+                return False
+        return True
+
+    def _remember(self, results, now):
+        """Store the inferred pose and update the landmark velocity"""
+        if not results.pose_landmarks:
+            self._last_time = None  # Never extrapolate across frames without a pose
+            self.speed = None
+            return
+
+        self._last, self._previous = self._previous, self._last
+        previous_time = self._last_time
+        landmarks_to_array(results.pose_landmarks.landmark, out=self._last)
+        self._last_time = now
+
+        if previous_time is not None and now > previous_time:
+            np.subtract(self._last[:, X:VISIBILITY], self._previous[:, X:VISIBILITY], out=self._velocity)
+            self._velocity /= now - previous_time
+            self.speed = float(np.abs(self._velocity[TRACKED_LANDMARKS, X:Z]).max())
+        else:
+            self._velocity.fill(0)
+            self.speed = None
+
+    def _predict(self, now):
+        """Extrapolate the last inferred pose to the current time"""
+        np.multiply(self._velocity, now - self._last_time, out=self._predicted[:, X:VISIBILITY])
+        self._predicted[:, X:VISIBILITY] += self._last[:, X:VISIBILITY]
+        self._predicted[:, VISIBILITY] = self._last[:, VISIBILITY]
+        return LandmarkResults(self._predicted)
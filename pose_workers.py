@@ -0,0 +1,267 @@
+"""
+Multiprocess pose inference for Motion Controller
+Runs MediaPipe Pose in worker processes fed through shared-memory frame slots
+"""
+
+import multiprocessing as mp_proc
+import queue
+import signal
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from config import (
+    MIN_DETECTION_CONFIDENCE, MIN_TRACKING_CONFIDENCE, POSE_WORKER_SLOTS, POSE_WORKER_MAX_RETRIES
+)
+from landmark_utils import NUM_LANDMARKS, landmarks_to_array
+
+# How often a waiting get() checks whether the workers are still alive
+HEALTH_CHECK_INTERVAL = 0.2
+
+
+def create_pose(static_image_mode=False):
+    """Default pose factory (runs inside the worker process)"""
+    import mediapipe as mp
+    return mp.solutions.pose.Pose(static_image_mode=static_image_mode,
+                                  min_detection_confidence=MIN_DETECTION_CONFIDENCE,
+                                  min_tracking_confidence=MIN_TRACKING_CONFIDENCE)
+
+
+def _worker_main(worker_id, shm_name, frame_shape, num_slots, jobs, results, pose_factory, static_image_mode):
+    """Worker process loop: read a frame slot, run pose, send back a (33, 4) landmark array"""
+    import cv2
+
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # The parent handles Ctrl+C and shuts us down
+    shm = shared_memory.SharedMemory(name=shm_name)
+    frames = np.ndarray((num_slots,) + frame_shape, dtype=np.uint8, buffer=shm.buf)
+    points = np.empty((NUM_LANDMARKS, 4), dtype=np.float32)
+    pose = pose_factory(static_image_mode)
+    parent = mp_proc.parent_process()
+    try:
+        while True:
+            try:
+                job = jobs.get(timeout=1.0)
+            except queue.Empty:
+                if parent is not None and not parent.is_alive():
+                    break
+                continue
+            if job is None:
+                break
+            seq, slot = job
+            rgb = cv2.cvtColor(frames[slot], cv2.COLOR_BGR2RGB)
+            result = pose.process(rgb)
+            if result.pose_landmarks:
+                landmarks_to_array(result.pose_landmarks.landmark, out=points)
+                results.put((worker_id, seq, points.tobytes()))
+            else:
+                results.put((worker_id, seq, None))
+    finally:
+        del frames
+        if hasattr(pose, 'close'):
+            pose.close()
+        shm.close()
+
+
+class PoseResult:
+    """In-order result of one submitted frame"""
+
+    __slots__ = ('seq', 'landmarks', 'tag')
+
+    def __init__(self, seq, landmarks, tag):
+        self.seq = seq
+        self.landmarks = landmarks  # (33, 4) float32 array, or None when no pose was found
+        self.tag = tag
+
+
+class _Worker:
+    def __init__(self, worker_id, process, jobs):
+        self.id = worker_id
+        self.process = process
+        self.jobs = jobs
+        self.in_flight = set()
+
+
+class PoseWorkerPool:
+    """Pipelined pose inference in worker processes
+
+    submit() copies a BGR frame into a free shared-memory slot and hands the
+    slot index to the least busy worker; only the slot index crosses the
+    process boundary, never the pixels. get() returns results strictly in
+    submission order, together with the tag passed to submit(), which stays
+    in this process. Workers that die are restarted and their frames are
+    resubmitted; a frame that keeps crashing workers gets an empty result.
+
+    Consecutive frames go to different workers, so each MediaPipe instance
+    sees only every Nth frame of the stream and its tracking from the
+    previous frame would start from a stale pose. With more than one worker
+    the poses therefore run in static_image_mode by default: every frame is
+    detected from scratch, which avoids the stale tracking but costs more
+    per frame and gives slightly noisier landmarks than one tracking
+    instance. pose_factory(static_image_mode) creates the pose in a worker.
+    """
+
+    def __init__(self, num_workers, slots=None, pose_factory=create_pose, max_retries=POSE_WORKER_MAX_RETRIES,
+                 static_image_mode=None):
+        self.num_workers = num_workers
+        self.static_image_mode = num_workers > 1 if static_image_mode is None else static_image_mode
+        self.num_slots = slots or num_workers * POSE_WORKER_SLOTS
+        self.pose_factory = pose_factory
+        self.max_retries = max_retries
+        self.context = mp_proc.get_context('spawn')  # Same behaviour on Windows and Linux
+        self.frame_shape = None
+        self._shm = None
+        self._frames = None
+        self._results = None
+        self._workers = []
+        self._free_slots = list(range(self.num_slots))
+        self._jobs = {}  # seq -> [slot, worker id, attempts, tag]
+        self._done = {}  # seq -> PoseResult waiting for earlier frames
+        self._next_seq = 0
+        self._next_out = 0
+        self.restarts = 0
+        self.failed_frames = 0
+
+    def start(self, frame_shape):
+        """Allocate the frame slots and start the workers"""
+        self.frame_shape = tuple(frame_shape)
+        size = int(np.prod(self.frame_shape)) * self.num_slots
+        self._shm = shared_memory.SharedMemory(create=True, size=size)
+        self._frames = np.ndarray((self.num_slots,) + self.frame_shape, dtype=np.uint8, buffer=self._shm.buf)
+        self._results = self.context.Queue()
+        self._workers = [self._spawn(i) for i in range(self.num_workers)]
+        mode = "detection on every frame" if self.static_image_mode else "tracking"
+        print(f"✓ Pose inference running in {self.num_workers} worker process(es), {mode}")
+        return self
+
+    def _spawn(self, worker_id):
+        jobs = self.context.Queue()
+        process = self.context.Process(
+            target=_worker_main, name=f"pose-worker-{worker_id}", daemon=True,
+            args=(worker_id, self._shm.name, self.frame_shape, self.num_slots, jobs, self._results,
+                  self.pose_factory, self.static_image_mode))
+        process.start()
+        return _Worker(worker_id, process, jobs)
+
+    def in_flight(self):
+        """Number of submitted frames whose results have not been returned yet"""
+        return self._next_seq - self._next_out
+
+    def can_submit(self):
+        return self._shm is None or bool(self._free_slots)
+
+    def submit(self, frame, tag=None):
+        """Queue a BGR frame for inference and return its sequence number
+
+        Raises RuntimeError when all slots are busy - call get() first.
+        """
+        if self._shm is None:
+            self.start(frame.shape)
+        elif frame.shape != self.frame_shape:
+            raise ValueError(f"Frame shape changed from {self.frame_shape} to {frame.shape}")
+        if not self._free_slots:
+            raise RuntimeError("No free frame slot - collect results with get() before submitting")
+
+        slot = self._free_slots.pop()
+        self._frames[slot] = frame
+        seq = self._next_seq
+        self._next_seq += 1
+        self._jobs[seq] = [slot, None, 0, tag]
+        self._dispatch(seq)
+        return seq
+
+    def _dispatch(self, seq):
+        job = self._jobs[seq]
+        worker = min(self._workers, key=lambda w: len(w.in_flight))
+        job[1] = worker.id
+        job[2] += 1
+        worker.in_flight.add(seq)
+        worker.jobs.put((seq, job[0]))
+
+    def get(self, timeout=None):
+        """Return the PoseResult of the oldest submitted frame (None on timeout or when idle)"""
+        if self.in_flight() == 0:
+            return None
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._next_out not in self._done:
+            wait = HEALTH_CHECK_INTERVAL
+            if deadline is not None:
+                wait = min(wait, deadline - time.monotonic())
+                if wait <= 0:
+                    return None
+            try:
+                worker_id, seq, data = self._results.get(timeout=wait)
+            except queue.Empty:
+                self._check_workers()
+                continue
+            self._complete(worker_id, seq, data)
+
+        result = self._done.pop(self._next_out)
+        self._next_out += 1
+        return result
+
+    def _complete(self, worker_id, seq, data):
+        if worker_id < len(self._workers):
+            self._workers[worker_id].in_flight.discard(seq)
+        job = self._jobs.pop(seq, None)
+        if job is None:
+            return  # Duplicate from a resubmitted frame that already has a result
+        landmarks = np.frombuffer(data, dtype=np.float32).reshape(NUM_LANDMARKS, 4) if data else None
+        self._free_slots.append(job[0])
+        self._done[seq] = PoseResult(seq, landmarks, job[3])
+
+    def _check_workers(self):
+        """Restart dead workers and resubmit the frames they were processing"""
+        for i, worker in enumerate(self._workers):
+            if worker.process.is_alive():
+                continue
+            print(f"⚠ Pose worker {worker.id} exited (code {worker.process.exitcode}), restarting")
+            self.restarts += 1
+            lost = [seq for seq in worker.in_flight if seq in self._jobs]
+            self._workers[i] = self._spawn(worker.id)
+            for seq in sorted(lost):
+                job = self._jobs[seq]
+                if job[2] > self.max_retries:
+                    # The frame keeps killing workers - give up on it
+                    self.failed_frames += 1
+                    self._complete(worker.id, seq, None)
+                else:
+                    self._dispatch(seq)
+
+    def stats(self):
+        return {
+            'workers': self.num_workers,
+            'static_image_mode': self.static_image_mode,
+            'slots': self.num_slots,
+            'submitted': self._next_seq,
+            'completed': self._next_out,
+            'in_flight': self.in_flight(),
+            'restarts': self.restarts,
+            'failed_frames': self.failed_frames,
+        }
+
+    def close(self, timeout=2.0):
+        """Stop the workers and release the shared memory"""
+        for worker in self._workers:
+            worker.jobs.put(None)
+        deadline = time.monotonic() + timeout
+        for worker in self._workers:
+            worker.process.join(max(0.0, deadline - time.monotonic()))
+            if worker.process.is_alive():
+                worker.process.terminate()
+                worker.process.join(1.0)
+        self._workers = []
+        if self._results is not None:
+            self._results.cancel_join_thread()
+            self._results = None
+        if self._shm is not None:
+            self._frames = None
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
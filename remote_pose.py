@@ -0,0 +1,528 @@
+"""
+Networked split mode for Motion Controller
+A vision node streams quantized pose landmarks over UDP to an input node that only runs the gesture logic
+
+Usage:
+    python remote_pose.py input                                   # on the game machine
+    python remote_pose.py vision --host 192.168.1.20 --camera 0   # on the camera machine
+    python remote_pose.py vision --host 127.0.0.1 --video session.mp4
+    python remote_pose.py loopback --trace session.trace --loss 0.05 --reorder 0.05
+
+One-way latency is the receive time minus the capture time in the packet,
+both taken from the wall clock, so across machines it is only as accurate
+as their clock synchronization (NTP / PTP).
+"""
+
+import argparse
+import contextlib
+import os
+import socket
+import struct
+import sys
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from camera_utils import open_frame_source, extract_landmarks, FrameReader
+from config import (
+    DEADZONE, UP_THRESHOLD, DOWN_THRESHOLD, KEYBOARD_BINDINGS, MOUSE_BINDINGS, MOUSE_CURSOR,
+    NET_HOST, NET_BIND, NET_PORT, NET_LANDMARKS, NET_XY_RANGE, NET_Z_RANGE, NET_POSE_TIMEOUT_S,
+    NET_STATS_INTERVAL_S, MIN_DETECTION_CONFIDENCE, MIN_TRACKING_CONFIDENCE, SCREEN_WIDTH, SCREEN_HEIGHT,
+    MOUSE_SMOOTHING, INPUT_BACKEND, CAMERA_INDEX
+)
+from gesture_rules import compile_rules
+from instrumentation import RollingHistogram
+from landmark_utils import LANDMARK_NAMES, NOSE, X, Y, Z, VISIBILITY, LandmarkFrame, landmarks_from_array
+
+PACKET_MAGIC = b'MP'
+PACKET_VERSION = 2
+# magic, version, flags, sender session id, sequence number, capture time (wall clock seconds),
+# bit mask of the sent landmarks
+HEADER = struct.Struct('<2sBBIIdQ')
+FLAG_POSE = 1  # Landmarks follow the header (without it the vision node saw no pose)
+# Per sent landmark: x, y, z quantized to 16 bits over their NET_*_RANGE, visibility to 8 bits
+LANDMARK_DTYPE = np.dtype([('x', '<u2'), ('y', '<u2'), ('z', '<u2'), ('visibility', 'u1')])
+MAX_PACKET_SIZE = HEADER.size + len(LANDMARK_NAMES) * LANDMARK_DTYPE.itemsize
+SEQUENCE_MOD = 1 << 32
+
+# Frame height passed to GestureController (only used for keyboard hints)
+FRAME_HEIGHT = 480
+
+
+def rule_landmarks(keyboard_bindings=KEYBOARD_BINDINGS, mouse_bindings=MOUSE_BINDINGS):
+    """Names of the landmarks the gesture bindings read, plus the nose for the depth check"""
+    params = {'deadzone': DEADZONE, 'up_threshold': UP_THRESHOLD, 'down_threshold': DOWN_THRESHOLD}
+    names = {'nose'}
+    for rules in (compile_rules(keyboard_bindings, params), compile_rules(mouse_bindings, params, cursor=MOUSE_CURSOR)):
+        names.update(attribute.split('.')[0] for attribute in rules.attributes)
+    return [name for name in LANDMARK_NAMES if name in names]
+
+
+def landmark_mask(names):
+    """Bit mask of landmark names (bit i = landmark index i); the nose is always included"""
+    mask = 1 << NOSE
+    for name in names:
+        mask |= 1 << LANDMARK_NAMES.index(name)
+    return mask
+
+
+def mask_indices(mask):
+    return np.array([i for i in range(len(LANDMARK_NAMES)) if mask >> i & 1], dtype=np.intp)
+
+
+def _scale(value_range):
+    low, high = value_range
+    return low, (high - low) / 65535
+
+
+class LandmarkSender:
+    """Packs LandmarkFrames into datagrams and sends them to the input node
+
+    The packet buffer is allocated once; each send quantizes the selected
+    landmarks straight into it. The sequence number lets the receiver spot
+    lost and reordered packets; the random session id tells it that the
+    vision node restarted and the sequence begins again at 0.
+    """
+
+    def __init__(self, sock, address, landmarks=None):
+        self.sock = sock
+        self.address = address
+        self.mask = landmark_mask(landmarks if landmarks is not None else NET_LANDMARKS or rule_landmarks())
+        self.indices = mask_indices(self.mask)
+        self.size = HEADER.size + len(self.indices) * LANDMARK_DTYPE.itemsize
+        self.buffer = bytearray(self.size)
+        self.view = memoryview(self.buffer)
+        self.payload = np.frombuffer(self.buffer, LANDMARK_DTYPE, count=len(self.indices), offset=HEADER.size)
+        self.session = int.from_bytes(os.urandom(4), 'little')
+        self.sequence = 0
+        self.sent = 0
+        self.bytes_sent = 0
+
+    def _quantize(self, field, values, value_range):
+        low, step = _scale(value_range)
+        np.clip(np.rint((values - low) / step), 0, 65535, out=values)
+        self.payload[field] = values
+
+    def send(self, frame, capture_time):
+        """Send a LandmarkFrame (None when no pose was detected) with its capture time (wall clock)"""
+        if frame is None:
+            HEADER.pack_into(self.buffer, 0, PACKET_MAGIC, PACKET_VERSION, 0, self.session, self.sequence,
+                             capture_time, self.mask)
+            size = HEADER.size
+        else:
+            HEADER.pack_into(self.buffer, 0, PACKET_MAGIC, PACKET_VERSION, FLAG_POSE, self.session,
+                             self.sequence, capture_time, self.mask)
+            points = frame.points[self.indices]
+            self._quantize('x', points[:, X], NET_XY_RANGE)
+            self._quantize('y', points[:, Y], NET_XY_RANGE)
+            self._quantize('z', points[:, Z], NET_Z_RANGE)
+            self.payload['visibility'] = np.clip(np.rint(points[:, VISIBILITY] * 255), 0, 255)
+            size = self.size
+        self.sock.sendto(self.view[:size], self.address)
+        self.sequence = (self.sequence + 1) % SEQUENCE_MOD
+        self.sent += 1
+        self.bytes_sent += size
+
+    def stats(self):
+        return {'sent': self.sent, 'bytes': self.bytes_sent, 'packet_bytes': self.size,
+                'landmarks': [LANDMARK_NAMES[i] for i in self.indices]}
+
+
+class LandmarkReceiver:
+    """Receives landmark datagrams into a LandmarkFrame, keeping only the newest pose
+
+    A packet older than the newest one applied (out of order) or seen twice
+    is dropped: the controller must never step back in time. Sequence gaps
+    count as lost packets unless the missing packet turns up late.
+    The sequence is tracked per sender session and forgotten after
+    reset_after seconds without a packet, so a restarted vision node is
+    accepted right away. Landmarks the vision node does not send are NaN.
+    """
+
+    def __init__(self, sock, wall_clock=time.time, clock=time.perf_counter, reset_after=NET_POSE_TIMEOUT_S):
+        self.sock = sock
+        self.wall_clock = wall_clock
+        self.clock = clock
+        self.buffer = bytearray(MAX_PACKET_SIZE + 1)
+        self.frame = LandmarkFrame()
+        self.frame.points[:] = np.nan
+        self.mask = None
+        self.indices = mask_indices(0)
+        self.reset_after = reset_after
+        self.session = None
+        self.last_sequence = None
+        self.last_packet = None
+        self.sessions = 0
+        self.received = 0
+        self.late = 0
+        self.duplicates = 0
+        self.invalid = 0
+        self.gaps = 0
+        self.latency = RollingHistogram()
+
+    def receive(self, timeout):
+        """Wait up to timeout seconds for the next new packet
+
+        Returns (frame or None without a pose, capture time on this machine's
+        perf_counter clock), or None on timeout. The frame is reused.
+        """
+        deadline = self.clock() + timeout
+        while True:
+            remaining = deadline - self.clock()
+            if remaining <= 0:
+                return None
+            self.sock.settimeout(remaining)
+            try:
+                size = self.sock.recv_into(self.buffer)
+            except socket.timeout:
+                return None
+            result = self._apply(size)
+            if result is not None:
+                return result
+
+    def feed(self, data):
+        """Apply a datagram given directly instead of read from the socket; same result as receive()"""
+        self.buffer[:len(data)] = data
+        return self._apply(len(data))
+
+    def _apply(self, size):
+        if size < HEADER.size:
+            self.invalid += 1
+            return None
+        magic, version, flags, session, sequence, capture_time, mask = HEADER.unpack_from(self.buffer)
+        if magic != PACKET_MAGIC or version != PACKET_VERSION:
+            self.invalid += 1
+            return None
+        if mask != self.mask:
+            self.mask = mask
+            self.indices = mask_indices(mask)
+            self.frame.points[:] = np.nan
+        if flags & FLAG_POSE and size != HEADER.size + len(self.indices) * LANDMARK_DTYPE.itemsize:
+            self.invalid += 1
+            return None
+
+        self.received += 1
+        arrival = self.clock()
+        if session != self.session:
+            self.session = session
+            self.last_sequence = None
+            self.sessions += 1
+        elif self.last_packet is not None and arrival - self.last_packet > self.reset_after:
+            self.last_sequence = None  # Link was down; whatever arrives now is the newest pose
+        self.last_packet = arrival
+        if self.last_sequence is not None:
+            ahead = (sequence - self.last_sequence) % SEQUENCE_MOD
+            if ahead == 0:
+                self.duplicates += 1
+                return None
+            if ahead >= SEQUENCE_MOD // 2:
+                self.late += 1  # Older than the pose already applied
+                return None
+            self.gaps += ahead - 1
+        self.last_sequence = sequence
+
+        now = self.wall_clock()
+        self.latency.add((now - capture_time) * 1000)
+        local_capture_time = self.clock() - (now - capture_time)
+        if not flags & FLAG_POSE:
+            return None, local_capture_time
+        payload = np.frombuffer(self.buffer, LANDMARK_DTYPE, count=len(self.indices), offset=HEADER.size)
+        points = self.frame.points
+        low, step = _scale(NET_XY_RANGE)
+        points[self.indices, X] = payload['x'] * step + low
+        points[self.indices, Y] = payload['y'] * step + low
+        low, step = _scale(NET_Z_RANGE)
+        points[self.indices, Z] = payload['z'] * step + low
+        points[self.indices, VISIBILITY] = payload['visibility'] / 255
+        return self.frame, local_capture_time
+
+    def landmarks(self):
+        """Names of the landmarks the vision node sends"""
+        return [LANDMARK_NAMES[i] for i in self.indices]
+
+    def stats(self):
+        p50, p95, p99 = self.latency.percentiles()
+        return {
+            'received': self.received,
+            'late': self.late,
+            'duplicates': self.duplicates,
+            'invalid': self.invalid,
+            'sessions': self.sessions,
+            'lost': max(self.gaps - self.late, 0),
+            'latency_p50_ms': p50,
+            'latency_p95_ms': p95,
+            'latency_p99_ms': p99,
+        }
+
+
+def format_receiver_stats(stats):
+    return (f"{stats['received']} packets, {stats['lost']} lost, {stats['late']} late, "
+            f"{stats['duplicates']} duplicate | one-way latency p50 {stats['latency_p50_ms']:.1f} ms, "
+            f"p95 {stats['latency_p95_ms']:.1f} ms, p99 {stats['latency_p99_ms']:.1f} ms")
+
+
+def run_input_node(receiver, controller, mouse_enabled=False, timeout=NET_POSE_TIMEOUT_S,
+                   stop=None, stats_interval=NET_STATS_INTERVAL_S):
+    """Apply received landmarks to the controller until stop is set (or forever)
+
+    When no packet arrives within timeout, every control is released so a
+    dropped link cannot leave a key held down.
+    """
+    released = True
+    mask = None
+    next_report = time.perf_counter() + stats_interval
+    needed = set(rule_landmarks())
+    while stop is None or not stop.is_set():
+        packet = receiver.receive(timeout)
+        if packet is None:
+            if not released:
+                controller.release_all()
+                released = True
+                print(f"⚠ No landmarks for {timeout * 1000:.0f} ms - controls released")
+        else:
+            frame, capture_time = packet
+            if receiver.mask != mask:
+                mask = receiver.mask
+                missing = needed - set(receiver.landmarks())
+                if missing:
+                    print(f"⚠ Vision node does not send landmarks the bindings use: {', '.join(sorted(missing))}")
+            if frame is not None:
+                controller.process_frame(frame, mouse_enabled, FRAME_HEIGHT, SCREEN_WIDTH, SCREEN_HEIGHT,
+                                         MOUSE_SMOOTHING, capture_time=capture_time)
+                released = False
+        if stats_interval and time.perf_counter() >= next_report:
+            next_report = time.perf_counter() + stats_interval
+            print(f"📡 {format_receiver_stats(receiver.stats())}")
+    controller.release_all()
+
+
+def run_vision_node(reader, pose, sender, max_frames=None, stats_interval=NET_STATS_INTERVAL_S):
+    """Capture, run pose inference and send every frame's landmarks; returns the frame count"""
+    # Capture timestamps are perf_counter values; packets carry wall clock time
+    wall_offset = time.time() - time.perf_counter()
+    frame = LandmarkFrame()
+    frames = 0
+    start = next_report = time.perf_counter()
+    while max_frames is None or frames < max_frames:
+        image, timestamp = reader.read()
+        if image is None:
+            break
+        results = pose.process(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+        sender.send(extract_landmarks(results, out=frame), timestamp + wall_offset)
+        frames += 1
+        if stats_interval and time.perf_counter() >= next_report:
+            next_report = time.perf_counter() + stats_interval
+            elapsed = max(time.perf_counter() - start, 1e-9)
+            print(f"📡 Sent {sender.sent} packets ({sender.size} B with a pose, "
+                  f"{sender.bytes_sent * 8 / elapsed / 1000:.1f} kbit/s)")
+    return frames
+
+
+def send_trace(trace, sender, max_frames=None, realtime=True):
+    """Send the landmarks of a recorded trace, paced like the recording when realtime"""
+    frame = LandmarkFrame()
+    start = time.perf_counter()
+    first = None
+    frames = 0
+    for timestamp, points, _, _ in trace.frames(stop=max_frames):
+        if first is None:
+            first = timestamp
+        if realtime:
+            delay = start + (timestamp - first) - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        landmarks = landmarks_from_array(points, out=frame) if points is not None else None
+        sender.send(landmarks, time.time())
+        frames += 1
+    return frames
+
+
+class LossyLink:
+    """Socket stand-in that drops and reorders datagrams (loopback testing)
+
+    A reordered datagram is held back and sent right after the next one.
+    """
+
+    def __init__(self, sock, loss=0.0, reorder=0.0, seed=0):
+        self.sock = sock
+        self.loss = loss
+        self.reorder = reorder
+        self.rng = np.random.default_rng(seed)
+        self.held = None
+        self.dropped = 0
+        self.reordered = 0
+
+    def sendto(self, data, address):
+        if self.rng.random() < self.loss:
+            self.dropped += 1
+            return
+        if self.held is None and self.rng.random() < self.reorder:
+            self.held = (bytes(data), address)
+            self.reordered += 1
+            return
+        self.sock.sendto(data, address)
+        if self.held is not None:
+            self.sock.sendto(*self.held)
+            self.held = None
+
+
+class _DirectLink:
+    """Socket stand-in that hands each datagram straight to a receiver"""
+
+    def __init__(self, receiver):
+        self.receiver = receiver
+        self.packet = None
+
+    def sendto(self, data, address):
+        self.packet = self.receiver.feed(data)
+
+
+def run_loopback(trace_path, max_frames=None, loss=0.0, reorder=0.0, mouse_enabled=False, realtime=True,
+                 seed=0):
+    """Stream a trace through a vision sender and an input node over localhost
+
+    Returns (receiver stats, sender stats, link, remote events, local events).
+    The local events come from a GestureController fed the same packets
+    directly, without the socket, loss or reordering. Both runs therefore
+    see the same quantized landmarks.
+    """
+    from gesture_controller import GestureController
+    from input_helpers import RecordingBackend
+    from trace_utils import TraceReader
+
+    receive_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    receive_socket.bind(('127.0.0.1', 0))
+    send_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    link = LossyLink(send_socket, loss, reorder, seed)
+    receiver = LandmarkReceiver(receive_socket)
+    remote = GestureController(RecordingBackend())
+    stop = threading.Event()
+    with contextlib.redirect_stdout(sys.stderr):
+        node = threading.Thread(target=run_input_node, args=(receiver, remote, mouse_enabled),
+                                kwargs={'stop': stop, 'stats_interval': 0}, daemon=True)
+        node.start()
+        sender = LandmarkSender(link, receive_socket.getsockname())
+        with TraceReader(trace_path) as trace:
+            send_trace(trace, sender, max_frames, realtime)
+            time.sleep(NET_POSE_TIMEOUT_S)  # Let the input node drain its socket
+            stop.set()
+            node.join()
+
+            local = GestureController(RecordingBackend())
+            link_in_process = _DirectLink(LandmarkReceiver(None))
+            local_sender = LandmarkSender(link_in_process, None)
+            frame = LandmarkFrame()
+            for _, points, _, _ in trace.frames(stop=max_frames):
+                local_sender.send(landmarks_from_array(points, out=frame) if points is not None else None,
+                                  time.time())
+                received, capture_time = link_in_process.packet
+                if received is not None:
+                    local.process_frame(received, mouse_enabled, FRAME_HEIGHT, SCREEN_WIDTH, SCREEN_HEIGHT,
+                                        MOUSE_SMOOTHING, capture_time=capture_time)
+            local.release_all()
+    receive_socket.close()
+    send_socket.close()
+    events = [[(action, args) for _, action, args in c.output.events] for c in (remote, local)]
+    return receiver.stats(), sender.stats(), link, events[0], events[1]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run Motion Controller split over two machines")
+    modes = parser.add_subparsers(dest="mode", required=True)
+
+    vision = modes.add_parser("vision", help="Capture, detect the pose and stream landmarks")
+    source = vision.add_mutually_exclusive_group()
+    source.add_argument("--camera", type=int, help="Camera index (default: CAMERA_INDEX)")
+    source.add_argument("--video", help="Video file or image directory instead of a camera")
+    source.add_argument("--trace", help="Send a recorded landmark trace (no camera, no inference)")
+    vision.add_argument("--host", default=NET_HOST, help="Input node address")
+    vision.add_argument("--port", type=int, default=NET_PORT, help="Input node UDP port")
+    vision.add_argument("--all-landmarks", action="store_true", help="Send all 33 landmarks")
+    vision.add_argument("--max-frames", type=int, default=None, help="Stop after this many frames")
+
+    node = modes.add_parser("input", help="Receive landmarks and run the gesture logic and input injection")
+    node.add_argument("--bind", default=NET_BIND, help="Address to listen on")
+    node.add_argument("--port", type=int, default=NET_PORT, help="UDP port to listen on")
+    node.add_argument("--mouse", action="store_true", help="Use mouse control mode")
+    node.add_argument("--dry-run", action="store_true", help="Record input events instead of injecting them")
+
+    loopback = modes.add_parser("loopback", help="Send a trace through both nodes over localhost and compare")
+    loopback.add_argument("--trace", required=True, help="Landmark trace to send")
+    loopback.add_argument("--max-frames", type=int, default=None, help="Stop after this many frames")
+    loopback.add_argument("--loss", type=float, default=0.0, help="Share of packets to drop")
+    loopback.add_argument("--reorder", type=float, default=0.0, help="Share of packets to delay by one")
+    loopback.add_argument("--mouse", action="store_true", help="Use mouse control mode")
+    loopback.add_argument("--fast", action="store_true", help="Send as fast as possible instead of in real time")
+    args = parser.parse_args(argv)
+
+    if args.mode == "loopback":
+        stats, sent, link, remote, local = run_loopback(args.trace, args.max_frames, args.loss, args.reorder,
+                                                        args.mouse, realtime=not args.fast)
+        print(f"Sent {sent['sent']} packets ({sent['packet_bytes']} B with a pose: "
+              f"{', '.join(sent['landmarks'])}); link dropped {link.dropped}, reordered {link.reordered}")
+        print(f"Received {format_receiver_stats(stats)}")
+        same = "identical to" if remote == local else "different from"
+        print(f"Input events: {len(remote)} remote, {len(local)} local ({same} a local run)")
+        if remote != local and not args.loss and not args.reorder:
+            print("ERROR: Input events over a lossless link differ from a local run", file=sys.stderr)
+            return 1
+        return 0
+
+    if args.mode == "input":
+        from calibration import load_calibration
+        from gesture_controller import GestureController
+        from input_helpers import RecordingBackend, create_backend, init_input_system
+
+        if args.dry_run:
+            backend = RecordingBackend()
+        else:
+            init_input_system()
+            backend = create_backend(INPUT_BACKEND)
+        controller = GestureController(backend, **load_calibration())
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.bind((args.bind, args.port))
+        print(f"✓ Input node listening on {args.bind}:{args.port} (UDP)")
+        try:
+            run_input_node(LandmarkReceiver(sock), controller, args.mouse)
+        except KeyboardInterrupt:
+            controller.release_all()
+        finally:
+            sock.close()
+        return 0
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sender = LandmarkSender(sock, (args.host, args.port), list(LANDMARK_NAMES) if args.all_landmarks else None)
+    print(f"✓ Streaming {len(sender.indices)} landmarks to {args.host}:{args.port} ({sender.size} B per packet)")
+    try:
+        if args.trace:
+            from trace_utils import TraceReader
+            with TraceReader(args.trace) as trace:
+                frames = send_trace(trace, sender, args.max_frames)
+        else:
+            import mediapipe as mp  # Only the vision node needs MediaPipe
+
+            source = args.video if args.video is not None else (
+                args.camera if args.camera is not None else CAMERA_INDEX)
+            cap = open_frame_source(source)
+            if not cap.isOpened():
+                print(f"ERROR: Could not open input source: {source}", file=sys.stderr)
+                return 1
+            reader = FrameReader(cap, threaded=args.video is None)
+            try:
+                with mp.solutions.pose.Pose(min_detection_confidence=MIN_DETECTION_CONFIDENCE,
+                                            min_tracking_confidence=MIN_TRACKING_CONFIDENCE) as pose:
+                    frames = run_vision_node(reader, pose, sender, args.max_frames)
+            finally:
+                reader.release()
+    except KeyboardInterrupt:
+        frames = sender.sent
+    finally:
+        sock.close()
+    print(f"Sent {frames} frames, {sender.bytes_sent} bytes")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+"""
+Startup orchestration for Motion Controller
+Runs independent initialization tasks concurrently and reports real progress and per-phase timing
+"""
+
+import sys
+import threading
+import time
+
+
+class StartupTask:
+    """One initialization step; runs on its own thread once its dependencies are done"""
+
+    def __init__(self, name, fn, weight, after):
+        self.name = name
+        self.fn = fn
+        self.weight = weight
+        self.after = after
+        self.result = None
+        self.error = None
+        self.start = None
+        self.end = None
+        self.thread = None
+
+
+class StartupOrchestrator:
+    """Dependency-aware concurrent startup
+
+    Tasks are plain functions; a task listed in `after` passes its result to
+    the dependent task as a keyword argument of the same name. run() keeps
+    the calling (GUI) thread free to redraw the loading screen: progress is
+    the weight of finished tasks, not a fixed schedule.
+    """
+
+    def __init__(self, clock=time.perf_counter, origin=None):
+        self.clock = clock
+        self.origin = clock() if origin is None else origin  # Time zero of the profile
+        self.tasks = {}
+        self.marks = []  # (name, time) of milestones outside the tasks
+        self._done = threading.Condition()
+
+    def add(self, name, fn, weight=1.0, after=()):
+        self.tasks[name] = StartupTask(name, fn, weight, tuple(after))
+        return self
+
+    def mark(self, name):
+        """Record a milestone (e.g. the first processed frame) in the profile"""
+        self.marks.append((name, self.clock()))
+
+    def _run_task(self, task):
+        task.start = self.clock()
+        try:
+            task.result = task.fn(**{dep: self.tasks[dep].result for dep in task.after})
+        except BaseException as e:  # Reported on the main thread
+            task.error = e
+        task.end = self.clock()
+        with self._done:
+            self._done.notify_all()
+
+    def progress(self):
+        """Percentage of task weight finished"""
+        total = sum(t.weight for t in self.tasks.values()) or 1.0
+        return int(100 * sum(t.weight for t in self.tasks.values() if t.end is not None) / total)
+
+    def running(self):
+        return [t.name for t in self.tasks.values() if t.start is not None and t.end is None]
+
+    def run(self, on_progress=None, poll_interval=0.02):
+        """Run all tasks and return {name: result}; re-raises the first task error"""
+        for name, task in self.tasks.items():
+            for dep in task.after:
+                if dep not in self.tasks:
+                    raise ValueError(f"Startup task {name} depends on unknown task {dep}")
+
+        while True:
+            with self._done:
+                failed = [t for t in self.tasks.values() if t.error is not None]
+                finished = all(t.end is not None for t in self.tasks.values())
+                if not failed:
+                    for task in self.tasks.values():
+                        ready = all(self.tasks[d].end is not None for d in task.after)
+                        if task.thread is None and ready:
+                            task.thread = threading.Thread(target=self._run_task, args=(task,),
+                                                           name=f"startup-{task.name}", daemon=True)
+                            task.thread.start()
+            if failed:
+                raise failed[0].error
+            if finished:
+                break
+            if on_progress is not None:
+                on_progress(self.progress(), self.running())
+            with self._done:
+                self._done.wait(poll_interval)
+
+        if on_progress is not None:
+            on_progress(100, [])
+        return {name: task.result for name, task in self.tasks.items()}
+
+    def profile(self):
+        """Return phases as (name, start ms, end ms) relative to the origin"""
+        phases = [(t.name, (t.start - self.origin) * 1000, (t.end - self.origin) * 1000)
+                  for t in self.tasks.values() if t.end is not None]
+        phases += [(name, (at - self.origin) * 1000, (at - self.origin) * 1000) for name, at in self.marks]
+        phases.sort(key=lambda p: (p[1], p[2]))
+        return phases
+
+    def print_profile(self, file=sys.stdout):
+        print("⏱ Startup profile (ms since process start):", file=file)
+        print(f"  {'phase':<22}{'start':>9}{'end':>9}{'duration':>10}", file=file)
+        for name, start, end in self.profile():
+            print(f"  {name:<22}{start:>9.0f}{end:>9.0f}{end - start:>10.0f}", file=file)
@@ -0,0 +1,45 @@
+"""
+Shared fixtures for the Motion Controller tests
+Synthesized poses and landmark traces, so no camera or MediaPipe model is needed
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from landmark_utils import NUM_LANDMARKS, NOSE, LEFT_WRIST, RIGHT_WRIST, LEFT_HIP, RIGHT_HIP  # noqa: E402
+from trace_utils import TraceWriter  # noqa: E402
+
+
+def make_pose(left_wrist=(0.5, 0.5), right_wrist=(0.5, 0.5), nose_z=-0.3, visibility=1.0):
+    """(33, 4) landmark array of a player standing at a good distance, wrists at the given (x, y)"""
+    points = np.zeros((NUM_LANDMARKS, 4), dtype=np.float32)
+    points[:] = (0.5, 0.5, nose_z, 1.0)
+    points[NOSE] = (0.5, 0.3, nose_z, 1.0)
+    points[LEFT_HIP] = (0.55, 0.6, nose_z, 1.0)
+    points[RIGHT_HIP] = (0.45, 0.6, nose_z, 1.0)
+    points[LEFT_WRIST] = (*left_wrist, nose_z, visibility)
+    points[RIGHT_WRIST] = (*right_wrist, nose_z, visibility)
+    return points
+
+
+@pytest.fixture
+def pose():
+    """make_pose(); a left wrist at x 0.9 is the LEFT gesture, a right wrist at x 0.1 is RIGHT"""
+    return make_pose
+
+
+@pytest.fixture
+def write_trace(tmp_path):
+    """Write a list of (timestamp, points) frames to a trace file and return its path"""
+    def write(frames, name="session.trace"):
+        path = str(tmp_path / name)
+        with TraceWriter(path, 640, 480) as writer:
+            for timestamp, points in frames:
+                writer.write(timestamp, points)
+        return path
+    return write
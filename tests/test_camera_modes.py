@@ -0,0 +1,64 @@
+"""Camera mode negotiation against FakeCapture (no camera needed)"""
+
+import pytest
+
+from camera_modes import CameraNegotiator, FakeCapture, load_profiles
+from latency_tracing import FakeClock
+
+# A typical USB webcam: MJPEG reaches 60 FPS at VGA, raw YUYV only 30 (and 10 at 720p)
+WEBCAM_MODES = {
+    ('YUYV', 640, 480): 30,
+    ('YUYV', 1280, 720): 10,
+    ('MJPG', 640, 480): 60,
+    ('MJPG', 1280, 720): 30,
+}
+
+
+@pytest.fixture
+def negotiator(tmp_path):
+    clock = FakeClock()
+    return CameraNegotiator(640, 480, 60, ('MJPG', 'YUYV'), buffer_size=1, probe_frames=10,
+                            profile_path=str(tmp_path / "camera_profiles.json"), clock=clock)
+
+
+def test_chooses_lowest_latency_qualifying_mode(negotiator):
+    cap = FakeCapture(WEBCAM_MODES, clock=negotiator.clock)
+    result = negotiator.negotiate(cap, "FAKE:0")
+
+    assert result.actual.key() == ('MJPG', 640, 480, 60, 1)
+    assert (cap.fourcc, cap.width, cap.height, cap.fps, cap.buffer_size) == ('MJPG', 640, 480, 60, 1)
+    assert result.interval_ms == pytest.approx(1000 / 60)
+    assert result.measured_fps == pytest.approx(60)
+    assert result.latency_ms == pytest.approx(2 * 1000 / 60)  # One queued frame plus the one being captured
+
+
+def test_falls_back_to_the_best_mode_below_target(negotiator):
+    cap = FakeCapture({key: fps for key, fps in WEBCAM_MODES.items() if key[0] == 'YUYV'}, clock=negotiator.clock)
+    result = negotiator.negotiate(cap, "FAKE:0")
+
+    assert result.actual.key() == ('YUYV', 640, 480, 30, 1)
+    assert result.interval_ms == pytest.approx(1000 / 30)
+
+
+def test_saved_profile_skips_the_probe(negotiator):
+    first = negotiator.negotiate(FakeCapture(WEBCAM_MODES, clock=negotiator.clock), "FAKE:0")
+    assert "FAKE:0" in load_profiles(negotiator.profile_path)
+
+    cap = FakeCapture(WEBCAM_MODES, clock=negotiator.clock)
+    second = negotiator.negotiate(cap, "FAKE:0")
+
+    assert cap.frames_read == 0
+    assert second.actual.key() == first.actual.key()
+    assert second.interval_ms == pytest.approx(first.interval_ms)
+    assert (cap.fourcc, cap.fps, cap.buffer_size) == ('MJPG', 60, 1)
+
+
+def test_saved_profile_is_probed_again_when_the_device_changed(negotiator):
+    negotiator.negotiate(FakeCapture(WEBCAM_MODES, clock=negotiator.clock), "FAKE:0")
+
+    # Same device key, but the camera no longer offers MJPEG
+    cap = FakeCapture({('YUYV', 640, 480): 30}, clock=negotiator.clock)
+    result = negotiator.negotiate(cap, "FAKE:0")
+
+    assert cap.frames_read > 0
+    assert result.actual.key() == ('YUYV', 640, 480, 30, 1)
@@ -0,0 +1,69 @@
+"""Gesture debouncing (gesture_state.py) on a left hand hovering at the LEFT threshold"""
+
+from gesture_controller import GestureController
+from input_helpers import RecordingBackend
+from landmark_utils import landmarks_from_array
+
+FRAME_S = 1 / 32
+# Left wrist x around the LEFT threshold (x > 0.7 with the default deadzone), two frames per side
+HOVER_X = [0.72, 0.73, 0.68, 0.69] * 8
+
+
+def run(frames, **debounce):
+    """Feed (left wrist x, visibility) frames to a controller; returns the controller and the key events"""
+    backend = RecordingBackend()
+    controller = GestureController(backend, **debounce)
+    for i, points in enumerate(frames):
+        controller.process_frame(landmarks_from_array(points), False, 480, 1920, 1080, 1.0,
+                                 capture_time=i * FRAME_S)
+    events = [(action, args[0]) for _, action, args in backend.events if args == ('left',)]
+    return controller, events
+
+
+def hover(pose, visibility=1.0):
+    return [pose(left_wrist=(x, 0.5), visibility=visibility) for x in HOVER_X]
+
+
+def test_without_debouncing_every_crossing_is_sent(pose):
+    controller, events = run(hover(pose))
+    assert len(events) == 16
+    assert controller.gesture_stats() == {}
+
+
+def test_hysteresis_holds_the_gesture(pose):
+    controller, events = run(hover(pose), hysteresis={'deadzone': 0.05})
+    assert events == [('key_down', 'left')]
+
+    stats = controller.gesture_stats()['keyboard']['gestures']["LEFT"]
+    assert stats['transitions'] == 1
+    assert stats['raw_transitions'] == 16
+    assert stats['suppressed'] == 15
+
+
+def test_min_hold_and_release_limit_the_event_rate(pose):
+    # Raw changes every 2 frames; a press lasts at least 6 frames and a release 2
+    controller, events = run(hover(pose), min_hold=6 * FRAME_S, min_release=2 * FRAME_S)
+    assert events[0] == ('key_down', 'left')
+    assert 0 < len(events) < 16
+
+    stats = controller.gesture_stats()['keyboard']
+    gesture = stats['gestures']["LEFT"]
+    assert gesture['transitions'] == len(events)
+    assert gesture['suppressed'] == gesture['raw_transitions'] - len(events)
+    assert gesture['blocked_hold'] > 0
+    assert stats['blocked']['visibility'] == 0
+
+
+def test_visibility_gates_only_the_start(pose):
+    out = pose(left_wrist=(0.9, 0.5))
+    hidden_out = pose(left_wrist=(0.9, 0.5), visibility=0.2)
+    hidden_in = pose(left_wrist=(0.5, 0.5), visibility=0.2)
+
+    # An invisible hand never starts the gesture
+    controller, events = run([hidden_out] * 4, min_visibility=0.5)
+    assert events == []
+    assert controller.gesture_stats()['keyboard']['gestures']["LEFT"]['blocked_visibility'] == 1
+
+    # A started gesture is released even though the hand went out of sight
+    controller, events = run([out] * 2 + [hidden_out, hidden_in], min_visibility=0.5)
+    assert events == [('key_down', 'left'), ('key_up', 'left')]
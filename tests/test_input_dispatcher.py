@@ -0,0 +1,101 @@
+"""InputDispatcher against a RecordingBackend (no OS input needed)"""
+
+import threading
+
+from input_dispatcher import InputDispatcher
+from input_helpers import RecordingBackend
+
+
+class FailingBackend(RecordingBackend):
+    """Recording backend whose key_down raises for the next `failures` calls"""
+
+    def __init__(self, failures=0):
+        super().__init__()
+        self.failures = failures
+        self.calls = 0
+
+    def key_down(self, key):
+        self.calls += 1
+        if self.failures:
+            self.failures -= 1
+            raise OSError("injection blocked")
+        super().key_down(key)
+
+
+def sent(backend):
+    return [(action, args) for _, action, args in backend.events]
+
+
+def test_only_state_changes_are_sent():
+    backend = RecordingBackend()
+    dispatcher = InputDispatcher(backend).start()
+    dispatcher.submit(keys={'a', 'b'}, mouse_button=True)
+    assert dispatcher.flush()
+    dispatcher.submit(keys={'b', 'c'}, mouse_button=True)
+    dispatcher.submit(keys={'b', 'c'}, mouse_button=True)
+    dispatcher.stop()
+
+    events = sent(backend)
+    assert sorted(events[:3]) == [('key_down', ('a',)), ('key_down', ('b',)), ('mouse_down', ())]
+    assert events[3:] == [('key_up', ('a',)), ('key_down', ('c',))]
+
+
+def test_cursor_moves_coalesce_to_latest_target():
+    backend = RecordingBackend()
+    dispatcher = InputDispatcher(backend)
+    for x in range(5):
+        dispatcher.move_to(x, 2 * x)
+    dispatcher.start().stop()
+
+    assert sent(backend) == [('move_to', (4, 8))]
+    assert dispatcher.stats()['moves_coalesced'] == 4
+
+
+def test_press_and_release_while_busy_are_sent_as_a_tap():
+    release = threading.Event()
+
+    class SlowBackend(RecordingBackend):
+        def key_down(self, key):
+            if key == 'x':
+                release.wait(1.0)
+            super().key_down(key)
+
+    backend = SlowBackend()
+    dispatcher = InputDispatcher(backend).start()
+    dispatcher.key_down('x')
+    while dispatcher.queue_depth():
+        pass  # Until the worker has taken the press of x
+    dispatcher.key_down('up')
+    dispatcher.key_up('up')
+    release.set()
+    dispatcher.stop()
+
+    assert sent(backend) == [('key_down', ('x',)), ('key_down', ('up',)), ('key_up', ('up',))]
+
+
+def test_failed_call_is_retried():
+    backend = FailingBackend(failures=2)
+    dispatcher = InputDispatcher(backend, retry_interval=0.01).start()
+    dispatcher.key_down('left')
+    assert dispatcher.flush()
+    dispatcher.key_up('left')
+    dispatcher.stop()
+
+    assert backend.calls == 3
+    assert sent(backend) == [('key_down', ('left',)), ('key_up', ('left',))]
+
+
+def test_failed_call_is_not_recorded_as_sent():
+    backend = FailingBackend(failures=1000)
+    dispatcher = InputDispatcher(backend, retry_interval=0.01).start()
+    dispatcher.key_down('left')
+    assert not dispatcher.flush(timeout=0.1)  # The press keeps failing
+    assert backend.calls > 1
+
+    # The key never went down, so releasing it sends no key_up
+    dispatcher.key_up('left')
+    assert dispatcher.flush()
+    dispatcher.stop()
+
+    assert sent(backend) == []
+    assert dispatcher.stats()['events_emitted'] == 0
@@ -0,0 +1,67 @@
+"""Deterministic motion-to-input latency of replayed traces (headless.py --latency)"""
+
+import json
+
+import pytest
+
+import headless
+from gesture_controller import GestureController
+from input_helpers import RecordingBackend
+from latency_tracing import FakeClock, LatencyTracer, TracingBackend
+from trace_utils import TraceReader
+
+FRAME_S = 1 / 32  # Frame interval and replay delay are exact binary fractions, so latencies are exact
+
+
+def left_tap_frames(pose, start=8, length=2, count=20):
+    """Frames with the left hand out for length frames from frame start"""
+    out = pose(left_wrist=(0.9, 0.5))
+    neutral = pose()
+    return [(i * FRAME_S, out if start <= i < start + length else neutral) for i in range(count)]
+
+
+def replay(path, delay, **debounce):
+    clock = FakeClock()
+    tracer = LatencyTracer(clock)
+    backend = RecordingBackend(clock)
+    controller = GestureController(TracingBackend(backend, tracer), **debounce)
+    with TraceReader(path) as trace:
+        headless.run_replay(trace, controller, backend, None, clock=clock, delay=delay)
+    return tracer.report()
+
+
+def test_latency_equals_delay_without_debouncing(pose, write_trace):
+    report = replay(write_trace(left_tap_frames(pose)), FRAME_S)
+
+    assert set(report) == {"LEFT", "LEFT release"}
+    for label in report:
+        assert report[label]['count'] == 1
+        assert report[label]['p50_ms'] == report[label]['max_ms'] == FRAME_S * 1000
+
+
+def test_min_hold_delays_release_from_motion_onset(pose, write_trace):
+    # Hand back in after 2 frames (0.0625 s), but the gesture is held for 0.125 s:
+    # the release is emitted 2 frames after the motion and traced from the motion
+    report = replay(write_trace(left_tap_frames(pose)), FRAME_S, min_hold=4 * FRAME_S)
+
+    assert report["LEFT"]['count'] == 1
+    assert report["LEFT"]['max_ms'] == FRAME_S * 1000
+    assert report["LEFT release"]['count'] == 1
+    assert report["LEFT release"]['max_ms'] == 3 * FRAME_S * 1000
+
+
+def test_cli_latency_report(pose, write_trace, tmp_path, capsys):
+    frames = left_tap_frames(pose, start=4, count=12) + [
+        (t + 12 * FRAME_S, points) for t, points in left_tap_frames(pose, start=4, count=12)]
+    report_path = tmp_path / "latency.json"
+
+    assert headless.main(["--trace", write_trace(frames), "--no-events", "--replay-delay-ms", "25",
+                          "--latency-report", str(report_path)]) == 0
+    saved = json.loads(report_path.read_text())
+
+    assert saved['untagged'] == 0
+    assert set(saved['gestures']) == {"LEFT", "LEFT release"}
+    for stats in saved['gestures'].values():
+        assert stats['count'] == 2
+        for key in ('p50_ms', 'p95_ms', 'p99_ms', 'max_ms'):
+            assert stats[key] == pytest.approx(25.0)
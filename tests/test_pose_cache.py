@@ -0,0 +1,54 @@
+"""Pose cache LRU eviction (pose_cache.py)"""
+
+import json
+import os
+
+from pose_cache import HASH_INDEX_NAME, PoseCache
+from pose_utils import LandmarkResults
+
+
+def fill(cache, source, pose, frames=4, **settings):
+    entry = cache.open(source, **settings)
+    for _ in range(frames):
+        entry.append(LandmarkResults(pose()))
+    entry.finish()
+    entry.close()
+    return entry
+
+
+def hashed_sources(cache):
+    with open(os.path.join(cache.directory, HASH_INDEX_NAME)) as f:
+        return {os.path.basename(source) for source in json.load(f)}
+
+
+def test_eviction_prunes_the_hash_index(tmp_path, pose):
+    videos = []
+    for i in range(3):
+        path = tmp_path / f"video{i}.mp4"
+        path.write_bytes(bytes([i]) * 1000)
+        videos.append(str(path))
+    cache = PoseCache(str(tmp_path / "cache"), chunk_frames=4)
+    first = fill(cache, videos[0], pose)
+    cache.max_bytes = first.size() * 2 + 100  # Room for two entries
+
+    fill(cache, videos[0], pose, model_complexity=2)  # Same video, other settings
+    assert hashed_sources(cache) == {"video0.mp4"}
+
+    fill(cache, videos[1], pose)
+    fill(cache, videos[2], pose)
+
+    assert len(cache.entries()) == 2
+    assert hashed_sources(cache) == {"video1.mp4", "video2.mp4"}
+
+
+def test_hash_kept_while_another_entry_uses_it(tmp_path, pose):
+    video = tmp_path / "video.mp4"
+    video.write_bytes(b"frames" * 100)
+    cache = PoseCache(str(tmp_path / "cache"), chunk_frames=4)
+    first = fill(cache, str(video), pose, model_complexity=1)
+    cache.max_bytes = first.size() + 100  # Room for one entry
+
+    fill(cache, str(video), pose, model_complexity=2)
+
+    assert [meta['settings'] for meta in cache.entries()] == [{'model_complexity': 2}]
+    assert hashed_sources(cache) == {"video.mp4"}
@@ -0,0 +1,26 @@
+"""Pose results rebuilt from landmark arrays (predicted, cached and worker frames)"""
+
+import numpy as np
+
+from camera_utils import extract_landmarks
+from landmark_utils import LEFT_WRIST, LandmarkFrame
+from pose_utils import LandmarkResults
+
+
+def test_landmark_objects_are_built_only_when_read(pose):
+    points = pose(left_wrist=(0.9, 0.5))
+    results = LandmarkResults(points)
+
+    frame = extract_landmarks(results, out=LandmarkFrame())
+    assert np.array_equal(frame.points, points)
+    assert results.pose_landmarks._landmark is None
+
+    landmarks = results.pose_landmarks.landmark
+    assert len(landmarks) == len(points)
+    assert [landmarks[LEFT_WRIST].x, landmarks[LEFT_WRIST].y] == points[LEFT_WRIST, :2].tolist()
+    assert results.pose_landmarks.landmark is landmarks
+
+
+def test_no_pose():
+    assert LandmarkResults(None).pose_landmarks is None
+    assert extract_landmarks(LandmarkResults(None)) is None
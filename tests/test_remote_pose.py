@@ -0,0 +1,92 @@
+"""Split mode (remote_pose.py) end to end over localhost"""
+
+import remote_pose
+from remote_pose import HEADER, LandmarkReceiver, LandmarkSender, LossyLink, run_loopback
+from landmark_utils import landmarks_from_array
+
+FRAME_S = 1 / 30
+
+
+class PacketList:
+    """Socket stand-in that keeps every datagram"""
+
+    def __init__(self):
+        self.packets = []
+
+    def sendto(self, data, address):
+        self.packets.append(bytes(data))
+
+
+def gesture_frames(pose, count=120):
+    """Left, right and both hands out in turn, with neutral frames and a lost pose in between"""
+    poses = [pose(), pose(left_wrist=(0.9, 0.5)), pose(), pose(right_wrist=(0.1, 0.5)), None,
+             pose(left_wrist=(0.9, 0.5), right_wrist=(0.1, 0.5))]
+    return [(i * FRAME_S, poses[i // 10 % len(poses)]) for i in range(count)]
+
+
+def test_lossless_loopback_matches_a_local_run(pose, write_trace):
+    path = write_trace([(t, p) for t, p in gesture_frames(pose) if p is not None])
+    stats, sent, link, remote, local = run_loopback(path, realtime=False)
+
+    assert remote == local
+    assert any(action == 'key_down' for action, _ in remote)
+    assert stats['received'] == sent['sent']
+    assert (stats['lost'], stats['late'], stats['duplicates'], stats['invalid']) == (0, 0, 0, 0)
+
+
+def test_lossy_loopback_counters(pose, write_trace):
+    path = write_trace([(t, p) for t, p in gesture_frames(pose, 300) if p is not None])
+    stats, sent, link, _, _ = run_loopback(path, loss=0.1, reorder=0.1, realtime=False, seed=3)
+
+    assert link.dropped > 0 and link.reordered > 0
+    assert stats['received'] == sent['sent'] - link.dropped
+    assert stats['late'] == link.reordered
+    assert stats['duplicates'] == 0
+    assert 0 < stats['lost'] <= link.dropped  # Drops after the last received packet are not seen
+
+
+def test_lossy_link_counters(pose):
+    packets = PacketList()
+    link = LossyLink(packets, loss=0.1, reorder=0.1, seed=1)
+    sender = LandmarkSender(link, None)
+    for i in range(500):
+        sender.send(landmarks_from_array(pose()), i * FRAME_S)
+    receiver = LandmarkReceiver(None)
+    for packet in packets.packets:
+        receiver.feed(packet)
+
+    sequences = [HEADER.unpack_from(packet)[4] for packet in packets.packets]
+    newest = max(sequences)
+    stats = receiver.stats()
+    assert stats['received'] == len(packets.packets) == 500 - link.dropped - (link.held is not None)
+    assert stats['lost'] == newest + 1 - len(set(sequences))
+    assert stats['late'] == link.reordered - (link.held is not None)
+    assert stats['duplicates'] == 0
+
+
+def test_receiver_counts_duplicate_late_and_lost_packets(pose):
+    link = PacketList()
+    sender = LandmarkSender(link, None)
+    for i in range(6):
+        sender.send(landmarks_from_array(pose()), i * FRAME_S)
+    receiver = LandmarkReceiver(None)
+
+    applied = [receiver.feed(link.packets[i]) is not None for i in (0, 1, 1, 3, 2, 5)]
+
+    assert applied == [True, True, False, True, False, True]
+    stats = receiver.stats()
+    assert (stats['duplicates'], stats['late'], stats['lost']) == (1, 1, 1)  # 4 never arrived
+
+
+def test_cli_fails_when_lossless_loopback_diverges(pose, write_trace, monkeypatch):
+    path = write_trace([(t, p) for t, p in gesture_frames(pose, 40) if p is not None])
+    assert remote_pose.main(["loopback", "--trace", path, "--fast"]) == 0
+
+    real_run_loopback = run_loopback
+
+    def diverging(*args, **kwargs):
+        stats, sent, link, remote, local = real_run_loopback(*args, **kwargs)
+        return stats, sent, link, remote[:-1], local
+
+    monkeypatch.setattr(remote_pose, 'run_loopback', diverging)
+    assert remote_pose.main(["loopback", "--trace", path, "--fast"]) == 1
@@ -0,0 +1,190 @@
+"""
+Landmark trace recording and replay for Motion Controller
+Fixed-width binary records of all 33 pose landmarks, read back through a memory map
+"""
+
+import json
+import os
+import struct
+
+import numpy as np
+
+from config import KEYBOARD_BINDINGS, MOUSE_BINDINGS
+from landmark_utils import NUM_LANDMARKS, LandmarkFrame, landmarks_to_array
+
+TRACE_MAGIC = b'MCTRACE\0'
+# Version 2 stores the gesture name table after the header; version 1 files use GESTURE_NAMES
+TRACE_VERSION = 2
+READABLE_VERSIONS = (1, 2)
+
+# magic, version, record size, landmark count, frame width, frame height, size of the gesture name table
+HEADER_FORMAT = '<8sIIIIII'
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+
+RECORD_DTYPE = np.dtype([
+    ('timestamp', '<f8'),
+    ('gesture', '<i4'),
+    ('flags', '<u4'),
+    ('landmarks', '<f4', (NUM_LANDMARKS, 4)),  # x, y, z, visibility
+])
+
+# Record flags
+FLAG_POSE = 1  # A pose was detected in this frame
+FLAG_MOUSE_MODE = 2  # Mouse control mode was active
+
+# Gesture codes of the default bindings (index into this tuple); the only table of version 1 traces
+GESTURE_NAMES = (None, "LEFT", "RIGHT", "UP", "DOWN", "MOUSE CLICK", "CLICK HOLD")
+GESTURE_CODES = {name: code for code, name in enumerate(GESTURE_NAMES)}
+
+
+def trace_gesture_names(gesture_names=None):
+    """Gesture table of a new trace: GESTURE_NAMES (so their codes stay stable) and then the other names
+
+    gesture_names defaults to the names of the config bindings.
+    """
+    if gesture_names is None:
+        gesture_names = [binding.get('name') for binding in KEYBOARD_BINDINGS + MOUSE_BINDINGS]
+    names = list(GESTURE_NAMES)
+    for name in gesture_names:
+        if name and name not in names:
+            names.append(name)
+    return tuple(names)
+
+
+class TraceWriter:
+    """Appends landmark records to a trace file
+
+    gesture_names lists the gesture names write() may be given (default:
+    the config binding names); the table is stored in the file so custom
+    binding names survive replay. Writing any other name raises ValueError.
+    """
+
+    def __init__(self, path, frame_w=0, frame_h=0, gesture_names=None):
+        self.path = path
+        names = trace_gesture_names(gesture_names)
+        self.gesture_names = names
+        self.codes = {name: code for code, name in enumerate(names)}
+        table = json.dumps(names[1:]).encode()
+        self.file = open(path, 'wb')
+        self.file.write(struct.pack(HEADER_FORMAT, TRACE_MAGIC, TRACE_VERSION,
+                                    RECORD_DTYPE.itemsize, NUM_LANDMARKS, frame_w, frame_h, len(table)))
+        self.file.write(table)
+        self._record = np.zeros(1, dtype=RECORD_DTYPE)
+        self.count = 0
+
+    def write(self, timestamp, landmarks, gesture=None, mouse_mode=False):
+        """Write one frame; landmarks is a (33, 4) array, a LandmarkFrame, a MediaPipe landmark list or None"""
+        record = self._record[0]
+        record['timestamp'] = timestamp
+        code = self.codes.get(gesture)
+        if code is None:
+            raise ValueError(f"Gesture {gesture!r} is not in the gesture names of trace {self.path} "
+                             f"({', '.join(self.gesture_names[1:])})")
+        record['gesture'] = code
+        flags = FLAG_MOUSE_MODE if mouse_mode else 0
+        if landmarks is None:
+            record['landmarks'] = np.nan
+        else:
+            if isinstance(landmarks, LandmarkFrame):
+                record['landmarks'] = landmarks.points
+            elif isinstance(landmarks, np.ndarray):
+                record['landmarks'] = landmarks
+            else:
+                landmarks_to_array(landmarks, out=record['landmarks'])
+            flags |= FLAG_POSE
+        record['flags'] = flags
+        self.file.write(self._record.tobytes())
+        self.count += 1
+
+    def write_results(self, timestamp, results, gesture=None, mouse_mode=False):
+        """Write one frame straight from a MediaPipe pose result"""
+        landmarks = results.pose_landmarks.landmark if results.pose_landmarks else None
+        self.write(timestamp, landmarks, gesture, mouse_mode)
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class TraceReader:
+    """Memory-mapped view of a trace file
+
+    Field arrays (timestamps, landmarks, ...) are views into the mapped file,
+    so slicing them does not copy any data.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            header = f.read(HEADER_SIZE)
+            if len(header) < HEADER_SIZE:
+                raise ValueError(f"Not a landmark trace (file too short): {path}")
+            magic, version, record_size, num_landmarks, frame_w, frame_h, table_size = struct.unpack(
+                HEADER_FORMAT, header)
+            if magic != TRACE_MAGIC:
+                raise ValueError(f"Not a landmark trace: {path}")
+            if (version not in READABLE_VERSIONS or record_size != RECORD_DTYPE.itemsize
+                    or num_landmarks != NUM_LANDMARKS):
+                raise ValueError(f"Unsupported trace format (version {version}): {path}")
+            if version == 1:
+                self.gesture_table = GESTURE_NAMES
+                table_size = 0
+            else:
+                self.gesture_table = (None,) + tuple(json.loads(f.read(table_size)))
+        self.frame_w = frame_w
+        self.frame_h = frame_h
+        # Gesture name -> code stored in the records of this trace
+        self.gesture_codes = {name: code for code, name in enumerate(self.gesture_table)}
+
+        # Ignore a partially written last record (e.g. after a crash while recording)
+        offset = HEADER_SIZE + table_size
+        count = (os.path.getsize(path) - offset) // RECORD_DTYPE.itemsize
+        if count > 0:
+            self.records = np.memmap(path, dtype=RECORD_DTYPE, mode='r', offset=offset, shape=(count,))
+        else:
+            self.records = np.zeros(0, dtype=RECORD_DTYPE)  # mmap cannot map an empty region
+        self.timestamps = self.records['timestamp']
+        self.gestures = self.records['gesture']
+        self.flags = self.records['flags']
+        self.landmarks = self.records['landmarks']  # (N, 33, 4) float32
+
+    def __len__(self):
+        return len(self.records)
+
+    def __getitem__(self, index):
+        return self.records[index]
+
+    def frames(self, start=0, stop=None):
+        """Yield (timestamp, landmarks or None, gesture name, mouse mode) per frame"""
+        stop = len(self) if stop is None else min(stop, len(self))
+        for i in range(start, stop):
+            flags = int(self.flags[i])
+            landmarks = self.landmarks[i] if flags & FLAG_POSE else None
+            yield (float(self.timestamps[i]), landmarks, gesture_name(self.gestures[i], self.gesture_table),
+                   bool(flags & FLAG_MOUSE_MODE))
+
+    def gesture_names(self):
+        """Return the recorded gesture of every frame as a list of names"""
+        return [gesture_name(code, self.gesture_table) for code in self.gestures]
+
+    def close(self):
+        """Drop the mapping (it is unmapped once no slices of it remain referenced)"""
+        self.records = self.timestamps = self.gestures = self.flags = self.landmarks = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def gesture_name(code, names=GESTURE_NAMES):
+    """Map a stored gesture code back to its name in a trace's gesture table"""
+    code = int(code)
+    return names[code] if 0 <= code < len(names) else None
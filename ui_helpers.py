@@ -43,7 +43,92 @@ def show_loading_screen(text, progress=0):
     cv2.imshow('Motion Controller', loading_screen)
     cv2.waitKey(1)
 
+class CachedOverlay:
+    """Pre-rendered overlay with a per-pixel alpha mask, blended onto frames
+    
+    The overlay is rendered once on a black and once on a white canvas; the
+    difference gives the alpha of every pixel (anti-aliased edges included).
+    Only horizontal bands that contain drawn pixels are kept, cropped to
+    their bounding boxes, so blending touches a small part of the frame.
+    """
+    
+    def __init__(self, on_black, on_white, band_gap=32):
+        self.shape = on_black.shape
+        black = on_black.astype(np.float32)
+        alpha = 1.0 - (on_white.astype(np.float32) - black).max(axis=2) / 255.0
+        drawn = alpha > 0
+        self.patches = []
+        
+        rows = np.flatnonzero(drawn.any(axis=1))
+        if len(rows) == 0:
+            return
+        # Split drawn rows into bands separated by more than band_gap empty rows
+        breaks = np.flatnonzero(np.diff(rows) > band_gap)
+        for y0, y1 in zip(np.concatenate(([rows[0]], rows[breaks + 1])),
+                          np.concatenate((rows[breaks], [rows[-1]])) + 1):
+            cols = np.flatnonzero(drawn[y0:y1].any(axis=0))
+            x0, x1 = cols[0], cols[-1] + 1
+            weight = alpha[y0:y1, x0:x1]
+            # Un-premultiply the color so the band can be blended with weights
+            color = black[y0:y1, x0:x1] / np.maximum(weight, 1e-6)[:, :, None]
+            color = np.clip(color + 0.5, 0, 255).astype(np.uint8)
+            if (weight[weight > 0] == 1.0).all():
+                self.patches.append((y0, y1, x0, x1, color, drawn[y0:y1, x0:x1].astype(np.uint8), None))
+            else:
+                self.patches.append((y0, y1, x0, x1, color, weight, 1.0 - weight))
+    
+    def blend(self, image):
+        """Blend the overlay onto an image of the same size in place"""
+        if image.shape != self.shape:
+            return
+        for y0, y1, x0, x1, color, weight, inverse in self.patches:
+            region = image[y0:y1, x0:x1]
+            if inverse is None:
+                cv2.copyTo(color, weight, region)
+            else:
+                cv2.blendLinear(color, region, weight, inverse, dst=region)
+
+class OverlayCache:
+    """Caches rendered overlays per UI state (frame size, hints, mouse mode)"""
+    
+    def __init__(self, max_entries=32):
+        self.max_entries = max_entries
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, key, frame_w, frame_h, render):
+        """Return the overlay for key, rendering it onto a blank frame on first use"""
+        overlay = self.entries.get(key)
+        if overlay is None:
+            self.misses += 1
+            if len(self.entries) >= self.max_entries:
+                self.entries.pop(next(iter(self.entries)))
+            on_black = np.zeros((frame_h, frame_w, 3), dtype=np.uint8)
+            on_white = np.full((frame_h, frame_w, 3), 255, dtype=np.uint8)
+            render(on_black)
+            render(on_white)
+            overlay = CachedOverlay(on_black, on_white)
+            self.entries[key] = overlay
+        else:
+            self.hits += 1
+        return overlay
+    
+    def clear(self):
+        self.entries.clear()
+
+# Shared cache for the static parts of the main window
+overlay_cache = OverlayCache()
+_instructions_image = None
+
 def draw_instructions():
+    """Return the instruction window image (rendered once, do not modify the result)"""
+    global _instructions_image
+    if _instructions_image is None:
+        _instructions_image = render_instructions()
+    return _instructions_image
+
+def render_instructions():
     """Draw the instruction window with stick figures showing gestures"""
     inst = np.zeros((600, 800, 3), dtype=np.uint8)
     inst[:] = (30, 30, 30)
@@ -139,26 +224,31 @@ def draw_instructions():
     return inst
 
 def draw_control_zones(image, frame_w, frame_h, nose_x_screen, nose_y_screen, waist_y_screen, deadzone, up_threshold, down_threshold, mouse_enabled):
-    """Draw control zones overlay on the image"""
+    """Draw control zones overlay on the image
+    
+    Zone lines follow the nose and waist and are drawn every frame; the
+    fixed labels come from the overlay cache.
+    """
+    draw_zone_lines(image, frame_w, frame_h, nose_x_screen, nose_y_screen, waist_y_screen,
+                    deadzone, up_threshold, down_threshold, mouse_enabled)
+    labels = overlay_cache.get(('zone_labels', frame_w, frame_h, mouse_enabled), frame_w, frame_h,
+                               lambda canvas: render_zone_labels(canvas, frame_w, frame_h, mouse_enabled))
+    labels.blend(image)
+
+def draw_zone_lines(image, frame_w, frame_h, nose_x_screen, nose_y_screen, waist_y_screen, deadzone, up_threshold, down_threshold, mouse_enabled):
+    """Draw the zone boundaries that move with the player"""
     if mouse_enabled:
         # Show only click zone for left hand in mouse mode
         left_zone_x = int(nose_x_screen - (deadzone * frame_w))
         cv2.rectangle(image, (0, 0), (left_zone_x, frame_h), (0, 255, 0), 2)
-        cv2.putText(image, "CLICK ZONE", (10, 50), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-        
-        # Mouse mode label (bottom center, white color)
-        cv2.putText(image, "MOUSE CONTROL MODE", (frame_w // 2 - 150, frame_h - 20), 
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
     else:
         # LEFT zone (left side of screen)
         left_zone_x = int(nose_x_screen - (deadzone * frame_w))
         cv2.rectangle(image, (0, 0), (left_zone_x, frame_h), (255, 0, 0), 2)
-        cv2.putText(image, "LEFT ZONE", (10, 50), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 0, 0), 2)
         
         # RIGHT zone (right side of screen)
         right_zone_x = int(nose_x_screen + (deadzone * frame_w))
         cv2.rectangle(image, (right_zone_x, 0), (frame_w, frame_h), (0, 0, 255), 2)
-        cv2.putText(image, "RIGHT ZONE", (frame_w - 180, 50), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
         
         # UP zone (upper part)
         up_zone_y = int(nose_y_screen - (up_threshold * frame_h))
@@ -169,12 +259,30 @@ def draw_control_zones(image, frame_w, frame_h, nose_x_screen, nose_y_screen, wa
         down_zone_y = int(waist_y_screen + (down_threshold * frame_h))
         cv2.line(image, (0, down_zone_y), (frame_w, down_zone_y), (0, 255, 255), 2)
         cv2.putText(image, "DOWN ZONE", (frame_w // 2 - 100, down_zone_y + 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)
+
+def render_zone_labels(image, frame_w, frame_h, mouse_enabled):
+    """Draw the fixed zone and mode labels"""
+    if mouse_enabled:
+        cv2.putText(image, "CLICK ZONE", (10, 50), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+        
+        # Mouse mode label (bottom center, white color)
+        cv2.putText(image, "MOUSE CONTROL MODE", (frame_w // 2 - 150, frame_h - 20), 
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
+    else:
+        cv2.putText(image, "LEFT ZONE", (10, 50), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 0, 0), 2)
+        cv2.putText(image, "RIGHT ZONE", (frame_w - 180, 50), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
         
         # Keyboard mode label
         cv2.putText(image, "KEYBOARD MODE", (frame_w // 2 - 120, frame_h - 20), 
                     cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
 
 def draw_ui_controls(image, frame_w, frame_h, show_hints, mouse_enabled):
+    """Draw UI control checkboxes in bottom right corner (cached per state)"""
+    controls = overlay_cache.get(('ui_controls', frame_w, frame_h, show_hints, mouse_enabled), frame_w, frame_h,
+                                 lambda canvas: render_ui_controls(canvas, frame_w, frame_h, show_hints, mouse_enabled))
+    controls.blend(image)
+
+def render_ui_controls(image, frame_w, frame_h, show_hints, mouse_enabled):
     """Draw UI control checkboxes in bottom right corner"""
     checkbox_x = frame_w - 150
     
@@ -198,4 +306,21 @@ def draw_ui_controls(image, frame_w, frame_h, show_hints, mouse_enabled):
     button_inst_y = frame_h - 25
     cv2.rectangle(image, (checkbox_x, button_inst_y - 10), (checkbox_x + 20, button_inst_y + 10), (255, 200, 0), 2)
     cv2.putText(image, "?", (checkbox_x + 5, button_inst_y + 5), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 200, 0), 2)
-    cv2.putText(image, "Help", (checkbox_x + 25, button_inst_y + 5), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 200, 0), 1)
\ No newline at end of file
+    cv2.putText(image, "Help", (checkbox_x + 25, button_inst_y + 5), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 200, 0), 1)
+
+def draw_stats_hud(image, snapshot):
+    """Draw per-stage latency percentiles and FPS in the top right corner"""
+    lines = [f"FPS {snapshot['fps']:5.1f}"]
+    for name, s in snapshot['stages'].items():
+        lines.append(f"{name:<10} {s['p50_ms']:6.1f} {s['p95_ms']:6.1f} {s['p99_ms']:6.1f}")
+    for name, value in snapshot['gauges'].items():
+        lines.append(f"{name:<10} {value}")
+    
+    x = image.shape[1] - 290
+    height = 18 * len(lines) + 26
+    # Darken the background so the text stays readable
+    region = image[0:height, x:]
+    region[:] = region // 3
+    cv2.putText(image, "stage      p50    p95    p99 ms", (x + 5, 16), cv2.FONT_HERSHEY_PLAIN, 1.0, (200, 200, 200), 1)
+    for i, line in enumerate(lines):
+        cv2.putText(image, line, (x + 5, 36 + 18 * i), cv2.FONT_HERSHEY_PLAIN, 1.0, (0, 255, 0), 1)